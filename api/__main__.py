@@ -0,0 +1,6 @@
+import uvicorn
+from src.config import API_HOST, API_PORT, API_WORKERS
+
+if __name__ == "__main__":
+    # Each worker process loads its own models and clients once, at startup
+    uvicorn.run("api.server:app", host=API_HOST, port=API_PORT, workers=API_WORKERS)
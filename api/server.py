@@ -0,0 +1,206 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Literal
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from src.config import API_MAX_CONCURRENCY, API_MAX_QUEUE, API_QUEUE_TIMEOUT
+from src.tools.retrieval_tools import UnknownSourceError
+from src.tracing import render_metrics
+
+Collection = Literal["statutes", "cases", "regulations"]
+
+
+class QueryRequest(BaseModel):
+    question: str = Field(min_length=1, max_length=4000)
+
+
+class QueryResponse(BaseModel):
+    answer: str
+
+
+class SearchRequest(BaseModel):
+    query: str = Field(min_length=1, max_length=4000)
+    k: int = Field(default=5, ge=1, le=50)
+    collections: List[Collection] = ["statutes", "cases", "regulations"]
+    # Acts or file names, e.g. ["Indian Penal Code"]; empty searches everything
+    sources: List[str] = []
+
+
+class SearchHit(BaseModel):
+    content: str
+    metadata: Dict
+
+
+class SearchResponse(BaseModel):
+    results: Dict[str, List[SearchHit]]
+
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight requests and the queue of requests waiting for a slot.
+
+    Requests beyond max_queue, or that wait longer than queue_timeout for a slot,
+    are rejected with 503 so a load balancer can retry them elsewhere instead of
+    piling more work onto a saturated replica.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+
+    async def acquire(self):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            raise HTTPException(status_code=503, detail="Server busy", headers={"Retry-After": "1"})
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Timed out waiting for a free slot",
+                                headers={"Retry-After": "1"})
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def release_once(self) -> Callable[[], None]:
+        """release() for one acquired slot, safe to call from more than one cleanup path."""
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.release()
+
+        return release
+
+
+class Resources:
+    """
+    Everything loaded once at startup and shared by all requests in this worker process.
+
+    Loaded models can't be shared between processes, so the intended deployment is one
+    worker (API_WORKERS=1) serving many requests at once: the endpoints are async and run
+    the blocking pipeline in the threadpool, under the limiter. More workers each load
+    their own copy; scale out with replicas behind the load balancer instead.
+    """
+    run_query = None
+    stream_query = None
+    search_all = None
+    ready = False
+
+
+resources = Resources()
+limiter = ConcurrencyLimiter(API_MAX_CONCURRENCY, API_MAX_QUEUE, API_QUEUE_TIMEOUT)
+
+
+def load_resources():
+    from src.agents.orchestrator import run_query, stream_query
+    from src.tools.retrieval_tools import search_all
+    from src.resources import warm_up
+    from src.ingestion.artifact import prepare_index
+
+    # Unpacks the prebuilt index if needed; a mismatched one raises and the worker refuses to start
+    prepare_index()
+
+    # Build the LLM client, Chroma client, graph, models and answer cache now so the first request doesn't pay for them
+    warm_up()
+
+    resources.run_query = run_query
+    resources.stream_query = stream_query
+    resources.search_all = search_all
+    resources.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(load_resources)
+    yield
+
+
+app = FastAPI(title="Legal RAG", lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok" if resources.ready else "loading",
+        "in_flight": limiter.in_flight,
+        "waiting": limiter.waiting,
+        "max_concurrency": limiter.max_concurrency
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Span, token and cache metrics are only recorded when TRACING_ENABLED is set
+    gauges = (
+        "# TYPE legal_rag_in_flight_requests gauge\n"
+        f"legal_rag_in_flight_requests {limiter.in_flight}\n"
+        "# TYPE legal_rag_waiting_requests gauge\n"
+        f"legal_rag_waiting_requests {limiter.waiting}\n"
+    )
+    return PlainTextResponse(gauges + render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/query", response_model=QueryResponse)
+async def query(request: QueryRequest):
+    await limiter.acquire()
+    try:
+        answer = await run_in_threadpool(resources.run_query, request.question)
+    finally:
+        limiter.release()
+
+    return QueryResponse(answer=answer)
+
+
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """Streams stream_query events as newline-delimited JSON."""
+    await limiter.acquire()
+    release = limiter.release_once()
+
+    async def events():
+        # The slot is held until the stream finishes or the client disconnects
+        try:
+            async for event in iterate_in_threadpool(resources.stream_query(request.question)):
+                yield json.dumps(event) + "\n"
+        finally:
+            release()
+
+    # The background task frees the slot when the body is never iterated, e.g. the client left first
+    return StreamingResponse(events(), media_type="application/x-ndjson", background=BackgroundTask(release))
+
+
+@app.post("/search", response_model=SearchResponse)
+async def search(request: SearchRequest):
+    """Retrieval only: the top k of each selected collection from one embedding pass, with no LLM calls."""
+    await limiter.acquire()
+    try:
+        results = await run_in_threadpool(resources.search_all, request.query, request.k,
+                                          list(dict.fromkeys(request.collections)), request.sources or None)
+    except UnknownSourceError as error:
+        # Any other error from the search itself is a 500
+        raise HTTPException(status_code=400, detail=str(error))
+    finally:
+        limiter.release()
+
+    return SearchResponse(results={
+        name: [SearchHit(content=doc.page_content, metadata=doc.metadata) for doc in docs]
+        for name, docs in results.items()
+    })
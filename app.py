@@ -1,10 +1,6 @@
 import streamlit as st
-import os
-import sys
 from pathlib import Path
 
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -15,24 +11,52 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma_db")
 
-if not Path(CHROMA_PATH).exists():
-    try:
-        from src.ingestion.loader import load_and_chunk_all_documents
-        from src.ingestion.vectorstore import build_vectorstore
+@st.cache_resource(show_spinner="Opening the legal index...")
+def open_index():
+    """
+    Unpacks (if needed) and verifies the prebuilt index once per server process.
+
+    The corpus is only embedded here when BUILD_INDEX_ON_STARTUP is set for local
+    development; serving replicas get their index from scripts/build_vectordb.py --artifact.
+    """
+    from src.config import BUILD_INDEX_ON_STARTUP, CHROMA_PATH
+    from src.ingestion.artifact import prepare_index
+
+    if BUILD_INDEX_ON_STARTUP and not Path(CHROMA_PATH).exists():
+        from src.ingestion.vectorstore import sync_vectorstore
+        sync_vectorstore()
+
+    return prepare_index()
+
+
+try:
+    open_index()
+except Exception as e:
+    st.error(f"❌ Legal index unavailable: {e}")
+    st.stop()
 
-        with st.spinner("🔨 Building vector database ... This may take a few minutes."):
-            all_chunked_docs = load_and_chunk_all_documents()
-            build_vectorstore(all_chunked_docs)
 
-        st.success("✅ Vector database built successfully!")
+@st.cache_resource(show_spinner="Loading models...")
+def load_pipeline():
+    """
+    Imports the agent stack and builds its clients once per server process.
 
-    except Exception as e:
-        st.error(f"❌ Error building vector database: {e}")
-        st.stop()
+    Cached with st.cache_resource, so reruns and new sessions reuse the same
+    LLM client, Chroma client, embedding model and compiled graph.
+    """
+    from src.agents.orchestrator import stream_query
+    from src.resources import warm_up
 
-from src.agents.orchestrator import run_query
+    warm_up()
+    return stream_query
+
+
+NODE_PROGRESS = {
+    "retrieval_agent": "Retrieved relevant legal documents",
+    "citations": "Extracted citations",
+    "response": "Response generated"
+}
 
 st.title(" Criminal Law Research Assistant")
 st.markdown("""
@@ -58,18 +82,34 @@ if prompt := st.chat_input("Ask a legal question..."):
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
-        with st.spinner(" Multi-agent system processing your question..."):
-            try:
-                answer = run_query(prompt)
-
-                st.markdown(answer)
-
-                st.session_state.messages.append({"role": "assistant", "content": answer})
-
-            except Exception as e:
-                error_msg = f"Error: {str(e)}"
-                st.error(error_msg)
-                st.session_state.messages.append({"role": "assistant", "content": error_msg})
+        status = st.status(" Multi-agent system processing your question...")
+        placeholder = st.empty()
+
+        try:
+            stream_query = load_pipeline()
+            answer = ""
+            streamed = ""
+
+            # Render progress and response tokens as they arrive instead of after the whole graph
+            for event in stream_query(prompt):
+                if event["type"] == "node":
+                    status.update(label=NODE_PROGRESS.get(event["node"], event["node"]))
+                elif event["type"] == "token":
+                    streamed += event["content"]
+                    placeholder.markdown(streamed + "▌")
+                elif event["type"] == "answer":
+                    answer = event["content"]
+
+            status.update(label="Done", state="complete")
+            placeholder.markdown(answer)
+
+            st.session_state.messages.append({"role": "assistant", "content": answer})
+
+        except Exception as e:
+            status.update(label="Failed", state="error")
+            error_msg = f"Error: {str(e)}"
+            st.error(error_msg)
+            st.session_state.messages.append({"role": "assistant", "content": error_msg})
 
 with st.sidebar:
     st.markdown("## :material/gavel: About")
@@ -95,3 +135,6 @@ with st.sidebar:
             st.rerun()
 
     st.caption("Powered by LangChain, Groq & ChromaDB")
+
+# The page is already on screen; load the pipeline now so the first question doesn't wait for it
+load_pipeline()
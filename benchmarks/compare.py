@@ -0,0 +1,67 @@
+"""
+Compares two benchmark result files and flags regressions.
+
+    python -m benchmarks.compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+
+Exits with status 1 when any latency grew, or any throughput fell, by more than --threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Dict
+
+# Metrics where a larger number is an improvement; every other timing is a latency
+HIGHER_IS_BETTER = ("qps", "per_second", "recall")
+TIMING_SUFFIXES = ("_ms", "seconds", "qps", "per_second", "rss_mb", "recall")
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change treated as a regression")
+    args = parser.parse_args()
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, "r", encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')}")
+
+    old = flatten(baseline.get("scales", {}))
+    new = flatten(candidate.get("scales", {}))
+
+    regressions = 0
+    for path in sorted(old.keys() & new.keys()):
+        if not path.endswith(TIMING_SUFFIXES) or old[path] == 0:
+            continue
+
+        change = (new[path] - old[path]) / old[path]
+        worse = -change if path.endswith(HIGHER_IS_BETTER) else change
+        marker = ""
+        if worse > args.threshold:
+            marker = "  REGRESSION"
+            regressions += 1
+        elif worse < -args.threshold:
+            marker = "  improved"
+
+        print(f"{path:60s} {old[path]:>12.3f} {new[path]:>12.3f} {change:>+8.1%}{marker}")
+
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
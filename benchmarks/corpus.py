@@ -0,0 +1,252 @@
+import json
+import os
+import random
+import textwrap
+from typing import BinaryIO, Dict, Iterable, Iterator, List
+
+# Page counts of data/ when the benchmarks were written; used when data/ isn't available
+BASELINE_PAGES = {"statutes": 475, "case_laws": 203, "regulations": 450}
+
+PAGES_PER_FILE = 250
+LINES_PER_PAGE = 48
+LINE_WIDTH = 95
+
+OFFENCES = [
+    "murder", "culpable homicide", "theft", "robbery", "dacoity", "extortion", "cheating", "forgery",
+    "criminal breach of trust", "criminal intimidation", "kidnapping", "abduction", "grievous hurt",
+    "wrongful confinement", "defamation", "criminal trespass", "mischief", "rioting", "bribery",
+    "cruelty by husband or relatives", "dowry death", "sexual assault", "stalking", "attempt to murder"
+]
+
+ACTORS = [
+    "the accused", "a public servant", "the officer in charge of a police station", "the Magistrate",
+    "the complainant", "any person", "the Sessions Judge", "the investigating officer", "the prosecution",
+    "the superintendent of the prison", "a woman", "the child", "the victim", "the State Government"
+]
+
+ACTIONS = [
+    "shall be punished with imprisonment of either description for a term which may extend to {n} years",
+    "shall also be liable to fine", "may arrest without warrant", "shall record the statement in writing",
+    "shall forward the report to the Magistrate", "may grant bail subject to such conditions as it thinks fit",
+    "shall be presumed to have committed the offence unless the contrary is proved",
+    "shall inform the person arrested of the grounds of arrest", "may order the production of any document",
+    "shall maintain a register in the prescribed form", "shall produce the person before the court within twenty-four hours"
+]
+
+CONDITIONS = [
+    "whoever commits {offence}", "when any person is accused of {offence}", "if it appears that {offence} has been committed",
+    "where the investigation cannot be completed within the period fixed", "save as otherwise provided in this Code",
+    "in the case of {offence} committed in the presence of witnesses", "notwithstanding anything contained in section {section}",
+    "subject to the provisions of section {section}", "unless the court for reasons to be recorded otherwise directs"
+]
+
+PARTIES = [
+    "Ramesh Kumar", "State of Uttar Pradesh", "Sunita Devi", "State of Maharashtra", "Mohd. Iqbal", "Union of India",
+    "Lakshmi Narayan", "State of Bihar", "Harpreet Singh", "State of Punjab", "Anita Sharma", "State of Kerala"
+]
+
+HOLDINGS = [
+    "the High Court erred in setting aside the conviction", "the guidelines on arrest must be strictly followed",
+    "the evidence of the sole eyewitness inspires confidence", "the delay in lodging the FIR has been satisfactorily explained",
+    "personal liberty cannot be curtailed except by procedure established by law", "the appeal deserves to be allowed",
+    "the chain of circumstantial evidence is complete", "the recovery was not proved in accordance with law",
+    "the investigating agency failed to comply with the mandatory provisions", "bail cannot be denied as a form of punishment"
+]
+
+
+def _sentence(rng: random.Random) -> str:
+    condition = rng.choice(CONDITIONS).format(offence=rng.choice(OFFENCES), section=rng.randint(1, 511))
+    action = rng.choice(ACTIONS).format(n=rng.choice([1, 2, 3, 5, 7, 10, 14]))
+    return f"{condition[0].upper()}{condition[1:]}, {rng.choice(ACTORS)} {action}."
+
+
+def _statute_lines(rng: random.Random, act_number: int) -> Iterator[str]:
+    yield f"THE SYNTHETIC CRIMINAL LAWS ACT NO. {act_number}"
+    yield ""
+    section = 0
+    for chapter in range(1, 10_000):
+        yield f"CHAPTER {chapter}"
+        yield f"OF OFFENCES RELATING TO {rng.choice(OFFENCES).upper()}"
+        for _ in range(rng.randint(4, 12)):
+            section += 1
+            title = f"Punishment for {rng.choice(OFFENCES)}"
+            body = " ".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+            yield from textwrap.wrap(f"{section}. {title}.—{body}", LINE_WIDTH)
+            for clause in range(1, rng.randint(1, 4)):
+                yield from textwrap.wrap(f"({clause}) {_sentence(rng)}", LINE_WIDTH)
+            yield ""
+
+
+def _case_lines(rng: random.Random, case_number: int) -> Iterator[str]:
+    appellant, respondent = rng.sample(PARTIES, 2)
+    yield "IN THE SUPREME COURT OF INDIA"
+    yield "CRIMINAL APPELLATE JURISDICTION"
+    yield f"CRIMINAL APPEAL NO. {case_number} OF {rng.randint(1980, 2024)}"
+    yield f"{appellant.upper()} ... APPELLANT VERSUS {respondent.upper()} ... RESPONDENT"
+    yield ""
+    for paragraph in range(1, 100_000):
+        text = " ".join(_sentence(rng) for _ in range(rng.randint(2, 5)))
+        text += f" In our considered view {rng.choice(HOLDINGS)}."
+        yield from textwrap.wrap(f"{paragraph}. {text}", LINE_WIDTH)
+        yield ""
+
+
+def _regulation_lines(rng: random.Random, manual_number: int) -> Iterator[str]:
+    yield f"MODEL MANUAL NO. {manual_number} FOR THE ADMINISTRATION OF POLICE AND PRISONS"
+    yield ""
+    for chapter in range(1, 10_000):
+        yield f"CHAPTER {chapter}"
+        for rule in range(1, rng.randint(6, 15)):
+            text = " ".join(_sentence(rng) for _ in range(rng.randint(1, 4)))
+            yield from textwrap.wrap(f"{chapter}.{rule} {text}", LINE_WIDTH)
+        yield ""
+
+
+LINE_GENERATORS = {
+    "statutes": _statute_lines,
+    "case_laws": _case_lines,
+    "regulations": _regulation_lines
+}
+
+FILE_NAMES = {
+    "statutes": "SYNTHETIC ACT {:05d}.pdf",
+    "case_laws": "SYNTHETIC APPELLANT VS STATE {:05d}.pdf",
+    "regulations": "SYNTHETIC MANUAL {:05d}.pdf"
+}
+
+
+def _escape(line: str) -> bytes:
+    encoded = line.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def write_pdf(f: BinaryIO, pages: Iterable[List[str]]):
+    """
+    Writes a minimal single-font PDF, one page per list of lines.
+
+    Objects are streamed as they are produced, so memory stays flat however many
+    pages are written; the page tree is emitted last, once every page is known.
+    """
+    offsets = {}
+
+    def write_object(number: int, body: bytes):
+        offsets[number] = f.tell()
+        f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    f.write(b"%PDF-1.4\n")
+    write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    page_numbers = []
+    number = 4
+    for lines in pages:
+        content = b"BT /F1 9 Tf 11 TL 40 800 Td\n" + b"".join(b"(%s) Tj T*\n" % _escape(line) for line in lines) + b"ET"
+        write_object(number, b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        write_object(number + 1, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                                 b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % number)
+        page_numbers.append(number + 1)
+        number += 2
+
+    kids = b" ".join(b"%d 0 R" % n for n in page_numbers)
+    write_object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_numbers)))
+
+    xref_offset = f.tell()
+    f.write(b"xref\n0 %d\n0000000000 65535 f \n" % number)
+    for n in range(1, number):
+        f.write(b"%010d 00000 n \n" % offsets[n])
+    f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (number, xref_offset))
+
+
+def _pages(lines: Iterator[str], count: int) -> Iterator[List[str]]:
+    for _ in range(count):
+        yield [next(lines) for _ in range(LINES_PER_PAGE)]
+
+
+def baseline_page_counts(data_dir: str = "data") -> Dict[str, int]:
+    """Pages per document type in the real corpus, falling back to BASELINE_PAGES."""
+    try:
+        from pypdf import PdfReader
+        counts = {}
+        for doc_type in BASELINE_PAGES:
+            directory = os.path.join(data_dir, doc_type)
+            counts[doc_type] = sum(
+                len(PdfReader(os.path.join(directory, name)).pages)
+                for name in os.listdir(directory) if name.endswith(".pdf")
+            )
+        return counts
+    except (OSError, ImportError):
+        return dict(BASELINE_PAGES)
+
+
+def generate_corpus(output_dir: str, scale: float, seed: int = 0, data_dir: str = "data") -> Dict:
+    """
+    Writes a synthetic corpus scale times the page count of data/, laid out like data/.
+
+    Generation is deterministic for a given scale and seed, and is skipped when
+    output_dir already holds a corpus generated with the same parameters.
+
+    Returns:
+        The corpus description also stored in output_dir/corpus.json
+    """
+    description_path = os.path.join(output_dir, "corpus.json")
+    target_pages = {doc_type: max(1, round(pages * scale)) for doc_type, pages in baseline_page_counts(data_dir).items()}
+    description = {"scale": scale, "seed": seed, "pages": target_pages}
+
+    if os.path.exists(description_path):
+        with open(description_path, "r", encoding="utf-8") as f:
+            existing = json.load(f)
+        if {key: existing.get(key) for key in description} == description:
+            return existing
+
+    files = {}
+    for doc_type, pages in target_pages.items():
+        directory = os.path.join(output_dir, doc_type)
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+        files[doc_type] = 0
+        remaining = pages
+        while remaining > 0:
+            file_pages = min(PAGES_PER_FILE, remaining)
+            rng = random.Random(f"{seed}:{doc_type}:{files[doc_type]}")
+            lines = LINE_GENERATORS[doc_type](rng, files[doc_type] + 1)
+            path = os.path.join(directory, FILE_NAMES[doc_type].format(files[doc_type] + 1))
+            with open(path, "wb") as f:
+                write_pdf(f, _pages(lines, file_pages))
+            files[doc_type] += 1
+            remaining -= file_pages
+
+    description["files"] = files
+    with open(description_path, "w", encoding="utf-8") as f:
+        json.dump(description, f, indent=2)
+
+    return description
+
+
+QUESTION_TEMPLATES = [
+    "What is the punishment for {offence}?",
+    "When can {actor} arrest a person accused of {offence} without a warrant?",
+    "What did the court hold on bail in cases of {offence}?",
+    "What are the prison rules for {actor} regarding custody of an accused?",
+    "Explain section {section} on {offence} and the relevant judgments",
+    "What procedure must the police follow after an FIR for {offence}?",
+    "Is {offence} a bailable offence and what precedents apply?"
+]
+
+
+def generate_questions(count: int, seed: int = 0) -> List[str]:
+    """Deterministic criminal-law questions drawn from the corpus vocabulary, all distinct."""
+    rng = random.Random(f"{seed}:questions")
+    questions = []
+    seen = set()
+    while len(questions) < count:
+        question = rng.choice(QUESTION_TEMPLATES).format(
+            offence=rng.choice(OFFENCES), actor=rng.choice(ACTORS), section=rng.randint(1, 511)
+        )
+        # Distinct wording keeps the query-embedding cache from flattering the numbers
+        if question in seen:
+            question = f"{question} (variant {len(questions)})"
+        seen.add(question)
+        questions.append(question)
+    return questions
@@ -0,0 +1,295 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+GREETING = re.compile(r"^\s*(?:hi|hello|hey|namaste|thanks|thank you)\b", re.IGNORECASE)
+CASE_TERMS = re.compile(r"\b(?:case|court|judgment|precedent|held|ruling|bail|appeal)\b", re.IGNORECASE)
+REGULATION_TERMS = re.compile(r"\b(?:prison|police|rule|rules|manual|regulation|custody|jail)\b", re.IGNORECASE)
+
+
+def default_tool_script(question: str, tool_names: List[str]) -> List[dict]:
+    """
+    Decides which tools a routing call "chooses", the way the real router tends to.
+
+    Greetings get no tool calls; everything else searches statutes, plus cases and
+    regulations when the question mentions them.
+    """
+    if GREETING.match(question):
+        return []
+
+    wanted = ["search_statutes"]
+    if CASE_TERMS.search(question):
+        wanted.append("search_cases")
+    if REGULATION_TERMS.search(question):
+        wanted.append("search_regulations")
+
+    return [
+        {"name": name, "args": {"query": question}, "id": f"call_{i}", "type": "tool_call"}
+        for i, name in enumerate(wanted) if name in tool_names
+    ]
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class MockChatGroq(BaseChatModel):
+    """
+    Deterministic, offline stand-in for ChatGroq.
+
+    Replies are built from the prompt's own words, seeded by a hash of the prompt,
+    so the same prompt always gets the same reply. latency is paid before the first
+    token and tokens_per_second paces the rest (0 means instant). Once tools are
+    bound, calls return the tool calls produced by tool_script instead of text.
+    """
+
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    response_tokens: int = 150
+    tool_names: List[str] = []
+    tool_script: Callable[[str, List[str]], List[dict]] = default_tool_script
+
+    @property
+    def _llm_type(self) -> str:
+        return "mock-groq"
+
+    def bind_tools(self, tools, **kwargs: Any) -> "MockChatGroq":
+        return self.model_copy(update={"tool_names": [getattr(t, "name", str(t)) for t in tools]})
+
+    def _reply(self, messages: List[BaseMessage]):
+        prompt = "\n".join(str(message.content) for message in messages)
+        question = next((str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+
+        tool_calls = self.tool_script(question, self.tool_names) if self.tool_names else []
+        if tool_calls:
+            return [], tool_calls, _estimate_tokens(prompt)
+
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        vocabulary = re.findall(r"[A-Za-z]{3,}", prompt) or ["answer"]
+        words = [rng.choice(vocabulary) for _ in range(self.response_tokens)]
+        return words, [], _estimate_tokens(prompt)
+
+    def _usage(self, input_tokens: int, output_tokens: int) -> dict:
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        words, tool_calls, input_tokens = self._reply(messages)
+        output_tokens = len(words) or len(tool_calls) * 20
+
+        delay = self.latency
+        if self.tokens_per_second > 0:
+            delay += output_tokens / self.tokens_per_second
+        if delay > 0:
+            time.sleep(delay)
+
+        message = AIMessage(content=" ".join(words), tool_calls=tool_calls,
+                            usage_metadata=self._usage(input_tokens, output_tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        words, tool_calls, input_tokens = self._reply(messages)
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        if tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                    for i, call in enumerate(tool_calls)
+                ],
+                usage_metadata=self._usage(input_tokens, len(tool_calls) * 20)
+            ))
+            return
+
+        for i, word in enumerate(words):
+            if self.tokens_per_second > 0:
+                time.sleep(1 / self.tokens_per_second)
+            usage = self._usage(input_tokens, len(words)) if i == len(words) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=word if i == 0 else " " + word, usage_metadata=usage
+            ))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class MockGroqServer:
+    """
+    Local HTTP server speaking Groq's chat completions API, for exercising the real client path.
+
+    Replies come from MockChatGroq, so they match the in-process mock, and are paced
+    the same way by latency and tokens_per_second. Streaming requests get server-sent
+    events. With rate_limit_every = n, every nth request is refused with a 429 and a
+    Retry-After of retry_after seconds. errors maps a model name to the statuses
+    (429s, 5xx) its first requests are refused with, in order, also with that
+    Retry-After. Every request's (model, status) is appended to calls. Use as a
+    context manager; base_url is what GROQ_BASE_URL (or build_llm's base_url)
+    should point at.
+    """
+
+    def __init__(self, latency: float = 0.0, tokens_per_second: float = 0.0,
+                 rate_limit_every: int = 0, retry_after: float = 1.0,
+                 errors: Optional[Dict[str, List[int]]] = None):
+        self.model = MockChatGroq()
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.errors = {model: list(statuses) for model, statuses in (errors or {}).items()}
+        self.requests = 0
+        self.calls: List[Tuple[str, int]] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self) -> "MockGroqServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, model: str) -> Tuple[int, int]:
+        """Numbers the request and picks the status it gets."""
+        with self._lock:
+            self.requests += 1
+            status = 200
+            if self.errors.get(model):
+                status = self.errors[model].pop(0)
+            elif self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+                status = 429
+            self.calls.append((model, status))
+            return self.requests, status
+
+    def _reply(self, body: Dict):
+        roles = {"system": SystemMessage, "user": HumanMessage}
+        messages = [roles.get(message["role"], AIMessage)(content=message.get("content") or "")
+                    for message in body["messages"]]
+        tool_names = [tool["function"]["name"] for tool in body.get("tools") or []]
+        return self.model.model_copy(update={"tool_names": tool_names})._reply(messages)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                try:
+                    self._respond()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on the request, e.g. a hedged call that lost the race
+                    self.close_connection = True
+
+            def _respond(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if not self.path.endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                count, status = server._count(body["model"])
+                if status == 429:
+                    self._send(429, {"error": {"message": "Rate limit reached", "type": "tokens"}},
+                               {"retry-after": str(server.retry_after)})
+                    return
+                if status != 200:
+                    self._send(status, {"error": {"message": "Service unavailable", "type": "internal_server_error"}},
+                               {"retry-after": str(server.retry_after)})
+                    return
+
+                words, tool_calls, input_tokens = server._reply(body)
+                output_tokens = len(words) or len(tool_calls) * 20
+                usage = {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                         "total_tokens": input_tokens + output_tokens}
+                calls = [{"id": call["id"], "type": "function",
+                          "function": {"name": call["name"], "arguments": json.dumps(call["args"])}}
+                         for call in tool_calls]
+                envelope = {"id": f"chatcmpl-{count}", "created": int(time.time()), "model": body["model"]}
+
+                if server.latency > 0:
+                    time.sleep(server.latency)
+
+                if not body.get("stream"):
+                    if server.tokens_per_second > 0:
+                        time.sleep(output_tokens / server.tokens_per_second)
+                    message = {"role": "assistant", "content": " ".join(words)}
+                    if calls:
+                        message["tool_calls"] = calls
+                    self._send(200, {**envelope, "object": "chat.completion", "usage": usage, "choices": [
+                        {"index": 0, "message": message, "finish_reason": "tool_calls" if calls else "stop"}
+                    ]})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+
+                def event(delta: Dict, finish_reason: Optional[str] = None, **extra):
+                    chunk = {**envelope, "object": "chat.completion.chunk", **extra,
+                             "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                if calls:
+                    event({"role": "assistant", "tool_calls": [{**call, "index": i} for i, call in enumerate(calls)]})
+                for i, word in enumerate(words):
+                    if server.tokens_per_second > 0:
+                        time.sleep(1 / server.tokens_per_second)
+                    event({"role": "assistant", "content": word if i == 0 else " " + word})
+                event({}, "tool_calls" if calls else "stop", x_groq={"usage": usage})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
+
+
+class HashingEmbeddingModel:
+    """
+    Stand-in for the SentenceTransformer when the real weights aren't available.
+
+    Tokens are hashed into a fixed number of dimensions, so vectors are deterministic
+    across processes and cosine similarity still rewards shared words. Encoding is
+    far cheaper than a transformer, so ingestion numbers taken with it are not
+    comparable to numbers taken with the real model.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def encode(self, texts: List[str], batch_size: int = 64, **kwargs: Any) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"[a-z0-9]+", text.lower()):
+                digest = hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest()
+                vectors[row, int.from_bytes(digest, "little") % self.dimensions] += 1
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
@@ -0,0 +1,91 @@
+"""
+Benchmarks the pipeline at several synthetic corpus sizes and writes one JSON result file.
+
+    python -m benchmarks.run --scales 10 100 --embeddings hash
+
+Results land in benchmarks/results/<commit>.json by default; compare two runs with
+python -m benchmarks.compare.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_info() -> dict:
+    def git(*args) -> str:
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def run_scale(scale: float, suite_args: list) -> dict:
+    command = [sys.executable, "-m", "benchmarks.suite", "--scale", str(scale), *suite_args]
+    print(f"Running benchmarks at {scale:g}x: {' '.join(command)}")
+
+    process = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    for line in process.stdout.splitlines():
+        if line.startswith("BENCHMARK_RESULTS "):
+            return json.loads(line[len("BENCHMARK_RESULTS "):])
+
+    sys.stderr.write(process.stdout[-4000:] + process.stderr[-4000:])
+    raise RuntimeError(f"Benchmark at {scale:g}x failed with exit code {process.returncode}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite at several corpus sizes")
+    parser.add_argument("--scales", type=float, nargs="+", default=[10], help="Corpus sizes as multiples of data/, e.g. 10 100 1000")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--work-dir", default=os.path.join("benchmarks", ".work"))
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Mock LLM seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Mock LLM output rate; 0 is instant")
+    parser.add_argument("--llm", choices=["mock", "http"], default="mock",
+                        help="'http' sends LLM calls through the real gateway to a local mock Groq server")
+    parser.add_argument("--embeddings", choices=["model", "hash"], default="model",
+                        help="'hash' swaps in a hashing embedder for machines without the model weights")
+    parser.add_argument("--skip-ingest", action="store_true")
+    args = parser.parse_args()
+
+    suite_args = [
+        "--work-dir", os.path.abspath(args.work_dir),
+        "--queries", str(args.queries),
+        "--concurrency", *map(str, args.concurrency),
+        "--llm-latency", str(args.llm_latency),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--llm", args.llm,
+        "--embeddings", args.embeddings
+    ]
+    if args.skip_ingest:
+        suite_args.append("--skip-ingest")
+
+    git = git_info()
+    report = {
+        **git,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "work_dir")},
+        "scales": {f"{scale:g}x": run_scale(scale, suite_args) for scale in args.scales}
+    }
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{git['commit']}{'-dirty' if git['dirty'] else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Runs every benchmark against one synthetic corpus and prints the results as JSON.
+
+Configuration (DATA_DIR, CHROMA_PATH, caches) is read from the environment at
+import time, so each scale runs in a fresh interpreter; benchmarks/run.py does
+that for every requested scale and collects the results.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.corpus import generate_corpus, generate_questions
+
+
+def latency_stats(seconds: List[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(seconds),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3)
+    }
+
+
+def directory_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+
+def timed(fn: Callable, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def configure(args) -> Dict:
+    """Generates the corpus and points the app's configuration at it; must run before importing src."""
+    corpus_dir = os.path.join(args.work_dir, f"corpus_x{args.scale:g}")
+    corpus = generate_corpus(corpus_dir, args.scale, seed=args.seed)
+
+    os.environ["DATA_DIR"] = corpus_dir
+    os.environ["CHROMA_PATH"] = os.path.join(args.work_dir, f"chroma_x{args.scale:g}")
+    os.environ["ANSWER_CACHE_ENABLED"] = "false"
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+    return corpus
+
+
+def install_embeddings(args):
+    from benchmarks.mocks import HashingEmbeddingModel
+    from src.embeddings import EmbeddingService
+    from src.resources import registry
+
+    if args.embeddings == "hash":
+        service = EmbeddingService()
+        service._model = HashingEmbeddingModel()
+        registry.override("embedding_service", service)
+
+
+def install_llms(args):
+    from benchmarks.mocks import MockChatGroq, MockGroqServer
+    from src.resources import registry
+
+    # The tool-bound router is derived from "llm", so one override covers every agent
+    if args.llm == "http":
+        # The real gateway and Groq client, talking HTTP to a local server; it lives until the process exits
+        from src.llm_gateway import build_llm
+        server = MockGroqServer(latency=args.llm_latency, tokens_per_second=args.tokens_per_second).__enter__()
+        registry.override("llm", build_llm(base_url=server.base_url))
+    else:
+        registry.override("llm", MockChatGroq(latency=args.llm_latency, tokens_per_second=args.tokens_per_second))
+
+
+def bench_ingestion(corpus: Dict) -> Dict:
+    from src.config import CHROMA_PATH
+    from src.ingestion.vectorstore import peak_rss_mb, sync_vectorstore
+
+    shutil.rmtree(CHROMA_PATH, ignore_errors=True)
+
+    start = time.perf_counter()
+    client = sync_vectorstore()
+    seconds = time.perf_counter() - start
+
+    chunks = sum(collection.count() for collection in client.list_collections())
+    pages = sum(corpus["pages"].values())
+
+    # A second sync with nothing changed should only hash files
+    resync_seconds = timed(sync_vectorstore)
+
+    return {
+        "pages": pages,
+        "chunks": chunks,
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(pages / seconds, 2),
+        "chunks_per_second": round(chunks / seconds, 2),
+        "noop_resync_seconds": round(resync_seconds, 3),
+        "index_mb": round(directory_mb(CHROMA_PATH), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+
+
+def bench_retrieval(questions: List[str], k: int) -> Dict:
+    from src.tools.retrieval_tools import retrieve_statutes, retrieve_cases, retrieve_regulations, search_all
+
+    results = {}
+    # "all" is the top k of every type for one query, a single search under INDEX_LAYOUT=unified
+    for name, retrieve in [("statutes", retrieve_statutes), ("cases", retrieve_cases),
+                           ("regulations", retrieve_regulations), ("all", search_all)]:
+        # Warm-up opens the collection and maps the lexical index
+        retrieve(questions[0], k)
+        results[name] = latency_stats([timed(retrieve, question, k) for question in questions[1:]])
+    return results
+
+
+def bench_backends(questions: List[str], k: int) -> Dict:
+    """
+    Recall@k and search latency of each dense backend against exact float32 search.
+
+    Each collection is exported with int8 and with binary codes into the work
+    directory; ground truth is a brute-force scan of the full-precision vectors.
+    """
+    from src.config import CHROMA_PATH
+    from src.embeddings import get_embedding_service
+    from src.resources import get_chroma_client
+    from src.ingestion.quantized_index import QuantizedIndex, build_quantized_index
+    from src.ingestion.vectorstore import iter_collection_vectors
+    from src.tools.retrieval_tools import COLLECTIONS
+
+    query_embeddings = get_embedding_service().embed_queries(questions)
+    client = get_chroma_client()
+
+    results = {}
+    for collection_name in sorted(set(COLLECTIONS.values())):
+        collection = client.get_collection(collection_name)
+        indexes = {}
+        for quantization in ("int8", "binary"):
+            index_dir = os.path.join(CHROMA_PATH, "bench_quantized", quantization, collection_name)
+            build_quantized_index(iter_collection_vectors(collection), collection.count(), index_dir, quantization)
+            indexes[quantization] = QuantizedIndex(index_dir)
+
+        vectors = np.asarray(indexes["int8"].vectors)
+        ids = indexes["int8"].ids
+        truth = []
+        for embedding in query_embeddings:
+            query = np.asarray(embedding, dtype=np.float32)
+            truth.append({ids[row] for row in np.argsort(-(vectors @ (query / np.linalg.norm(query))))[:k]})
+
+        searches = {
+            "chroma": lambda embedding: collection.query(query_embeddings=[embedding], n_results=k,
+                                                         include=[])["ids"][0],
+            **{quantization: (lambda embedding, index=index: [chunk_id for chunk_id, _ in index.search(embedding, k)])
+               for quantization, index in indexes.items()}
+        }
+
+        results[collection_name] = {"chunks": len(ids), "ivf_lists": indexes["int8"].meta["ivf_lists"]}
+        for backend, search in searches.items():
+            search(query_embeddings[0])
+            latencies, recall = [], []
+            for embedding, expected in zip(query_embeddings, truth):
+                start = time.perf_counter()
+                found = search(embedding)
+                latencies.append(time.perf_counter() - start)
+                recall.append(len(expected & set(found)) / max(len(expected), 1))
+            results[collection_name][backend] = {"recall": round(float(np.mean(recall)), 4), **latency_stats(latencies)}
+
+    shutil.rmtree(os.path.join(CHROMA_PATH, "bench_quantized"), ignore_errors=True)
+    return results
+
+
+def bench_run_query(questions: List[str]) -> Dict:
+    from src.agents.orchestrator import run_query
+
+    run_query(questions[0])
+    return latency_stats([timed(run_query, question) for question in questions[1:]])
+
+
+def bench_concurrency(question_sets: List[List[str]], concurrency: List[int]) -> Dict:
+    from src.agents.orchestrator import run_query
+
+    results = {}
+    for workers, questions in zip(concurrency, question_sets):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            start = time.perf_counter()
+            latencies = list(pool.map(lambda question: timed(run_query, question), questions))
+            seconds = time.perf_counter() - start
+        results[str(workers)] = {"qps": round(len(questions) / seconds, 2), **latency_stats(latencies)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark one synthetic corpus size")
+    parser.add_argument("--scale", type=float, required=True, help="Corpus size as a multiple of data/")
+    parser.add_argument("--work-dir", default="benchmarks/.work")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--llm", choices=["mock", "http"], default="mock")
+    parser.add_argument("--embeddings", choices=["model", "hash"], default="model")
+    parser.add_argument("--skip-ingest", action="store_true", help="Reuse the vector database from a previous run")
+    args = parser.parse_args()
+
+    corpus = configure(args)
+    install_embeddings(args)
+    install_llms(args)
+
+    # Each phase gets its own questions so the query-embedding cache never serves a repeat
+    questions = generate_questions((args.queries + 1) * (2 + len(args.concurrency)), seed=args.seed)
+    phases = [questions[i:i + args.queries + 1] for i in range(0, len(questions), args.queries + 1)]
+    retrieval_questions, query_questions, concurrent_questions = phases[0], phases[1], phases[2:]
+
+    results = {"corpus": corpus}
+    if not args.skip_ingest:
+        results["ingestion"] = bench_ingestion(corpus)
+    results["retrieval"] = bench_retrieval(retrieval_questions, args.k)
+    results["backends"] = bench_backends(retrieval_questions, args.k)
+    results["run_query"] = bench_run_query(query_questions)
+    results["concurrent"] = bench_concurrency(concurrent_questions, args.concurrency)
+
+    from src.ingestion.vectorstore import peak_rss_mb
+    results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+
+    # Ingestion progress goes to stdout too, so the results are marked for run.py to find
+    print("BENCHMARK_RESULTS " + json.dumps(results))
+
+
+# The guard keeps spawned ingestion workers from re-running the suite
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,28 @@
-import sys
 import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import argparse
+import shutil
 
-from src.ingestion.loader import load_and_chunk_all_documents
-from src.ingestion.vectorstore import build_vectorstore
+from src.config import CHROMA_PATH
+from src.ingestion.vectorstore import sync_vectorstore
+from src.ingestion.artifact import pack_artifact
 
-print("Starting vector database build process...")
+# The guard keeps spawned parser processes from re-running the build
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or incrementally update the vector database")
+    parser.add_argument("--rebuild", action="store_true", help="Delete the existing database and re-embed everything")
+    parser.add_argument("--artifact", metavar="PATH",
+                        help="Also pack the database into a versioned .tar.gz (a directory gets a generated file name)")
+    args = parser.parse_args()
 
-all_chunked_docs = load_and_chunk_all_documents()
+    if args.rebuild and os.path.exists(CHROMA_PATH):
+        print(f"Removing existing database at {CHROMA_PATH}...")
+        shutil.rmtree(CHROMA_PATH)
 
-build_vectorstore(all_chunked_docs)
+    print("Starting vector database build process...")
 
-print("Vector database build complete!")
+    sync_vectorstore()
+
+    print("Vector database build complete!")
+
+    if args.artifact:
+        print(f"Index artifact written to {pack_artifact(args.artifact)}")
@@ -0,0 +1,16 @@
+import argparse
+
+from src.resources import get_chroma_client
+from src.ingestion.vectorstore import export_quantized_collection
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export every collection to the memory-mapped index used by RETRIEVAL_BACKEND=quantized"
+    )
+    parser.parse_args()
+
+    client = get_chroma_client()
+    for collection in client.list_collections():
+        export_quantized_collection(client.get_collection(collection.name))
+
+    print("Quantized export complete! Later syncs keep it up to date.")
@@ -0,0 +1,26 @@
+import argparse
+import logging
+
+from src.config import BATCH_CONCURRENCY, BATCH_WAVE_SIZE
+from src.ingestion.artifact import prepare_index
+from src.agents.batch import read_questions, run_batch
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a file of questions, writing one JSON line per answer")
+    parser.add_argument("--input", required=True,
+                        help="Questions: plain text (one per line) or .jsonl with 'question' and optional 'id'")
+    parser.add_argument("--output", required=True, help="JSONL results file; existing answers in it are skipped")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Questions answered at once")
+    parser.add_argument("--wave-size", type=int, default=BATCH_WAVE_SIZE, help="Questions routed and searched together")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    prepare_index()
+
+    questions = read_questions(args.input)
+    print(f"Answering {len(questions)} questions into {args.output}...")
+
+    summary = run_batch(questions, args.output, concurrency=args.concurrency, wave_size=args.wave_size)
+
+    print(f"Done: {summary['answered']} answered, {summary['skipped']} already done, {summary['failed']} failed")
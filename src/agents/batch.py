@@ -0,0 +1,292 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+from src.agents.orchestrator import (
+    AgentState,
+    SEARCH_K,
+    TOOL_COLLECTIONS,
+    initial_state_for,
+    is_cacheable,
+    route_question
+)
+from src.tools.result_store import RetrievalStore, normalize_query, use_store
+from src.tools.retrieval_tools import retrieve_many
+from src.config import BATCH_CONCURRENCY, BATCH_WAVE_SIZE, BATCH_MAX_RETRIES
+from src.answer_cache import get_answer_cache
+from src.embeddings import get_embedding_service
+from src.llm_gateway import LLMGateway, backoff_delay, is_retryable, status_code
+from src.resources import get_graph, get_llm
+from src.tracing import span, trace_request
+
+logger = logging.getLogger(__name__)
+
+BatchItem = Tuple[str, str]
+
+
+def question_id(question: str) -> str:
+    return hashlib.sha256(normalize_query(question).encode("utf-8")).hexdigest()[:16]
+
+
+def read_questions(path: str) -> List[BatchItem]:
+    """
+    Reads (id, question) pairs from a text file (one question per line) or a JSONL file
+    of {"question": ..., "id": ...} objects. Questions without an id get one derived from
+    their text, so a restarted job recognises what it already answered.
+    """
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                question = record["question"]
+                items.append((str(record.get("id") or question_id(question)), question))
+            else:
+                items.append((question_id(line), line))
+    return items
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """IDs already answered in an existing output file; failed questions are retried."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    # A crash can cut the last line inside a multi-byte character; that line is dropped below anyway
+    with open(output_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash; the question is simply asked again
+                continue
+            if "answer" in record and not record.get("error"):
+                done.add(record["id"])
+    return done
+
+
+def ends_mid_line(output_path: str) -> bool:
+    """Whether the file's last line was left without its newline, e.g. by a crash."""
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return False
+    # Compared as bytes: the cut may fall inside a multi-byte character
+    with open(output_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+class RateLimitGate:
+    """Shared pause that holds every worker back after a rate-limit response."""
+
+    def __init__(self):
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+def call_with_retry(fn: Callable, gate: RateLimitGate, max_retries: int = BATCH_MAX_RETRIES):
+    """
+    Calls fn, retrying rate limits, server errors and connection failures.
+
+    A 429 pauses every worker sharing the gate for the server's Retry-After (or an
+    exponential backoff with jitter), rather than letting each worker keep hammering
+    the API on its own schedule; it does so even when fn is not retried.
+    """
+    for attempt in range(max_retries + 1):
+        gate.wait()
+        try:
+            return fn()
+        except Exception as error:
+            delay = backoff_delay(attempt, error)
+            if status_code(error) == 429:
+                gate.pause(delay)
+            if attempt == max_retries or not is_retryable(error):
+                raise
+
+            logger.warning("Retrying after %s (attempt %d, waiting %.1fs)", error, attempt + 1, delay)
+            time.sleep(delay)
+
+
+def step_retries() -> int:
+    """
+    Retries for a whole routing or answering step.
+
+    The LLM gateway already retries every call and falls back to the other model, so
+    retrying the step around it would multiply those requests; only an LLM without
+    retries of its own (e.g. a stand-in set through the registry) gets them here.
+    """
+    return 0 if isinstance(get_llm(), LLMGateway) else BATCH_MAX_RETRIES
+
+
+def _tool_searches(state: AgentState) -> List[Tuple[str, str]]:
+    """(collection, query) pairs the routing decision in state asks for."""
+    messages = state.get("messages") or []
+    if not messages:
+        return []
+    return [
+        (TOOL_COLLECTIONS[call["name"]], call["args"]["query"])
+        for call in getattr(messages[-1], "tool_calls", None) or []
+        if call["name"] in TOOL_COLLECTIONS
+    ]
+
+
+def prefetch_searches(states: List[AgentState]) -> List[RetrievalStore]:
+    """
+    Runs every search the routed states ask for, batched per collection.
+
+    All distinct queries are embedded in one pass, then each collection gets a single
+    multi-query search. The results are handed back as one pre-filled RetrievalStore
+    per state, so the graph's tools find them instead of searching again.
+    """
+    wanted: Dict[str, Dict[str, str]] = {}
+    for state in states:
+        for collection, query in _tool_searches(state):
+            wanted.setdefault(collection, {}).setdefault(normalize_query(query), query)
+
+    stores = [RetrievalStore() for _ in states]
+    if not wanted:
+        return stores
+
+    with span("batch.embed_queries"):
+        unique_queries = list({query for queries in wanted.values() for query in queries.values()})
+        # Fills the query-embedding cache, so the per-collection searches below don't encode again
+        get_embedding_service().embed_queries(unique_queries)
+
+    results: Dict[Tuple[str, str], list] = {}
+    for collection, queries in wanted.items():
+        try:
+            found = retrieve_many(collection, list(queries.values()), SEARCH_K)
+        except Exception as error:
+            # The tools will search on their own for whatever is missing from the store
+            logger.warning("Batched %s search failed: %s", collection, error)
+            continue
+        for normalized, documents in zip(queries, found):
+            results[(collection, normalized)] = documents
+
+    for state, store in zip(states, stores):
+        for collection, query in _tool_searches(state):
+            documents = results.get((collection, normalize_query(query)))
+            if documents is not None:
+                store.put(collection, query, SEARCH_K, documents)
+
+    return stores
+
+
+def _answer(state: AgentState, store: RetrievalStore, gate: RateLimitGate, retries: int) -> AgentState:
+    messages = state.get("messages") or []
+    # Greetings, refusals and direct LLM answers were settled by routing alone
+    if not state.get("retrieved_docs") and not getattr(messages[-1], "tool_calls", None):
+        return state
+
+    with trace_request("batch_query"), use_store(store):
+        return call_with_retry(lambda: get_graph().invoke(dict(state)), gate, retries)
+
+
+def answer_wave(items: List[BatchItem], pool: ThreadPoolExecutor, gate: RateLimitGate) -> Iterator[Dict]:
+    """Routes, searches and answers one wave of questions, yielding result records as they finish."""
+    cache = get_answer_cache()
+    retries = step_retries()
+    remaining = []
+
+    for item_id, question in items:
+        cached_answer = cache.lookup(question) if cache is not None else None
+        if cached_answer is not None:
+            yield {"id": item_id, "question": question, "answer": cached_answer, "cached": True}
+        else:
+            remaining.append((item_id, question))
+
+    routing = {
+        pool.submit(call_with_retry, lambda question=question: route_question(initial_state_for(question)), gate,
+                    retries):
+            (item_id, question)
+        for item_id, question in remaining
+    }
+
+    routed: List[Tuple[BatchItem, AgentState]] = []
+    for future in as_completed(routing):
+        item_id, question = routing[future]
+        try:
+            routed.append(((item_id, question), future.result()))
+        except Exception as error:
+            yield {"id": item_id, "question": question, "error": f"routing failed: {error}"}
+
+    stores = prefetch_searches([state for _, state in routed])
+
+    answering = {
+        pool.submit(_answer, state, store, gate, retries): item
+        for (item, state), store in zip(routed, stores)
+    }
+
+    for future in as_completed(answering):
+        item_id, question = answering[future]
+        try:
+            final_state = future.result()
+        except Exception as error:
+            yield {"id": item_id, "question": question, "error": str(error)}
+            continue
+
+        if cache is not None and is_cacheable(final_state):
+            cache.store(question, final_state["final_answer"])
+        yield {"id": item_id, "question": question, "answer": final_state["final_answer"]}
+
+
+def run_batch(items: Iterable[BatchItem], output_path: str, concurrency: int = BATCH_CONCURRENCY,
+              wave_size: int = BATCH_WAVE_SIZE) -> Dict[str, int]:
+    """
+    Answers many questions, appending one JSON line per question to output_path.
+
+    Questions already answered in output_path are skipped, so a job that was stopped
+    can simply be started again. Each wave of questions is routed concurrently, its
+    searches are embedded and run in batches, and the citation and response calls run
+    with at most `concurrency` questions in flight.
+
+    Args:
+        items: (id, question) pairs, e.g. from read_questions
+        output_path: JSONL file results are appended to
+        concurrency: Questions whose LLM calls may run at the same time
+        wave_size: Questions routed and searched together
+
+    Returns:
+        Counts of answered, skipped and failed questions
+    """
+    items = list(items)
+    done = completed_ids(output_path)
+    pending = [item for item in items if item[0] not in done]
+    # The output may also hold answers to questions that are not in this run
+    summary = {"answered": 0, "skipped": len(done & {item_id for item_id, _ in items}), "failed": 0}
+
+    gate = RateLimitGate()
+    torn = ends_mid_line(output_path)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool, \
+            open(output_path, "a", encoding="utf-8") as out:
+        # Terminate a line left half-written by a crash, so it doesn't swallow the next record
+        if torn:
+            out.write("\n")
+
+        for start in range(0, len(pending), wave_size):
+            wave = pending[start:start + wave_size]
+            logger.info("Batch wave %d-%d of %d", start + 1, start + len(wave), len(pending))
+
+            for record in answer_wave(wave, pool, gate):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                summary["failed" if "error" in record else "answered"] += 1
+
+    return summary
@@ -1,18 +1,15 @@
-import os
-from typing import List, Dict
+import re
+from typing import List, Dict, Optional, Set, Tuple
 from langchain_core.documents import Document
-from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 from dotenv import load_dotenv
+from src.config import CITATION_CONTEXT_TOKENS
+from src.agents.context_builder import build_context, location_label
+from src.tracing import span, record_llm_usage
+from src.resources import get_llm
 
 load_dotenv()
 
-llm = ChatGroq(
-    model=os.getenv("LLM_MODEL", "llama-3.1-70b-versatile"),
-    temperature=0,
-    groq_api_key=os.getenv("GROQ_API_KEY")
-)
-
 system_message = """You are a legal citation expert. Your task is to analyze retrieved legal documents and extract relevant citations that should be referenced when answering the user's question.
 
 For each relevant document, create a properly formatted citation including:
@@ -39,7 +36,7 @@ Format your response as:
 If a category has no relevant citations, write "None"."""
 
 
-def extract_citations(question: str, retrieved_docs: Dict[str, List[Document]]) -> str:
+def extract_citations(question: str, retrieved_docs: Dict[str, List[Document]]) -> Tuple[str, BaseMessage]:
     """
     Extract and format relevant citations from retrieved documents.
 
@@ -48,57 +45,151 @@ def extract_citations(question: str, retrieved_docs: Dict[str, List[Document]])
         retrieved_docs: Dict with keys 'statutes', 'cases', 'regulations' mapping to lists of Documents
 
     Returns:
-        Formatted citation string from LLM
+        Formatted citation string from LLM, and the LLM reply itself
     """
 
     # Build the prompt with all retrieved documents
-    prompt = f"Question: {question}\n\n"
-    prompt += "Retrieved Legal Documents:\n\n"
+    blocks = build_context(retrieved_docs, CITATION_CONTEXT_TOKENS, max_chars_per_block=500)
 
-    statute_docs = retrieved_docs.get("statutes", [])
-    case_docs = retrieved_docs.get("cases", [])
-    regulation_docs = retrieved_docs.get("regulations", [])
+    parts = [f"Question: {question}\n\n", "Retrieved Legal Documents:\n\n"]
 
-    if statute_docs:
-        prompt += "=== STATUTES ===\n"
-        for i, doc in enumerate(statute_docs):
-            source = doc.metadata.get("source", "Unknown").replace(".pdf", "")
-            page = doc.metadata.get("page", "")
-            page_str = f"Page {int(page) + 1}" if page != "" else "Page N/A"
+    for category, heading, label in [
+        ("statutes", "=== STATUTES ===", "Statute"),
+        ("cases", "=== CASE LAW ===", "Case"),
+        ("regulations", "=== REGULATIONS ===", "Regulation")
+    ]:
+        if blocks[category]:
+            parts.append(f"\n{heading}\n")
+            for i, block in enumerate(blocks[category]):
+                parts.append(f"\n[{label} {i+1}] {block.source}, {block.page_str}\n{block.text}\n")
+
+    parts.append("\n\nAnalyze these documents and provide relevant citations for answering the question.")
+    prompt = "".join(parts)
+
+    messages = [
+        SystemMessage(content=system_message),
+        HumanMessage(content=prompt)
+    ]
 
-            content_preview = doc.page_content[:500] + "..." if len(doc.page_content) > 500 else doc.page_content
+    with span("llm.citations") as llm_span:
+        response = get_llm().invoke(messages)
+        record_llm_usage(llm_span, response)
 
-            prompt += f"\n[Statute {i+1}] {source}, {page_str}\n{content_preview}\n"
+    return response.content, response
 
-    if case_docs:
-        prompt += "\n=== CASE LAW ===\n"
-        for i, doc in enumerate(case_docs):
-            source = doc.metadata.get("source", "Unknown").replace(".pdf", "")
-            page = doc.metadata.get("page", "")
-            page_str = f"Page {int(page) + 1}" if page != "" else "Page N/A"
 
-            content_preview = doc.page_content[:500] + "..." if len(doc.page_content) > 500 else doc.page_content
+CITATION_SECTIONS = [
+    ("statutes", "STATUTE CITATIONS"),
+    ("cases", "CASE LAW CITATIONS"),
+    ("regulations", "REGULATION CITATIONS")
+]
+
+filter_system_message = """You are a legal citation expert. You will be given a question and a numbered list of retrieved legal documents.
+
+Reply with the numbers of the documents that are actually relevant to answering the question, separated by commas (for example: 1, 3, 4).
+If none of them are relevant, reply with "None". Do not write anything else."""
+
 
-            prompt += f"\n[Case {i+1}] {source}, {page_str}\n{content_preview}\n"
+def _citation_candidates(retrieved_docs: Dict[str, List[Document]]) -> List[Tuple[str, str, str, Document]]:
+    """
+    Collects one candidate per (source, page) for every category, best retrieval score first.
+
+    Returns:
+        List of (category, source name, page string, Document) tuples
+    """
+    candidates = []
+
+    for category, _ in CITATION_SECTIONS:
+        docs = sorted(
+            retrieved_docs.get(category, []),
+            key=lambda doc: doc.metadata.get("score", 0.0),
+            reverse=True
+        )
 
-    if regulation_docs:
-        prompt += "\n=== REGULATIONS ===\n"
-        for i, doc in enumerate(regulation_docs):
+        seen = set()
+        for doc in docs:
             source = doc.metadata.get("source", "Unknown").replace(".pdf", "")
-            page = doc.metadata.get("page", "")
-            page_str = f"Page {int(page) + 1}" if page != "" else "Page N/A"
+            page_str = location_label(doc.metadata)
+
+            if (source, page_str) in seen:
+                continue
+            seen.add((source, page_str))
+
+            candidates.append((category, source, page_str, doc))
+
+    return candidates
+
+
+def _format_citations(candidates: List[Tuple[str, str, str, Document]], keep: Optional[Set[int]] = None) -> str:
+    sections = []
+
+    for category, title in CITATION_SECTIONS:
+        lines = []
+        for i, (candidate_category, source, page_str, doc) in enumerate(candidates):
+            if candidate_category != category or (keep is not None and i not in keep):
+                continue
+
+            entry = f"{len(lines) + 1}. {source}, {page_str}"
+            if "score" in doc.metadata:
+                entry += f" - Retrieval relevance {doc.metadata['score']:.2f}"
+            lines.append(entry)
 
-            content_preview = doc.page_content[:500] + "..." if len(doc.page_content) > 500 else doc.page_content
+        sections.append(f"**{title}:**\n" + ("\n".join(lines) if lines else "None"))
 
-            prompt += f"\n[Regulation {i+1}] {source}, {page_str}\n{content_preview}\n"
+    return "\n\n".join(sections)
 
-    prompt += "\n\nAnalyze these documents and provide relevant citations for answering the question."
+
+def build_citations(retrieved_docs: Dict[str, List[Document]]) -> str:
+    """
+    Build the citation block directly from document metadata, without an LLM call.
+
+    Args:
+        retrieved_docs: Dict with keys 'statutes', 'cases', 'regulations' mapping to lists of Documents
+
+    Returns:
+        Formatted citation string in the same layout the citation agent uses
+    """
+    return _format_citations(_citation_candidates(retrieved_docs))
+
+
+def filter_citations(question: str, retrieved_docs: Dict[str, List[Document]]) -> Tuple[str, Optional[BaseMessage]]:
+    """
+    Build metadata citations and let the LLM drop the ones that are not relevant.
+
+    The LLM only answers with document numbers, which is a much shorter round-trip
+    than having it write the whole citation block.
+
+    Args:
+        question: The user's original question
+        retrieved_docs: Dict with keys 'statutes', 'cases', 'regulations' mapping to lists of Documents
+
+    Returns:
+        Formatted citation string with only the documents the LLM kept, and the LLM
+        reply (None when there was nothing to filter)
+    """
+    candidates = _citation_candidates(retrieved_docs)
+    if not candidates:
+        return _format_citations(candidates), None
+
+    listing = [f"Question: {question}\n", "Documents:"]
+    for i, (_, source, page_str, doc) in enumerate(candidates):
+        preview = doc.page_content[:300].replace("\n", " ")
+        listing.append(f"[{i + 1}] {source}, {page_str}: {preview}")
 
     messages = [
-        SystemMessage(content=system_message),
-        HumanMessage(content=prompt)
+        SystemMessage(content=filter_system_message),
+        HumanMessage(content="\n".join(listing))
     ]
 
-    response = llm.invoke(messages)
+    with span("llm.citation_filter", documents=len(candidates)) as llm_span:
+        response = get_llm().invoke(messages)
+        record_llm_usage(llm_span, response)
+
+    numbers = {int(n) - 1 for n in re.findall(r"\d+", response.content)}
+    keep = {n for n in numbers if 0 <= n < len(candidates)}
+
+    if not keep and "none" not in response.content.lower():
+        # Unparseable reply: fall back to citing everything rather than nothing
+        keep = None
 
-    return response.content
+    return _format_citations(candidates, keep), response
@@ -0,0 +1,132 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from langchain_core.documents import Document
+
+# Rough but dependency-free token estimate for English legal text
+CHARS_PER_TOKEN = 4
+
+# Overlaps shorter than this are more likely coincidence than splitter overlap
+MIN_OVERLAP_CHARS = 20
+
+# Blocks that would be cut below this are dropped instead of sent as a fragment
+MIN_BLOCK_TOKENS = 40
+
+CATEGORIES = ["statutes", "cases", "regulations"]
+
+
+@dataclass
+class ContextBlock:
+    """Text from one source page, after overlapping chunks have been merged."""
+    category: str
+    source: str
+    page_str: str
+    text: str
+    score: float
+    docs: List[Document] = field(default_factory=list)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _doc_score(doc: Document) -> float:
+    # A reranker score, when present, is the better relevance signal
+    return doc.metadata.get("rerank_score", doc.metadata.get("score", 0.0))
+
+
+def location_label(metadata: Dict) -> str:
+    """Where a chunk sits: "Page 12", or for structure-aware chunks e.g. "Section 302, Pages 61-62"."""
+    page = metadata.get("page", "")
+    if page == "":
+        label = "Page N/A"
+    elif metadata.get("page_end", page) != page:
+        label = f"Pages {int(page) + 1}-{int(metadata['page_end']) + 1}"
+    else:
+        label = f"Page {int(page) + 1}"
+
+    if metadata.get("section"):
+        label = f"Section {metadata['section']}, {label}"
+    return label
+
+
+def _merge(first: str, second: str) -> Optional[str]:
+    """Joins two chunks if one contains the other or the end of first is the start of second."""
+    if second in first:
+        return first
+    if first in second:
+        return second
+
+    for size in range(min(len(first), len(second)) - 1, MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+
+    return None
+
+
+def _merge_page(texts: List[str]) -> List[str]:
+    merged = []
+    for text in texts:
+        for i, existing in enumerate(merged):
+            combined = _merge(existing, text) or _merge(text, existing)
+            if combined is not None:
+                merged[i] = combined
+                break
+        else:
+            merged.append(text)
+
+    # A later chunk can bridge two blocks that were separate until it arrived
+    if len(merged) > 1 and len(merged) < len(texts):
+        return _merge_page(merged)
+    return merged
+
+
+def build_context(retrieved_docs: Dict[str, List[Document]], token_budget: int,
+                  max_chars_per_block: Optional[int] = None) -> Dict[str, List[ContextBlock]]:
+    """
+    Deduplicate, merge and budget retrieved chunks for a prompt.
+
+    Chunks from the same source page are merged wherever the splitter's overlap makes
+    them contiguous, and duplicates are dropped. Blocks are then admitted best score
+    first until token_budget is spent; the block that crosses the budget is truncated
+    if enough room is left, otherwise skipped.
+
+    Args:
+        retrieved_docs: Dict with keys 'statutes', 'cases', 'regulations' mapping to lists of Documents
+        token_budget: Maximum estimated tokens of excerpt text across all blocks
+        max_chars_per_block: Optional cap on each block's text, e.g. for short previews
+
+    Returns:
+        Dict with the same keys mapping to ContextBlocks, best score first
+    """
+    blocks = []
+
+    for category in CATEGORIES:
+        pages: Dict[tuple, List[Document]] = {}
+        for doc in retrieved_docs.get(category, []):
+            source = doc.metadata.get("source", "Unknown").replace(".pdf", "")
+            page_str = location_label(doc.metadata)
+            pages.setdefault((source, page_str), []).append(doc)
+
+        for (source, page_str), docs in pages.items():
+            score = max(_doc_score(doc) for doc in docs)
+            for text in _merge_page([doc.page_content for doc in docs]):
+                if max_chars_per_block is not None and len(text) > max_chars_per_block:
+                    text = text[:max_chars_per_block] + "..."
+                blocks.append(ContextBlock(category, source, page_str, text, score, docs))
+
+    blocks.sort(key=lambda block: block.score, reverse=True)
+
+    selected = {category: [] for category in CATEGORIES}
+    remaining = token_budget
+
+    for block in blocks:
+        tokens = estimate_tokens(block.text)
+        if tokens > remaining:
+            if remaining < MIN_BLOCK_TOKENS:
+                continue
+            block.text = block.text[:remaining * CHARS_PER_TOKEN] + "..."
+            tokens = remaining
+        selected[block.category].append(block)
+        remaining -= tokens
+
+    return selected
@@ -1,22 +1,44 @@
-import os
-import sys
-
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from typing import TypedDict, Dict, List
+import logging
+import operator
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
+from typing import Annotated, TypedDict, Dict, Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
-from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END
 from dotenv import load_dotenv
 
-from tools.retrieval_tools import retrieve_statutes, retrieve_cases, retrieve_regulations
-from agents.citation_agent import extract_citations
-from agents.response_agent import generate_response
+from src.tools.retrieval_tools import retrieve_statutes, retrieve_cases, retrieve_regulations, retrieve_statutes_by_ids
+from src.tools.result_store import RetrievalStore, current_store, use_store
+from src.tools.reranker import get_reranker
+from src.config import (
+    RETRIEVAL_MAX_WORKERS,
+    RETRIEVAL_TIMEOUT,
+    CITATION_MODE,
+    PARALLEL_CITATIONS,
+    ROUTER_FAST_PATH,
+    RERANK_ENABLED,
+    RERANK_CANDIDATES
+)
+from src.answer_cache import get_answer_cache
+from src.llm_gateway import answered_by, from_fallback
+from src.tracing import span, trace_request, trace_iterator, record_cache, record_llm_usage
+from src.resources import get_graph, get_llm_with_tools
+from src.ingestion.section_index import lookup_section
+from src.agents.citation_agent import extract_citations, build_citations, filter_citations
+from src.agents.response_agent import append_citations, generate_response
+from src.agents.query_router import classify_query
 from langchain_core.tools import tool
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_K = 5
+
+# With reranking on, the tools over-fetch candidates and the reranker cuts them down
+SEARCH_K = RERANK_CANDIDATES if RERANK_ENABLED else RETRIEVAL_K
+
 
 class AgentState(TypedDict):
     """State passed between agents in the graph"""
@@ -25,47 +47,165 @@ class AgentState(TypedDict):
     retrieved_docs: Dict[str, List[Document]]
     citations: str
     final_answer: str
+    search_count: int
+    # Model that wrote final_answer, when it came through the LLM gateway
+    answered_by: str
+    # Set when a search failed or timed out, found nothing, or an LLM call fell back to
+    # LLM_FALLBACK_MODEL; such answers are not cached. Parallel nodes may both set it.
+    degraded: Annotated[bool, operator.or_]
+
+
+def _active_store() -> RetrievalStore:
+    # Tools invoked outside a request (e.g. from a notebook) get a throwaway store
+    return current_store() or RetrievalStore()
 
 
 # Define retrieval tools
 @tool
 def search_statutes(query: str) -> str:
     """Searches through bare acts and statutes related to Indian criminal law. Use this when the question is about laws, sections, or legal provisions from acts like IPC (Indian Penal Code), CrPC (Criminal Procedure Code), Evidence Act, etc."""
-    docs = retrieve_statutes(query, k=5)
+    docs = _active_store().fetch("statutes", query, SEARCH_K, retrieve_statutes)
     return f"Retrieved {len(docs)} statute documents"
 
 @tool
 def search_cases(query: str) -> str:
     """Searches through criminal court judgments and case law. Use this when the question asks about precedents, judicial interpretations, or specific court rulings in criminal matters."""
-    docs = retrieve_cases(query, k=5)
+    docs = _active_store().fetch("cases", query, SEARCH_K, retrieve_cases)
     return f"Retrieved {len(docs)} case law documents"
 
 @tool
 def search_regulations(query: str) -> str:
     """Searches through government regulations and rules related to criminal law. Use this for questions about regulatory compliance, administrative rules, or government notifications in the criminal law domain."""
-    docs = retrieve_regulations(query, k=5)
+    docs = _active_store().fetch("regulations", query, SEARCH_K, retrieve_regulations)
     return f"Retrieved {len(docs)} regulation documents"
 
 tools = [search_statutes, search_cases, search_regulations]
 
-llm = ChatGroq(
-    model=os.getenv("LLM_MODEL", "llama-3.1-70b-versatile"),
-    temperature=0,
-    groq_api_key=os.getenv("GROQ_API_KEY")
-)
+TOOLS_BY_NAME = {t.name: t for t in tools}
 
-llm_with_tools = llm.bind_tools(tools)
+# Which retrieved_docs key each tool fills
+TOOL_COLLECTIONS = {
+    "search_statutes": "statutes",
+    "search_cases": "cases",
+    "search_regulations": "regulations"
+}
 
+# Shared across requests so total concurrent Chroma queries stay bounded
+retrieval_pool = ThreadPoolExecutor(max_workers=RETRIEVAL_MAX_WORKERS, thread_name_prefix="retrieval")
 
-def retrieval_agent_node(state: AgentState) -> AgentState:
+
+def run_tool_calls(tool_calls: List[dict], store: RetrievalStore) -> Tuple[Dict[str, List[Document]], bool]:
     """
-    NODE 1: Retrieval agent decides whether to use tools or respond directly.
+    Fans the retrieval tool calls out over the retrieval pool and collects their results.
 
-    If question is about criminal law → calls retrieval tools
-    If question is greeting/irrelevant → responds directly without tools
+    Every search gets RETRIEVAL_TIMEOUT seconds. A collection whose search fails or
+    times out is left empty so the remaining results can still be used; only when
+    every search fails is the error raised.
+
+    Args:
+        tool_calls: Tool calls emitted by the LLM
+        store: Retrieval store the tools fill
+
+    Returns:
+        Dict with keys 'statutes', 'cases', 'regulations' mapping to lists of Documents,
+        and whether every search completed
+    """
+    retrieved_docs = {
+        "statutes": [],
+        "cases": [],
+        "regulations": []
+    }
+
+    submitted = []
+    with use_store(store):
+        for tool_call in tool_calls:
+            tool_name = tool_call["name"]
+            if tool_name not in TOOL_COLLECTIONS:
+                continue
+
+            # Each task runs in a copy of this context so the tools see the active store
+            future = retrieval_pool.submit(copy_context().run, TOOLS_BY_NAME[tool_name].invoke, tool_call["args"])
+            submitted.append((tool_call, future))
+
+    if not submitted:
+        return retrieved_docs, True
+
+    _, not_done = wait([future for _, future in submitted], timeout=RETRIEVAL_TIMEOUT)
+
+    errors = []
+    # Walk the calls in emission order so a repeated collection keeps the last result, as before
+    for tool_call, future in submitted:
+        collection = TOOL_COLLECTIONS[tool_call["name"]]
+
+        if future in not_done:
+            future.cancel()
+            logger.warning("%s timed out after %.1fs", tool_call["name"], RETRIEVAL_TIMEOUT)
+            errors.append(TimeoutError(f"{tool_call['name']} timed out after {RETRIEVAL_TIMEOUT}s"))
+            continue
+
+        error = future.exception()
+        if error is not None:
+            logger.warning("%s failed: %s", tool_call["name"], error)
+            errors.append(error)
+            continue
+
+        retrieved_docs[collection] = store.get(collection, tool_call["args"]["query"], SEARCH_K)
+
+    if len(errors) == len(submitted):
+        raise errors[0]
+
+    return retrieved_docs, not errors
+
+
+def fast_path(state: AgentState, messages: List) -> bool:
+    """
+    Answers the commonest query shapes without the routing LLM call.
+
+    Greetings and obvious off-topic questions get a canned reply; direct section
+    lookups ("IPC 302", "Section 154 CrPC") read the section's chunks straight from
+    the section index. Anything else, or a section the index doesn't know, returns
+    False so the LLM router handles it.
+
+    Writes to state: messages, and final_answer or retrieved_docs
+    """
+    route = classify_query(state["question"])
+
+    if route.kind in ("greeting", "off_topic"):
+        state["messages"] = messages + [AIMessage(content=route.reply)]
+        state["final_answer"] = route.reply
+        return True
+
+    if route.kind == "section_lookup":
+        docs = retrieve_statutes_by_ids(lookup_section(route.source, route.section))
+        if not docs:
+            return False
+
+        act = route.source.replace(".pdf", "").strip()
+        state["messages"] = messages + [AIMessage(content=f"Looked up section {route.section} of {act}")]
+        state["retrieved_docs"] = {
+            "statutes": docs,
+            "cases": [],
+            "regulations": []
+        }
+        return True
+
+    return False
+
+
+def _count_docs(retrieved_docs: Dict[str, List[Document]]) -> int:
+    return sum(len(docs) for docs in retrieved_docs.values())
+
+
+def route_question(state: AgentState) -> AgentState:
+    """
+    Routing half of the retrieval agent: the fast path, or one call to the routing LLM.
+
+    Batch jobs call this ahead of the graph, so routing can run concurrently and the
+    searches it asks for can be batched; the retrieval agent then reuses the decision.
 
     Reads from state: question
-    Writes to state: messages, retrieved_docs
+    Writes to state: messages (ending with the routing AIMessage), degraded, and
+    final_answer and answered_by, or retrieved_docs, when no search is needed
     """
     question = state["question"]
 
@@ -102,49 +242,106 @@ Available tools:
         HumanMessage(content=question)
     ]
 
-    response = llm_with_tools.invoke(messages)
+    with span("route") as route_span:
+        if ROUTER_FAST_PATH and fast_path(state, messages):
+            route_span.set(kind="fast_path")
+            return state
+
+        with span("llm.route") as llm_span:
+            response = get_llm_with_tools().invoke(messages)
+            record_llm_usage(llm_span, response)
+
+        route_span.set(kind="llm", tool_calls=len(response.tool_calls))
 
     messages.append(response)
     state["messages"] = messages
+    state["degraded"] = state.get("degraded", False) or from_fallback(response)
 
-    if response.tool_calls:
-        retrieved_docs = {
-            "statutes": [],
-            "cases": [],
-            "regulations": []
-        }
+    if not response.tool_calls:
+        state["final_answer"] = response.content
+        state["answered_by"] = answered_by(response) or ""
+
+    return state
 
-        for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
 
-            if tool_name == "search_statutes":
-                retrieved_docs["statutes"] = retrieve_statutes(tool_args["query"], k=5)
-            elif tool_name == "search_cases":
-                retrieved_docs["cases"] = retrieve_cases(tool_args["query"], k=5)
-            elif tool_name == "search_regulations":
-                retrieved_docs["regulations"] = retrieve_regulations(tool_args["query"], k=5)
+def is_routed(state: AgentState) -> bool:
+    messages = state.get("messages") or []
+    return bool(messages) and isinstance(messages[-1], AIMessage)
+
+
+def retrieval_agent_node(state: AgentState) -> AgentState:
+    """
+    NODE 1: Retrieval agent decides whether to use tools or respond directly.
+
+    If question is about criminal law → calls retrieval tools
+    If question is greeting/irrelevant → responds directly without tools
+    Greetings, obvious off-topic questions and direct section lookups are
+    handled by fast_path without calling the LLM at all
+    A state that arrives already routed (see route_question) goes straight
+    to the searches
+
+    Reads from state: question, messages
+    Writes to state: messages, retrieved_docs, search_count, degraded
+    """
+    question = state["question"]
+
+    with span("node.retrieval_agent") as node_span:
+        node_span.set(prerouted=is_routed(state))
+        if not is_routed(state):
+            route_question(state)
+
+        response = state["messages"][-1]
+        if not response.tool_calls:
+            node_span.set(documents=_count_docs(state["retrieved_docs"]))
+            return state
+
+        store = current_store() or RetrievalStore()
+
+        # The tools run the searches and fill the store; we only read results back
+        retrieved_docs, complete = run_tool_calls(response.tool_calls, store)
+
+        if RERANK_ENABLED:
+            with span("rerank") as rerank_span:
+                retrieved_docs = get_reranker().rerank(question, retrieved_docs)
+                rerank_span.set(documents=_count_docs(retrieved_docs))
 
         state["retrieved_docs"] = retrieved_docs
-    else:
-        state["final_answer"] = response.content
+        state["search_count"] = store.searches
+        state["degraded"] = state.get("degraded", False) or not complete or not _count_docs(retrieved_docs)
+        node_span.set(tool_calls=len(response.tool_calls), searches=store.searches,
+                      documents=_count_docs(retrieved_docs))
 
     return state
 
 
+def _fell_back(reply: Optional[BaseMessage]) -> bool:
+    return reply is not None and from_fallback(reply)
+
+
+def _citations_for(state: AgentState) -> Tuple[str, Optional[BaseMessage]]:
+    question = state["question"]
+    retrieved_docs = state["retrieved_docs"]
+
+    with span("node.citations", mode=CITATION_MODE):
+        # "metadata" skips the citation LLM call entirely; "filter" only asks it which documents to keep
+        if CITATION_MODE == "metadata":
+            return build_citations(retrieved_docs), None
+        elif CITATION_MODE == "filter":
+            return filter_citations(question, retrieved_docs)
+        else:
+            return extract_citations(question, retrieved_docs)
+
+
 def citation_node(state: AgentState) -> AgentState:
     """
     NODE 2: Extract citations using the citation agent.
 
     Reads from state: question, retrieved_docs
-    Writes to state: citations
+    Writes to state: citations, degraded
     """
-    question = state["question"]
-    retrieved_docs = state["retrieved_docs"]
-
-    citations = extract_citations(question, retrieved_docs)
-
+    citations, reply = _citations_for(state)
     state["citations"] = citations
+    state["degraded"] = state["degraded"] or _fell_back(reply)
 
     return state
 
@@ -154,19 +351,66 @@ def response_node(state: AgentState) -> AgentState:
     NODE 3: Generate final response using the response agent.
 
     Reads from state: question, retrieved_docs, citations
-    Writes to state: final_answer
+    Writes to state: final_answer, answered_by, degraded
     """
     question = state["question"]
     retrieved_docs = state["retrieved_docs"]
     citations = state["citations"]
 
-    final_answer = generate_response(question, retrieved_docs, citations)
+    with span("node.response"):
+        final_answer, reply = generate_response(question, retrieved_docs, citations)
 
     state["final_answer"] = final_answer
+    state["answered_by"] = answered_by(reply) or ""
+    state["degraded"] = state["degraded"] or _fell_back(reply)
 
     return state
 
 
+def parallel_citation_node(state: AgentState) -> Dict:
+    """
+    NODE 2 (parallel graph): Extract citations while the response is being written.
+
+    Runs in the same step as parallel_response_node, so both return only the keys
+    they write rather than the whole state.
+
+    Reads from state: question, retrieved_docs
+    Writes to state: citations, and degraded when the citations came from the fallback model
+    """
+    citations, reply = _citations_for(state)
+    update = {"citations": citations}
+    if _fell_back(reply):
+        update["degraded"] = True
+    return update
+
+
+def parallel_response_node(state: AgentState) -> Dict:
+    """
+    NODE 3 (parallel graph): Generate the answer without waiting for the citations.
+
+    Reads from state: question, retrieved_docs
+    Writes to state: final_answer (without citations; merge_citations_node appends them),
+    answered_by, and degraded when the answer came from the fallback model
+    """
+    with span("node.response", parallel=True):
+        final_answer, reply = generate_response(state["question"], state["retrieved_docs"], "")
+
+    update = {"final_answer": final_answer, "answered_by": answered_by(reply) or ""}
+    if _fell_back(reply):
+        update["degraded"] = True
+    return update
+
+
+def merge_citations_node(state: AgentState) -> Dict:
+    """
+    NODE 4 (parallel graph): Append the citations to the answer once both are done.
+
+    Reads from state: final_answer, citations
+    Writes to state: final_answer
+    """
+    return {"final_answer": append_citations(state["final_answer"], state["citations"])}
+
+
 def should_continue_to_citations(state: AgentState) -> str:
     """
     CONDITIONAL EDGE: Check if tools were called.
@@ -185,27 +429,83 @@ def should_continue_to_citations(state: AgentState) -> str:
         return "end"
 
 
-workflow = StateGraph(AgentState)
+def fan_out_after_retrieval(state: AgentState):
+    """
+    CONDITIONAL EDGE (parallel graph): Start citations and response together when docs were found.
+    """
+    if should_continue_to_citations(state) == "citations":
+        return ["citations", "response"]
+    return END
+
+
+def build_graph(parallel: bool = PARALLEL_CITATIONS):
+    """
+    Compiles the agent graph; called once, through the resource registry.
+
+    The default graph runs citations -> response, so the response prompt includes
+    the citations. With parallel, both start right after retrieval and a merge node
+    appends the citations to the answer, taking one LLM round-trip off the path.
+    """
+    workflow = StateGraph(AgentState)
+
+    workflow.add_node("retrieval_agent", retrieval_agent_node)
+    workflow.set_entry_point("retrieval_agent")
+
+    if parallel:
+        workflow.add_node("citations", parallel_citation_node)
+        workflow.add_node("response", parallel_response_node)
+        workflow.add_node("merge_citations", merge_citations_node)
+
+        workflow.add_conditional_edges("retrieval_agent", fan_out_after_retrieval, ["citations", "response", END])
+
+        # Waits for both branches before merging
+        workflow.add_edge(["citations", "response"], "merge_citations")
+        workflow.add_edge("merge_citations", END)
+
+        return workflow.compile()
+
+    workflow.add_node("citations", citation_node)
+    workflow.add_node("response", response_node)
+
+    workflow.add_conditional_edges(
+        "retrieval_agent",
+        should_continue_to_citations,
+        {
+            "citations": "citations",
+            "end": END
+        }
+    )
 
-workflow.add_node("retrieval_agent", retrieval_agent_node)
-workflow.add_node("citations", citation_node)
-workflow.add_node("response", response_node)
+    workflow.add_edge("citations", "response")
+    workflow.add_edge("response", END)
 
-workflow.set_entry_point("retrieval_agent")
+    return workflow.compile()
 
-workflow.add_conditional_edges(
-    "retrieval_agent",
-    should_continue_to_citations,
-    {
-        "citations": "citations",
-        "end": END
+
+def initial_state_for(question: str) -> AgentState:
+    return {
+        "question": question,
+        "messages": [],
+        "retrieved_docs": {},
+        "citations": "",
+        "final_answer": "",
+        "search_count": 0,
+        "answered_by": "",
+        "degraded": False
     }
-)
 
-workflow.add_edge("citations", "response")
-workflow.add_edge("response", END)
 
-app = workflow.compile()
+def is_cacheable(state: AgentState) -> bool:
+    """Whether the answer in a finished state may be stored in the answer cache."""
+    return bool(state["final_answer"]) and not state.get("degraded")
+
+
+def _cached_answer(cache, question: str):
+    with span("answer_cache.lookup") as lookup_span:
+        cached_answer = cache.lookup(question)
+        lookup_span.set(hit=cached_answer is not None)
+    record_cache("answer", cached_answer is not None)
+    return cached_answer
 
 
 def run_query(question: str) -> str:
@@ -218,14 +518,77 @@ def run_query(question: str) -> str:
     Returns:
         Final answer string
     """
-    initial_state = {
-        "question": question,
-        "messages": [],
-        "retrieved_docs": {},
-        "citations": "",
-        "final_answer": ""
-    }
+    with trace_request("run_query") as request:
+        cache = get_answer_cache()
+        if cache is not None:
+            cached_answer = _cached_answer(cache, question)
+            request.set(answer_cache="hit" if cached_answer is not None else "miss")
+            if cached_answer is not None:
+                logger.info("run_query served from answer cache")
+                return cached_answer
+
+        initial_state = initial_state_for(question)
+
+        store = RetrievalStore()
+
+        with use_store(store):
+            final_state = get_graph().invoke(initial_state)
+
+        logger.info("run_query ran %d vector searches", store.searches)
+        request.set(searches=store.searches, answered_by=final_state["answered_by"],
+                    degraded=final_state["degraded"])
+
+        if cache is not None and is_cacheable(final_state):
+            cache.store(question, final_state["final_answer"])
 
-    final_state = app.invoke(initial_state)
+        return final_state["final_answer"]
 
-    return final_state["final_answer"]
+
+def stream_query(question: str) -> Iterator[dict]:
+    """
+    Streaming version of run_query.
+
+    Yields events as the graph runs:
+        {"type": "node", "node": <node name>} once each node finishes
+        {"type": "token", "content": <text>} for every response token as the LLM emits it
+        {"type": "answer", "content": <final answer>} last, with citations appended, and
+            "answered_by" naming the model that wrote it unless it came from the answer cache
+
+    Args:
+        question: User's question
+
+    Returns:
+        Iterator of event dicts
+    """
+    return trace_iterator("stream_query", _stream_events(question))
+
+
+def _stream_events(question: str) -> Iterator[dict]:
+    cache = get_answer_cache()
+    if cache is not None:
+        cached_answer = _cached_answer(cache, question)
+        if cached_answer is not None:
+            logger.info("stream_query served from answer cache")
+            yield {"type": "answer", "content": cached_answer}
+            return
+
+    final_state = initial_state_for(question)
+
+    # No retrieval store is activated here: a context variable set inside a generator
+    # would leak into whichever context happens to resume it, so the node creates its own
+    for mode, chunk in get_graph().stream(initial_state_for(question), stream_mode=["updates", "messages"]):
+        if mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") == "response" and message.content:
+                yield {"type": "token", "content": message.content}
+        else:
+            for node, update in chunk.items():
+                final_state.update(update or {})
+                yield {"type": "node", "node": node}
+
+    logger.info("stream_query ran %d vector searches", final_state["search_count"])
+
+    if cache is not None and is_cacheable(final_state):
+        cache.store(question, final_state["final_answer"])
+
+    yield {"type": "answer", "content": final_state["final_answer"], "answered_by": final_state["answered_by"]}
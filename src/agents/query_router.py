@@ -0,0 +1,108 @@
+import re
+from dataclasses import dataclass
+from typing import Optional, Set
+
+# Ways users name each act, mapped to the statute PDF it was ingested from
+ACT_ALIASES = {
+    "ipc": "THE INDIAN PENAL CODE.pdf",
+    "indian penal code": "THE INDIAN PENAL CODE.pdf",
+    "penal code": "THE INDIAN PENAL CODE.pdf",
+    "crpc": "THE CODE OF CRIMINAL PROCEDURE 1973.pdf",
+    "cr.p.c": "THE CODE OF CRIMINAL PROCEDURE 1973.pdf",
+    "cr.p.c.": "THE CODE OF CRIMINAL PROCEDURE 1973.pdf",
+    "code of criminal procedure": "THE CODE OF CRIMINAL PROCEDURE 1973.pdf",
+    "criminal procedure code": "THE CODE OF CRIMINAL PROCEDURE 1973.pdf",
+    "evidence act": "THE INDIAN EVIDENCE ACT 1872 .pdf",
+    "indian evidence act": "THE INDIAN EVIDENCE ACT 1872 .pdf",
+    "iea": "THE INDIAN EVIDENCE ACT 1872 .pdf",
+    "pocso": "THE PROTECTION OF CHILDREN FROM SEXUAL OFFENCES ACT 2012.pdf",
+    "pocso act": "THE PROTECTION OF CHILDREN FROM SEXUAL OFFENCES ACT 2012.pdf",
+    "sc/st act": "THE SCHEDULED CASTES AND THE SCHEDULED TRIBES ACT.pdf",
+    "sc st act": "THE SCHEDULED CASTES AND THE SCHEDULED TRIBES ACT.pdf",
+    "atrocities act": "THE SCHEDULED CASTES AND THE SCHEDULED TRIBES ACT.pdf"
+}
+
+_ACT = "|".join(sorted((re.escape(alias) for alias in ACT_ALIASES), key=len, reverse=True))
+_SECTION = r"(?:section|sec\.?|s\.)?\s*(\d{1,3}[a-z]{0,3})"
+_LEAD_IN = r"(?:(?:what\s+is|what\s+does|what's|explain|show|show\s+me|define|tell\s+me\s+about|read)\s+)?"
+
+# Only whole-question lookups qualify: "IPC 302", "Section 154 CrPC", "what is section 41 of the crpc?"
+SECTION_LOOKUP_PATTERNS = [
+    re.compile(rf"^{_LEAD_IN}{_SECTION}\s*(?:of\s+)?(?:the\s+)?({_ACT})\s*(?:say)?[\s?.!]*$"),
+    re.compile(rf"^{_LEAD_IN}(?:the\s+)?({_ACT})\s*{_SECTION}\s*(?:say)?[\s?.!]*$")
+]
+
+# An act named anywhere in a question, e.g. "is section 41 of the crpc bailable"
+ACT_MENTION = re.compile(rf"(?<![a-z])(?:{_ACT})(?![a-z])")
+
+GREETING = re.compile(
+    r"^(?:hi|hii+|hello|hey|hey there|hi there|hello there|namaste|good\s+(?:morning|afternoon|evening)|"
+    r"how\s+are\s+you|thanks|thank\s+you|thank\s+you\s+so\s+much)[\s!.,?]*$"
+)
+
+OFF_TOPIC = re.compile(
+    r"\b(?:recipe|weather|movie|song|cricket|football|stock\s+price|bitcoin|horoscope|"
+    r"divorce|alimony|tenancy|rent\s+agreement|property\s+partition|contract\s+drafting|"
+    r"income\s+tax|gst|write\s+(?:a\s+)?(?:poem|story|code))\b"
+)
+
+# Any of these means the question may still be criminal law, so the LLM decides
+CRIMINAL_LAW_TERMS = re.compile(
+    r"\b(?:ipc|crpc|section|offen[cs]e|crime|criminal|police|arrest|bail|fir|accused|"
+    r"punish|cruelty|dowry|murder|theft|assault|rape|evidence|court|prison|jail|498a)\w*"
+)
+
+GREETING_REPLY = (
+    "Hello! I'm a legal research assistant specialising in Indian Criminal Law — the IPC, CrPC, "
+    "Evidence Act, criminal case law and related regulations. How can I help you today?"
+)
+
+OFF_TOPIC_REPLY = (
+    "I'm sorry, but I specialise exclusively in Indian Criminal Law (IPC, CrPC, Evidence Act, "
+    "criminal case law and regulations), so I can't help with that question. Please ask me "
+    "something related to Indian criminal law."
+)
+
+
+@dataclass
+class Route:
+    """Outcome of local query classification."""
+    kind: str
+    reply: Optional[str] = None
+    source: Optional[str] = None
+    section: Optional[str] = None
+
+
+def classify_query(question: str) -> Route:
+    """
+    Cheaply classify a question without calling the routing LLM.
+
+    Args:
+        question: User's question
+
+    Returns:
+        Route with kind 'greeting' or 'off_topic' (reply set), 'section_lookup'
+        (source and section set), or 'llm' when the LLM router should decide
+    """
+    text = " ".join(question.lower().split())
+
+    if GREETING.match(text):
+        return Route(kind="greeting", reply=GREETING_REPLY)
+
+    for pattern in SECTION_LOOKUP_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            groups = match.groups()
+            section, act = (groups[0], groups[1]) if groups[0][0].isdigit() else (groups[1], groups[0])
+            return Route(kind="section_lookup", source=ACT_ALIASES[act], section=section.upper())
+
+    if OFF_TOPIC.search(text) and not CRIMINAL_LAW_TERMS.search(text):
+        return Route(kind="off_topic", reply=OFF_TOPIC_REPLY)
+
+    return Route(kind="llm")
+
+
+def acts_named(question: str) -> Set[str]:
+    """Statute PDFs of every act the question names."""
+    text = " ".join(question.lower().split())
+    return {ACT_ALIASES[alias] for alias in ACT_MENTION.findall(text)}
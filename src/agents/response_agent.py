@@ -1,17 +1,19 @@
-import os
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from langchain_core.documents import Document
-from langchain_groq import ChatGroq
-from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
 from dotenv import load_dotenv
+from src.config import RESPONSE_CONTEXT_TOKENS
+from src.agents.context_builder import build_context
+from src.tracing import span, record_llm_usage
+from src.resources import get_llm
 
 load_dotenv()
 
-llm = ChatGroq(
-    model=os.getenv("LLM_MODEL", "llama-3.1-70b-versatile"),
-    temperature=0,
-    groq_api_key=os.getenv("GROQ_API_KEY")
-)
+EXCERPT_HEADINGS = {
+    "statutes": "=== STATUTE EXCERPTS ===",
+    "cases": "=== CASE LAW EXCERPTS ===",
+    "regulations": "=== REGULATION EXCERPTS ==="
+}
 
 system_message = """You are a legal research assistant specializing in Indian Criminal Law. Your task is to provide accurate, well-structured answers to legal questions.
 
@@ -21,58 +23,50 @@ Guidelines:
 - Structure your answer clearly with proper legal reasoning
 - Be precise and cite sources appropriately
 - If the documents don't fully answer the question, acknowledge the limitations
-- Write in a professional but accessible tone
+- Write in a professional but accessible tone"""
+
+citations_note = """
 
 The citations have already been extracted and provided to you. Use them to support your answer."""
 
 
-def generate_response(question: str, retrieved_docs: Dict[str, List[Document]], citations: str) -> str:
+def append_citations(answer: str, citations: str) -> str:
+    """Appends the formatted citations block, if there is one, below an answer."""
+    if citations and citations.strip():
+        return answer + f"\n\n{citations}"
+    return answer
+
+
+def generate_response(question: str, retrieved_docs: Dict[str, List[Document]],
+                      citations: str) -> Tuple[str, BaseMessage]:
     """
     Generate final answer using retrieved documents and extracted citations.
 
     Args:
         question: The user's original question
         retrieved_docs: Dict with keys 'statutes', 'cases', 'regulations' mapping to lists of Documents
-        citations: Formatted citations from citation agent
+        citations: Formatted citations from citation agent; empty when they are still being
+            extracted in parallel, in which case the answer cites the excerpts by name and page
 
     Returns:
-        Final answer as string
+        Final answer as string, and the LLM reply it was written from (whose metadata
+        names the model that answered)
     """
 
-    context = ""
-
-    statute_docs = retrieved_docs.get("statutes", [])
-    case_docs = retrieved_docs.get("cases", [])
-    regulation_docs = retrieved_docs.get("regulations", [])
-
-    if statute_docs:
-        context += "\n=== STATUTE EXCERPTS ===\n"
-        for doc in statute_docs:
-            source = doc.metadata.get("source", "Unknown").replace(".pdf", "")
-            page = doc.metadata.get("page", "")
-            context += f"\n[{source}, Page {int(page) + 1 if page != '' else 'N/A'}]\n"
-            context += f"{doc.page_content}\n"
-            context += "-" * 80 + "\n"
-
-    if case_docs:
-        context += "\n=== CASE LAW EXCERPTS ===\n"
-        for doc in case_docs:
-            source = doc.metadata.get("source", "Unknown").replace(".pdf", "")
-            page = doc.metadata.get("page", "")
-            context += f"\n[{source}, Page {int(page) + 1 if page != '' else 'N/A'}]\n"
-            context += f"{doc.page_content}\n"
-            context += "-" * 80 + "\n"
-
-    if regulation_docs:
-        context += "\n=== REGULATION EXCERPTS ===\n"
-        for doc in regulation_docs:
-            source = doc.metadata.get("source", "Unknown").replace(".pdf", "")
-            page = doc.metadata.get("page", "")
-            context += f"\n[{source}, Page {int(page) + 1 if page != '' else 'N/A'}]\n"
-            context += f"{doc.page_content}\n"
-            context += "-" * 80 + "\n"
-
-    prompt = f"""Question: {question}
+    blocks = build_context(retrieved_docs, RESPONSE_CONTEXT_TOKENS)
+
+    parts = []
+    for category, heading in EXCERPT_HEADINGS.items():
+        if blocks[category]:
+            parts.append(f"\n{heading}\n")
+            for block in blocks[category]:
+                parts.append(f"\n[{block.source}, {block.page_str}]\n{block.text}\n")
+
+    context = "".join(parts)
+
+    has_citations = bool(citations and citations.strip())
+    if has_citations:
+        prompt = f"""Question: {question}
 
 Legal Document Context:
 {context}
@@ -81,17 +75,21 @@ Relevant Citations (already extracted):
 {citations}
 
 Based on the above legal documents and citations, provide a comprehensive answer to the question. Structure your response clearly and reference the sources appropriately."""
+    else:
+        prompt = f"""Question: {question}
+
+Legal Document Context:
+{context}
+
+Based on the above legal documents, provide a comprehensive answer to the question. Structure your response clearly and reference the sources by name and page as given in the excerpt headers."""
 
     messages = [
-        SystemMessage(content=system_message),
+        SystemMessage(content=system_message + citations_note if has_citations else system_message),
         HumanMessage(content=prompt)
     ]
 
-    response = llm.invoke(messages)
-
-    final_response = response.content
-
-    if citations and citations.strip():
-        final_response += f"\n\n{citations}"
+    with span("llm.response") as llm_span:
+        response = get_llm().invoke(messages)
+        record_llm_usage(llm_span, response)
 
-    return final_response
+    return append_citations(response.content, citations), response
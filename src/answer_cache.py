@@ -0,0 +1,186 @@
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+import numpy as np
+from src.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL,
+    ANSWER_CACHE_MAX_ENTRIES
+)
+from src.agents.query_router import acts_named
+from src.embeddings import get_embedding_service
+from src.ingestion.manifest import current_index_version
+from src.resources import registry
+
+_NUMBER = re.compile(r"\d+[a-z]*")
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+class AnswerCache:
+    """
+    Persistent answer cache in front of run_query, stored in SQLite.
+
+    A question is served from the cache when its normalized text matches exactly, or
+    when its embedding is at least `threshold` cosine-similar to a cached question
+    that cites the same numbers and names the same acts (so "section 41" never answers
+    "section 42", nor "section 41 crpc" "section 41 ipc").
+    Entries expire after `ttl` seconds, the least recently used are evicted beyond
+    `max_entries`, and everything is dropped when the vector DB index version changes.
+    """
+
+    def __init__(self, path: str = ANSWER_CACHE_PATH, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 ttl: float = ANSWER_CACHE_TTL, max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                question TEXT PRIMARY KEY,
+                embedding BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                index_version TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        # In-memory copy of the embeddings, refreshed when another process writes
+        self._questions = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._data_version = None
+        self._dirty = True
+
+    def lookup(self, question: str) -> Optional[str]:
+        """
+        Returns a cached answer for question, or None on a miss.
+
+        Args:
+            question: User's question
+
+        Returns:
+            Cached answer string or None
+        """
+        normalized = normalize_question(question)
+        now = time.time()
+
+        with self._lock:
+            row = self._fetch(normalized, now)
+            if row is not None:
+                self._touch(normalized, now)
+                return row[0]
+
+            self._refresh()
+            if not self._questions:
+                return None
+
+        query = self._embed(normalized)
+
+        with self._lock:
+            if len(self._questions) != self._matrix.shape[0] or self._matrix.shape[1] != query.shape[0]:
+                return None
+
+            scores = self._matrix @ query
+            numbers = _NUMBER.findall(normalized)
+            acts = acts_named(normalized)
+
+            for i in np.argsort(-scores):
+                if scores[i] < self.threshold:
+                    break
+                candidate = self._questions[i]
+                if _NUMBER.findall(candidate) != numbers or acts_named(candidate) != acts:
+                    continue
+
+                row = self._fetch(candidate, now)
+                if row is not None:
+                    self._touch(candidate, now)
+                    return row[0]
+
+        return None
+
+    def store(self, question: str, answer: str):
+        if not answer:
+            return
+
+        normalized = normalize_question(question)
+        embedding = self._embed(normalized)
+        now = time.time()
+
+        with self._lock:
+            self._expire(now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                (normalized, embedding.tobytes(), answer, current_index_version(), now, now)
+            )
+            # Keep only the most recently used max_entries rows
+            self._conn.execute(
+                "DELETE FROM answers WHERE question NOT IN "
+                "(SELECT question FROM answers ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+            self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+            self._dirty = True
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(get_embedding_service().embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _fetch(self, normalized: str, now: float) -> Optional[tuple]:
+        # Stale rows are only deleted on store, so lookups skip them here
+        return self._conn.execute(
+            "SELECT answer FROM answers WHERE question = ? AND index_version = ? AND created_at >= ?",
+            (normalized, current_index_version(), now - self.ttl)
+        ).fetchone()
+
+    def _touch(self, normalized: str, now: float):
+        self._conn.execute("UPDATE answers SET last_used = ? WHERE question = ?", (now, normalized))
+        self._conn.commit()
+
+    def _expire(self, now: float):
+        # Answers built on an older vector DB, or past their TTL, are no longer trusted
+        cursor = self._conn.execute(
+            "DELETE FROM answers WHERE index_version != ? OR created_at < ?",
+            (current_index_version(), now - self.ttl)
+        )
+        if cursor.rowcount:
+            self._dirty = True
+
+    def _refresh(self):
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if not self._dirty and data_version == self._data_version:
+            return
+
+        rows = self._conn.execute("SELECT question, embedding FROM answers").fetchall()
+        self._questions = [question for question, _ in rows]
+        if rows:
+            self._matrix = np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+        else:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+        self._data_version = data_version
+        self._dirty = False
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """Returns the process-wide AnswerCache, or None when ANSWER_CACHE_ENABLED is off."""
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    return registry.get("answer_cache")
@@ -7,11 +7,15 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma_db")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.1-70b-versatile")
+# Groq API endpoint; point it at a local server to run the pipeline against a mock
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "")
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
 
 DATA_PATHS = {
-    "statutes": "data/statutes",
-    "case_laws": "data/case_laws",
-    "regulations": "data/regulations"
+    "statutes": os.path.join(DATA_DIR, "statutes"),
+    "case_laws": os.path.join(DATA_DIR, "case_laws"),
+    "regulations": os.path.join(DATA_DIR, "regulations")
 }
 
 COLLECTION_NAMES = {
@@ -19,3 +23,122 @@ COLLECTION_NAMES = {
     "case_laws": "cases_collection",
     "regulations": "regulations_collection"
 }
+
+# "per_type": one collection per document type; "unified": every chunk in one collection, told apart
+# by its doc_type metadata, so a single search returns the top k of each type
+INDEX_LAYOUT = os.getenv("INDEX_LAYOUT", "per_type")
+UNIFIED_COLLECTION_NAME = os.getenv("UNIFIED_COLLECTION_NAME", "legal_collection")
+
+# The collection each document type is stored in under INDEX_LAYOUT
+INDEX_COLLECTIONS = {
+    doc_type: UNIFIED_COLLECTION_NAME if INDEX_LAYOUT == "unified" else collection_name
+    for doc_type, collection_name in COLLECTION_NAMES.items()
+}
+
+RETRIEVAL_MAX_WORKERS = int(os.getenv("RETRIEVAL_MAX_WORKERS", "8"))
+RETRIEVAL_TIMEOUT = float(os.getenv("RETRIEVAL_TIMEOUT", "10"))
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "256"))
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+PAGES_PER_TASK = int(os.getenv("PAGES_PER_TASK", "50"))
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "./answer_cache.sqlite3")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+# "llm": citation agent writes citations, "metadata": built from document metadata and
+# retrieval scores without an LLM call, "filter": metadata citations pruned by the LLM
+CITATION_MODE = os.getenv("CITATION_MODE", "llm")
+# Run the citation and response agents side by side after retrieval and append the citations to the
+# answer afterwards, instead of waiting for them to put them in the response prompt
+PARALLEL_CITATIONS = os.getenv("PARALLEL_CITATIONS", "false").lower() == "true"
+
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+API_MAX_CONCURRENCY = int(os.getenv("API_MAX_CONCURRENCY", "8"))
+API_MAX_QUEUE = int(os.getenv("API_MAX_QUEUE", "32"))
+API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "30"))
+
+# "chroma" searches Chroma's HNSW; "quantized" searches the read-only export from scripts/export_quantized_index.py
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma")
+# Quantized backend: int8 codes, rescoring the best k * RESCORE_FACTOR against float32 vectors.
+# Collections with at least IVF_MIN_VECTORS chunks get an IVF index searched over the IVF_NPROBE nearest lists
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))
+IVF_MIN_VECTORS = int(os.getenv("IVF_MIN_VECTORS", "50000"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+
+# "vector": dense search only, "hybrid": dense + BM25 fused with reciprocal rank fusion
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "4"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Answer greetings, obvious off-topic questions and direct section lookups without the routing LLM
+ROUTER_FAST_PATH = os.getenv("ROUTER_FAST_PATH", "false").lower() == "true"
+
+# Optional cross-encoder stage: over-fetch RERANK_CANDIDATES per collection, keep RERANK_TOP_K
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "15"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "3"))
+RERANK_MAX_CANDIDATES = int(os.getenv("RERANK_MAX_CANDIDATES", "40"))
+
+# Estimated-token budgets for the retrieved excerpts pasted into each prompt
+RESPONSE_CONTEXT_TOKENS = int(os.getenv("RESPONSE_CONTEXT_TOKENS", "3000"))
+CITATION_CONTEXT_TOKENS = int(os.getenv("CITATION_CONTEXT_TOKENS", "1500"))
+
+# Per-request spans logged as JSON on the "legal_rag.trace" logger, plus Prometheus metrics
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+
+# Splitter settings per document type as (chunk_size, chunk_overlap); recorded in the index manifest
+CHUNK_SETTINGS = {
+    "statutes": (1000, 200),
+    "case_laws": (800, 150),
+    "regulations": (1000, 200)
+}
+
+# "fixed" splits each page with CHUNK_SETTINGS; "structure" cuts whole files at chapter, section and paragraph boundaries
+CHUNKING_MODE = os.getenv("CHUNKING_MODE", "fixed")
+# Structure mode: longest chunk per document type, and the size below which a heading is kept with what follows
+STRUCTURE_CHUNK_CHARS = {
+    "statutes": 1500,
+    "case_laws": 1200,
+    "regulations": 1500
+}
+STRUCTURE_MIN_CHARS = int(os.getenv("STRUCTURE_MIN_CHARS", "200"))
+
+# Prebuilt index archive (from scripts/build_vectordb.py --artifact), unpacked into CHROMA_PATH when it is missing
+INDEX_ARTIFACT = os.getenv("INDEX_ARTIFACT", "")
+# Optional pin: refuse to serve an index built from a different corpus
+INDEX_CORPUS_HASH = os.getenv("INDEX_CORPUS_HASH", "")
+# Development only: let the Streamlit app embed the corpus itself when no index exists
+BUILD_INDEX_ON_STARTUP = os.getenv("BUILD_INDEX_ON_STARTUP", "false").lower() == "true"
+
+# Bulk jobs: questions are routed and searched a wave at a time, with at most BATCH_CONCURRENCY LLM calls in flight
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_WAVE_SIZE = int(os.getenv("BATCH_WAVE_SIZE", "64"))
+# Only used when "llm" is not the LLM gateway, which retries each call itself
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "5"))
+
+# LLM gateway: every call shares pooled keep-alive connections and a per-model requests/tokens-per-minute
+# budget (0 means no limit; set them to the account's Groq limits). 429s, 5xx and connection errors are
+# retried with jittered backoff, honouring Retry-After. LLM_FALLBACK_MODEL answers when LLM_MODEL keeps
+# failing, and, with LLM_HEDGE_AFTER > 0, also gets a copy of any request unanswered after that many seconds
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "llama-3.1-8b-instant")
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+
+# Compact storage: keep only METADATA_FIELDS per chunk, with source names interned into sources.json
+COMPACT_METADATA = os.getenv("COMPACT_METADATA", "false").lower() == "true"
+METADATA_FIELDS = ("source", "page", "page_end", "section", "chapter", "doc_type")
+# Keep chunk text in a compressed, memory-mapped store next to the index instead of in Chroma
+CHUNK_STORE_ENABLED = os.getenv("CHUNK_STORE_ENABLED", "false").lower() == "true"
@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+from src.config import EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, QUERY_EMBEDDING_CACHE_SIZE
+from src.tracing import span, record_cache
+from src.resources import registry
+
+
+class EmbeddingService:
+    """
+    Process-wide embedding model shared by ingestion and retrieval.
+
+    The SentenceTransformer is loaded on first use, texts are encoded in batches,
+    and query embeddings are kept in an LRU cache keyed by the exact query text.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 cache_size: int = QUERY_EMBEDDING_CACHE_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    with span("model_load.embedding", model=self.model_name):
+                        from sentence_transformers import SentenceTransformer
+                        self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        """Encodes texts in batches of batch_size and returns plain lists of floats."""
+        if not texts:
+            return []
+        return self.model.encode(texts, batch_size=self.batch_size).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds queries, serving repeats from the LRU cache and encoding all misses in one pass.
+
+        Args:
+            texts: Query strings
+
+        Returns:
+            One embedding per input text, in input order
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        missing = {}
+
+        with self._cache_lock:
+            for i, text in enumerate(texts):
+                cached = self._cache.get(text)
+                if cached is not None:
+                    self._cache.move_to_end(text)
+                    embeddings[i] = cached
+                    self.cache_hits += 1
+                    record_cache("query_embedding", True)
+                else:
+                    missing.setdefault(text, []).append(i)
+                    self.cache_misses += 1
+                    record_cache("query_embedding", False)
+
+        if missing:
+            miss_texts = list(missing)
+            for text, embedding in zip(miss_texts, self.encode(miss_texts)):
+                for i in missing[text]:
+                    embeddings[i] = embedding
+                self._remember(text, embedding)
+
+        return embeddings
+
+    def _remember(self, text: str, embedding: List[float]):
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[text] = embedding
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Returns the process-wide EmbeddingService, creating it on first call."""
+    return registry.get("embedding_service")
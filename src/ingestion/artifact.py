@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import time
+from typing import Dict, Optional
+from src.config import (
+    CHROMA_PATH,
+    CHUNK_SETTINGS,
+    CHUNKING_MODE,
+    EMBEDDING_MODEL,
+    INDEX_ARTIFACT,
+    INDEX_CORPUS_HASH,
+    INDEX_LAYOUT,
+    STRUCTURE_CHUNK_CHARS,
+    STRUCTURE_MIN_CHARS
+)
+
+ARTIFACT_FILE = "artifact.json"
+ARTIFACT_FORMAT = 1
+
+# Everything about how chunks are produced; an index built with different values can't be served
+TEXT_EXTRACTION = "pypdf-plain"
+SPLITTER = "recursive_character"
+STRUCTURE_SPLITTER = "structure-v1"
+
+class ArtifactError(RuntimeError):
+    """The index at CHROMA_PATH is missing or was built for a different configuration."""
+
+def chunking_spec() -> Dict:
+    if CHUNKING_MODE == "structure":
+        settings = {"max_chars": STRUCTURE_CHUNK_CHARS, "min_chars": STRUCTURE_MIN_CHARS}
+        spec = {"extraction": TEXT_EXTRACTION, "splitter": STRUCTURE_SPLITTER, "settings": settings}
+    else:
+        spec = {"extraction": TEXT_EXTRACTION, "splitter": SPLITTER, "settings": CHUNK_SETTINGS}
+    # Round-trip through JSON so tuples compare equal to what was read back from disk
+    return json.loads(json.dumps(spec, sort_keys=True))
+
+def corpus_hash(manifest: Dict) -> str:
+    """Hash of every ingested file's content hash, independent of chunking and embedding."""
+    files = {
+        doc_type: {filename: entry["hash"] for filename, entry in entries.items()}
+        for doc_type, entries in manifest["files"].items()
+    }
+    return hashlib.sha256(json.dumps(files, sort_keys=True).encode("utf-8")).hexdigest()
+
+def artifact_path(chroma_path: str = CHROMA_PATH) -> str:
+    return os.path.join(chroma_path, ARTIFACT_FILE)
+
+def write_artifact_metadata(manifest: Dict, chunk_counts: Dict[str, int], chroma_path: str = CHROMA_PATH) -> Dict:
+    """Describes the index in chroma_path so a server can check it was built for its configuration."""
+    metadata = {
+        "format": ARTIFACT_FORMAT,
+        "embedding_model": EMBEDDING_MODEL,
+        "chunking": chunking_spec(),
+        "storage": manifest.get("storage", {}),
+        "layout": manifest.get("layout", "per_type"),
+        "corpus_hash": corpus_hash(manifest),
+        "index_version": manifest.get("index_version", ""),
+        "chunks": chunk_counts,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+
+    path = artifact_path(chroma_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+    return metadata
+
+def load_artifact_metadata(chroma_path: str = CHROMA_PATH) -> Optional[Dict]:
+    try:
+        with open(artifact_path(chroma_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def verify_artifact(chroma_path: str = CHROMA_PATH) -> Dict:
+    """
+    Checks the index in chroma_path against this build's configuration.
+
+    Raises:
+        ArtifactError: If the index is missing, predates artifact metadata, or was
+            built with a different embedding model, chunking, layout or (when pinned) corpus
+
+    Returns:
+        The artifact metadata
+    """
+    metadata = load_artifact_metadata(chroma_path)
+    if metadata is None:
+        raise ArtifactError(f"No index artifact at {chroma_path}; build one with python -m scripts.build_vectordb")
+
+    problems = []
+    if metadata.get("format") != ARTIFACT_FORMAT:
+        problems.append(f"format {metadata.get('format')} != {ARTIFACT_FORMAT}")
+    if metadata.get("embedding_model") != EMBEDDING_MODEL:
+        problems.append(f"embedding model {metadata.get('embedding_model')!r} != {EMBEDDING_MODEL!r}")
+    if metadata.get("chunking") != chunking_spec():
+        problems.append(f"chunking {metadata.get('chunking')} != {chunking_spec()}")
+    # Artifacts from before layouts existed are per-type
+    if metadata.get("layout", "per_type") != INDEX_LAYOUT:
+        problems.append(f"index layout {metadata.get('layout', 'per_type')!r} != {INDEX_LAYOUT!r}")
+    if INDEX_CORPUS_HASH and metadata.get("corpus_hash") != INDEX_CORPUS_HASH:
+        problems.append(f"corpus hash {metadata.get('corpus_hash')} != pinned {INDEX_CORPUS_HASH}")
+
+    if problems:
+        raise ArtifactError(f"Index at {chroma_path} doesn't match this build: " + "; ".join(problems))
+
+    return metadata
+
+def default_artifact_name(metadata: Dict) -> str:
+    return f"legal-rag-index-{metadata['corpus_hash'][:12]}-{metadata['index_version'][:8]}.tar.gz"
+
+def pack_artifact(output: str, chroma_path: str = CHROMA_PATH) -> str:
+    """
+    Packs the index directory into a gzipped tarball.
+
+    Args:
+        output: Archive path, or an existing directory to write a versioned file name into
+
+    Returns:
+        Path of the written archive
+    """
+    metadata = verify_artifact(chroma_path)
+    if os.path.isdir(output):
+        output = os.path.join(output, default_artifact_name(metadata))
+
+    tmp_output = output + ".tmp"
+    with tarfile.open(tmp_output, "w:gz") as tar:
+        for name in sorted(os.listdir(chroma_path)):
+            if not name.endswith(".tmp"):
+                tar.add(os.path.join(chroma_path, name), arcname=name)
+    os.replace(tmp_output, output)
+
+    return output
+
+def unpack_artifact(archive: str, chroma_path: str = CHROMA_PATH):
+    """
+    Unpacks an index archive into chroma_path.
+
+    The archive is extracted next to chroma_path and renamed into place, so replicas
+    starting together on a shared volume never see a half-extracted index; whichever
+    finishes second discards its copy.
+    """
+    staging = f"{chroma_path.rstrip(os.sep)}.unpack-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    with tarfile.open(archive, "r:*") as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(staging, filter="data")
+        else:
+            tar.extractall(staging)
+
+    try:
+        os.rename(staging, chroma_path)
+    except OSError:
+        if not os.path.exists(chroma_path):
+            raise
+        shutil.rmtree(staging, ignore_errors=True)
+
+def prepare_index(chroma_path: str = CHROMA_PATH, archive: str = INDEX_ARTIFACT) -> Dict:
+    """
+    Makes sure a servable index is at chroma_path, without embedding anything.
+
+    A missing index is unpacked from archive when one is configured. The index is
+    then verified, so a server refuses to start on a mismatched artifact.
+
+    Raises:
+        ArtifactError: If no index is available or it doesn't match this build
+    """
+    if not os.path.exists(chroma_path):
+        if not archive:
+            raise ArtifactError(f"No index at {chroma_path} and INDEX_ARTIFACT is not set")
+        print(f"Unpacking index artifact {archive} into {chroma_path}...")
+        unpack_artifact(archive, chroma_path)
+
+    return verify_artifact(chroma_path)
@@ -0,0 +1,243 @@
+import json
+import mmap
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.config import CHROMA_PATH, CHUNK_STORE_ENABLED, COMPACT_METADATA, METADATA_FIELDS
+
+SOURCES_FILE = "sources.json"
+
+# Rewrite the data file once less than this fraction of it is still referenced
+MIN_LIVE_FRACTION = 0.5
+
+def storage_spec() -> Dict:
+    return {
+        "metadata": "compact" if COMPACT_METADATA else "full",
+        "text": "chunk_store" if CHUNK_STORE_ENABLED else "chroma"
+    }
+
+def chunk_store_dir(collection_name: str, chroma_path: str = CHROMA_PATH) -> str:
+    return os.path.join(chroma_path, "chunks", collection_name)
+
+def _write_json(path: str, value):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+class SourceTable:
+    """Source file names interned as small integers, shared by every collection."""
+
+    def __init__(self, chroma_path: str = CHROMA_PATH):
+        self.path = os.path.join(chroma_path, SOURCES_FILE)
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.names: List[str] = json.load(f)
+        except FileNotFoundError:
+            self.names = []
+        self._ids = {name: source_id for source_id, name in enumerate(self.names)}
+        self._dirty = False
+
+    def intern(self, name: str) -> int:
+        source_id = self._ids.get(name)
+        if source_id is None:
+            source_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+            self._dirty = True
+        return source_id
+
+    def name(self, source_id: int) -> str:
+        return self.names[source_id] if 0 <= source_id < len(self.names) else "unknown"
+
+    def save(self):
+        # Entries are only ever appended, so IDs already stored in Chroma stay valid
+        if self._dirty:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            _write_json(self.path, self.names)
+            self._dirty = False
+
+def stored_metadata(metadata: Dict, sources: Optional[SourceTable]) -> Dict:
+    """Metadata as written to Chroma: as-is, or with a source table only METADATA_FIELDS with the source interned."""
+    if sources is None:
+        return metadata
+
+    compact = {key: metadata[key] for key in METADATA_FIELDS if key in metadata}
+    if "source" in compact:
+        compact["source_id"] = sources.intern(compact.pop("source"))
+    return compact
+
+class ChunkStore:
+    """
+    Chunk text for one collection, stored outside Chroma.
+
+    Each text is zlib-compressed and appended to a data file; index.json names the
+    data file and maps chunk ID to (offset, length). Reads memory-map the data file
+    and decompress only the chunks asked for. Deletes just drop index entries; once
+    most of the data file is garbage, save() copies the live chunks into a new data
+    file, so a reader holding the previous index keeps reading the file it matches.
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.index_path = os.path.join(store_dir, "index.json")
+
+        for _ in range(2):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+            except FileNotFoundError:
+                stored = {"data": "data-0.bin", "chunks": {}}
+
+            self.data_name: str = stored["data"]
+            self.index: Dict[str, List[int]] = stored["chunks"]
+            try:
+                # Held open so a compaction by a concurrent sync can't remove the file under us
+                self._file = open(os.path.join(store_dir, self.data_name), "rb")
+                break
+            except FileNotFoundError:
+                self._file = None
+                if not self.index:
+                    break
+
+        self._map = None
+        self._map_lock = threading.Lock()
+
+    @property
+    def data_path(self) -> str:
+        return os.path.join(self.store_dir, self.data_name)
+
+    def _view(self, end: int):
+        # Remap when the file has grown past the mapped region (appends from this process)
+        with self._map_lock:
+            if self._map is None or len(self._map) < end:
+                if self._file is None:
+                    self._file = open(self.data_path, "rb")
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map
+
+    def get(self, ids: List[str]) -> List[Optional[str]]:
+        texts = []
+        for chunk_id in ids:
+            entry = self.index.get(chunk_id)
+            if entry is None:
+                texts.append(None)
+                continue
+            offset, length = entry
+            view = self._view(offset + length)
+            texts.append(zlib.decompress(view[offset:offset + length]).decode("utf-8"))
+        return texts
+
+    def put(self, chunks: Iterable[Tuple[str, str]]):
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(self.data_path, "ab") as f:
+            offset = f.tell()
+            for chunk_id, text in chunks:
+                blob = zlib.compress(text.encode("utf-8"))
+                f.write(blob)
+                self.index[chunk_id] = [offset, len(blob)]
+                offset += len(blob)
+
+    def delete(self, ids: Iterable[str]):
+        for chunk_id in ids:
+            self.index.pop(chunk_id, None)
+
+    def _compact(self) -> str:
+        generation = int(self.data_name[len("data-"):-len(".bin")]) + 1
+        data_name = f"data-{generation}.bin"
+
+        index = {}
+        with open(os.path.join(self.store_dir, data_name), "wb") as out:
+            for chunk_id, (offset, length) in sorted(self.index.items(), key=lambda item: item[1][0]):
+                index[chunk_id] = [out.tell(), length]
+                out.write(self._view(offset + length)[offset:offset + length])
+
+        old_path = self.data_path
+        self.close()
+        self.data_name, self.index = data_name, index
+        return old_path
+
+    def save(self):
+        """Writes the index, first moving the live chunks to a new data file if most of this one is unreferenced."""
+        if not os.path.exists(self.data_path):
+            return
+
+        old_path = None
+        live = sum(length for _, length in self.index.values())
+        if live < MIN_LIVE_FRACTION * os.path.getsize(self.data_path):
+            old_path = self._compact()
+
+        _write_json(self.index_path, {"data": self.data_name, "chunks": self.index})
+
+        if old_path is not None:
+            os.remove(old_path)
+
+    def close(self):
+        with self._map_lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+_loaded_stores: Dict[str, Tuple[int, ChunkStore]] = {}
+_loaded_sources: Dict[str, Tuple[int, SourceTable]] = {}
+_loaded_lock = threading.Lock()
+
+def _version(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def load_chunk_store(collection_name: str, chroma_path: str = CHROMA_PATH) -> Optional[ChunkStore]:
+    """Returns the collection's ChunkStore, reopening it after a sync, or None if it has none."""
+    store_dir = chunk_store_dir(collection_name, chroma_path)
+    version = _version(os.path.join(store_dir, "index.json"))
+    if version is None:
+        return None
+
+    with _loaded_lock:
+        cached = _loaded_stores.get(store_dir)
+        if cached is None or cached[0] != version:
+            # A replaced store may still be mid-read on another thread, so it is left to the GC rather than closed
+            cached = _loaded_stores[store_dir] = (version, ChunkStore(store_dir))
+        return cached[1]
+
+def load_source_table(chroma_path: str = CHROMA_PATH) -> SourceTable:
+    version = _version(os.path.join(chroma_path, SOURCES_FILE))
+    with _loaded_lock:
+        cached = _loaded_sources.get(chroma_path)
+        if cached is None or cached[0] != version:
+            cached = _loaded_sources[chroma_path] = (version, SourceTable(chroma_path))
+        return cached[1]
+
+def resolve_chunks(collection_name: str, ids: List[str], texts: Optional[List[Optional[str]]],
+                   metadatas: Optional[List[Optional[Dict]]],
+                   chroma_path: str = CHROMA_PATH) -> Tuple[List[str], List[Dict]]:
+    """
+    Turns what Chroma returned for ids back into full (text, metadata).
+
+    Text Chroma doesn't hold is read from the collection's chunk store, and interned
+    source IDs are expanded back to file names, so callers see the same documents
+    whichever storage mode the index was built with.
+    """
+    texts = list(texts) if texts else [None] * len(ids)
+    if any(text is None for text in texts):
+        store = load_chunk_store(collection_name, chroma_path)
+        stored = store.get(ids) if store is not None else [None] * len(ids)
+        texts = [text if text is not None else (stored_text or "") for text, stored_text in zip(texts, stored)]
+
+    resolved = []
+    sources = None
+    for metadata in metadatas or [None] * len(ids):
+        metadata = dict(metadata or {})
+        if "source_id" in metadata:
+            sources = sources or load_source_table(chroma_path)
+            metadata["source"] = sources.name(metadata.pop("source_id"))
+        resolved.append(metadata)
+
+    return texts, resolved
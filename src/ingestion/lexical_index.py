@@ -0,0 +1,144 @@
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from src.config import CHROMA_PATH
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    # Keeps tokens like "498a", "302" and "21" intact, which dense embeddings tend to blur
+    return TOKEN_PATTERN.findall(text.lower())
+
+def lexical_index_dir(collection_name: str, chroma_path: str = CHROMA_PATH) -> str:
+    return os.path.join(chroma_path, "lexical", collection_name)
+
+def build_lexical_index(chunks: Iterable[Tuple[str, str]], index_dir: str) -> int:
+    """
+    Builds a BM25 inverted index over (chunk id, text) pairs and writes it to index_dir.
+
+    Postings are stored as flat NumPy arrays (document numbers and term frequencies,
+    addressed through per-term offsets) so they can be memory-mapped at query time.
+
+    Returns:
+        Number of indexed chunks
+    """
+    ids = []
+    doc_lens = []
+    postings = defaultdict(list)
+
+    for doc_number, (chunk_id, text) in enumerate(chunks):
+        counts = Counter(tokenize(text or ""))
+        ids.append(chunk_id)
+        doc_lens.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings[term].append((doc_number, tf))
+
+    terms = sorted(postings)
+    offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    for i, term in enumerate(terms):
+        offsets[i + 1] = offsets[i] + len(postings[term])
+
+    doc_numbers = np.empty(offsets[-1], dtype=np.int32)
+    tfs = np.empty(offsets[-1], dtype=np.uint16)
+    for i, term in enumerate(terms):
+        entries = np.asarray(postings[term], dtype=np.int64)
+        doc_numbers[offsets[i]:offsets[i + 1]] = entries[:, 0]
+        tfs[offsets[i]:offsets[i + 1]] = np.minimum(entries[:, 1], np.iinfo(np.uint16).max)
+
+    # Write next to the live index and swap it in, so readers never see a half-written one
+    tmp_dir = index_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_dir, "doc_numbers.npy"), doc_numbers)
+    np.save(os.path.join(tmp_dir, "tfs.npy"), tfs)
+    np.save(os.path.join(tmp_dir, "doc_lens.npy"), np.asarray(doc_lens, dtype=np.int32))
+
+    with open(os.path.join(tmp_dir, "terms.json"), "w", encoding="utf-8") as f:
+        json.dump({term: i for i, term in enumerate(terms)}, f)
+    with open(os.path.join(tmp_dir, "ids.json"), "w", encoding="utf-8") as f:
+        json.dump(ids, f)
+
+    shutil.rmtree(index_dir, ignore_errors=True)
+    os.replace(tmp_dir, index_dir)
+
+    return len(ids)
+
+class LexicalIndex:
+    """Read side of a BM25 index written by build_lexical_index, with postings memory-mapped."""
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self.offsets = np.load(os.path.join(index_dir, "offsets.npy"), mmap_mode="r")
+        self.doc_numbers = np.load(os.path.join(index_dir, "doc_numbers.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(index_dir, "tfs.npy"), mmap_mode="r")
+        self.doc_lens = np.load(os.path.join(index_dir, "doc_lens.npy"), mmap_mode="r")
+
+        with open(os.path.join(index_dir, "terms.json"), "r", encoding="utf-8") as f:
+            self.terms: Dict[str, int] = json.load(f)
+        with open(os.path.join(index_dir, "ids.json"), "r", encoding="utf-8") as f:
+            self.ids: List[str] = json.load(f)
+
+        self.avg_doc_len = float(self.doc_lens.mean()) if len(self.doc_lens) else 0.0
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Scores every chunk containing a query term with BM25.
+
+        Returns:
+            Up to k (chunk id, score) pairs, best first
+        """
+        total = len(self.ids)
+        if total == 0 or k <= 0:
+            return []
+
+        scores = np.zeros(total, dtype=np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lens / max(self.avg_doc_len, 1e-9))
+
+        for term in set(tokenize(query)):
+            term_number = self.terms.get(term)
+            if term_number is None:
+                continue
+
+            start, end = self.offsets[term_number], self.offsets[term_number + 1]
+            docs = self.doc_numbers[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+
+            df = end - start
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm[docs])
+
+        k = min(k, total)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [(self.ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+_loaded: Dict[str, Tuple[float, LexicalIndex]] = {}
+_loaded_lock = threading.Lock()
+
+def load_lexical_index(collection_name: str, chroma_path: str = CHROMA_PATH):
+    """Returns the LexicalIndex for a collection, reopening it after a rebuild, or None if none exists."""
+    index_dir = lexical_index_dir(collection_name, chroma_path)
+    ids_path = os.path.join(index_dir, "ids.json")
+
+    try:
+        mtime = os.path.getmtime(ids_path)
+    except OSError:
+        return None
+
+    with _loaded_lock:
+        cached = _loaded.get(index_dir)
+        if cached is None or cached[0] != mtime:
+            cached = _loaded[index_dir] = (mtime, LexicalIndex(index_dir))
+        return cached[1]
@@ -1,8 +1,15 @@
 import os
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Iterator, Optional, Tuple, Union
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from pypdf import PdfReader
+from src.config import CHUNK_SETTINGS, CHUNKING_MODE, INGEST_WORKERS, PAGES_PER_TASK
+from src.ingestion.structure import structure_chunks
+
+PageRange = Tuple[str, str, str, int, int]
 
 def load_pdfs_from_directory(directory_path: str, doc_type: str) -> List[Document]:
     documents = []
@@ -21,15 +28,7 @@ def load_pdfs_from_directory(directory_path: str, doc_type: str) -> List[Documen
     return documents
 
 def chunk_documents(documents: List[Document], doc_type: str) -> List[Document]:
-    if doc_type == "statutes":
-        chunk_size = 1000
-        chunk_overlap = 200
-    elif doc_type == "case_laws":
-        chunk_size = 800
-        chunk_overlap = 150
-    else:
-        chunk_size = 1000
-        chunk_overlap = 200
+    chunk_size, chunk_overlap = CHUNK_SETTINGS.get(doc_type, CHUNK_SETTINGS["regulations"])
 
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
@@ -40,19 +39,114 @@ def chunk_documents(documents: List[Document], doc_type: str) -> List[Document]:
     chunks = text_splitter.split_documents(documents)
     return chunks
 
-def load_and_chunk_all_documents() -> Dict[str, List[Document]]:
+def plan_page_ranges(directory_path: str, doc_type: str, filenames: Optional[List[str]] = None,
+                     pages_per_task: int = PAGES_PER_TASK) -> List[PageRange]:
+    # Same file order as load_pdfs_from_directory, so chunk order is unchanged
+    tasks = []
+
+    for filename in os.listdir(directory_path):
+        if filenames is not None and filename not in filenames:
+            continue
+        if filename.endswith('.pdf'):
+            file_path = os.path.join(directory_path, filename)
+            total_pages = len(PdfReader(file_path).pages)
+
+            for start in range(0, total_pages, pages_per_task):
+                end = min(start + pages_per_task, total_pages)
+                tasks.append((file_path, filename, doc_type, start, end))
+
+    return tasks
+
+def parse_page_range(task: PageRange) -> List[Document]:
+    # Runs in a worker process; extracts text the same way PyPDFLoader does
+    file_path, filename, doc_type, start, end = task
+    reader = PdfReader(file_path)
+    total_pages = len(reader.pages)
+
+    documents = []
+    for page_number in range(start, end):
+        text = reader.pages[page_number].extract_text(extraction_mode="plain").strip()
+        documents.append(Document(
+            page_content=text,
+            metadata={
+                'source': filename,
+                'page': page_number,
+                'page_label': reader.page_labels[page_number],
+                'total_pages': total_pages,
+                'doc_type': doc_type
+            }
+        ))
+
+    return documents
+
+def iter_page_ranges(directory_path: str, doc_type: str, workers: int = INGEST_WORKERS,
+                     filenames: Optional[List[str]] = None) -> Iterator[List[Document]]:
+    """
+    Parses the PDFs in directory_path across worker processes and yields pages a range at a time.
+
+    Large files are split into page ranges so one long act does not serialise the
+    whole parse. Only a bounded window of ranges is in flight at a time, and results
+    are consumed in submission order, so pages come out in document order. Passing
+    filenames restricts parsing to those files.
+    """
+    tasks = plan_page_ranges(directory_path, doc_type, filenames)
+
+    if workers <= 1:
+        for task in tasks:
+            yield parse_page_range(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        remaining = iter(tasks)
+
+        for task in remaining:
+            pending.append(pool.submit(parse_page_range, task))
+            if len(pending) >= 2 * workers:
+                break
+
+        while pending:
+            pages = pending.popleft().result()
+
+            next_task = next(remaining, None)
+            if next_task is not None:
+                pending.append(pool.submit(parse_page_range, next_task))
+
+            yield pages
+
+def iter_chunks(directory_path: str, doc_type: str, workers: int = INGEST_WORKERS,
+                filenames: Optional[List[str]] = None, mode: str = CHUNKING_MODE) -> Iterator[Document]:
+    """
+    Yields the chunks of the PDFs in directory_path as their pages are parsed.
+
+    In "fixed" mode every page is split on its own, in the same order as
+    chunk_documents(load_pdfs_from_directory(...)) would produce. In "structure" mode
+    the pages of each file are streamed through structure_chunks, which cuts at
+    section and paragraph boundaries across page (and page range) breaks.
+    """
+    page_ranges = iter_page_ranges(directory_path, doc_type, workers, filenames)
+
+    if mode == "structure":
+        yield from structure_chunks((page for pages in page_ranges for page in pages), doc_type)
+        return
+
+    for pages in page_ranges:
+        yield from chunk_documents(pages, doc_type)
+
+def load_and_chunk_all_documents(workers: int = INGEST_WORKERS,
+                                 lazy: bool = False) -> Dict[str, Union[List[Document], Iterator[Document]]]:
     from src.config import DATA_PATHS
 
     all_chunked_docs = {}
 
     for doc_type, path in DATA_PATHS.items():
-        print(f"Loading {doc_type} from {path}...")
-        docs = load_pdfs_from_directory(path, doc_type)
-        print(f"Loaded {len(docs)} pages from {doc_type}")
+        chunks = iter_chunks(path, doc_type, workers)
 
-        print(f"Chunking {doc_type}...")
-        chunks = chunk_documents(docs, doc_type)
-        print(f"Created {len(chunks)} chunks from {doc_type}")
+        # Lazy callers (build_vectorstore) consume the generator batch by batch
+        if not lazy:
+            print(f"Loading and chunking {doc_type} from {path} with {workers} workers...")
+            chunks = list(chunks)
+            print(f"Created {len(chunks)} chunks from {doc_type}")
 
         all_chunked_docs[doc_type] = chunks
 
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+from typing import Dict, Tuple
+from src.config import CHROMA_PATH
+
+MANIFEST_FILE = "ingest_manifest.json"
+MANIFEST_VERSION = 1
+
+def manifest_path(chroma_path: str = CHROMA_PATH) -> str:
+    return os.path.join(chroma_path, MANIFEST_FILE)
+
+def empty_manifest() -> Dict:
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+def load_manifest(chroma_path: str = CHROMA_PATH) -> Dict:
+    path = manifest_path(chroma_path)
+    if not os.path.exists(path):
+        return empty_manifest()
+
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    # An unknown layout is treated like a missing manifest, forcing a clean rebuild
+    if manifest.get("version") != MANIFEST_VERSION:
+        return empty_manifest()
+
+    return manifest
+
+def index_version_of(manifest: Dict) -> str:
+    # Changes whenever any stored chunk changes, including re-chunking of unchanged files
+    return hashlib.sha256(json.dumps(manifest["files"], sort_keys=True).encode("utf-8")).hexdigest()
+
+_version_memo: Dict[str, Tuple[float, str]] = {}
+
+def current_index_version(chroma_path: str = CHROMA_PATH) -> str:
+    """Returns the index version recorded in the manifest, re-reading it only when the file changes."""
+    path = manifest_path(chroma_path)
+
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return ""
+
+    memo = _version_memo.get(path)
+    if memo is None or memo[0] != mtime:
+        memo = _version_memo[path] = (mtime, load_manifest(chroma_path).get("index_version", ""))
+
+    return memo[1]
+
+_labels_memo: Dict[str, Tuple[float, Dict[str, Tuple[str, str]]]] = {}
+
+def chunk_labels(chroma_path: str = CHROMA_PATH) -> Dict[str, Tuple[str, str]]:
+    """(doc_type, source file) of every indexed chunk by ID, re-reading the manifest only when it changes."""
+    path = manifest_path(chroma_path)
+
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+
+    memo = _labels_memo.get(path)
+    if memo is None or memo[0] != mtime:
+        labels = {}
+        for doc_type, known_files in load_manifest(chroma_path)["files"].items():
+            for filename, entry in known_files.items():
+                labels.update((chunk_id, (doc_type, filename)) for chunk_id in entry["chunks"])
+        memo = _labels_memo[path] = (mtime, labels)
+
+    return memo[1]
+
+def source_doc_types(chroma_path: str = CHROMA_PATH) -> Dict[str, str]:
+    """The doc_type of every source file in the index."""
+    return {source: doc_type for doc_type, source in chunk_labels(chroma_path).values()}
+
+def save_manifest(manifest: Dict, chroma_path: str = CHROMA_PATH):
+    manifest["index_version"] = index_version_of(manifest)
+
+    os.makedirs(chroma_path, exist_ok=True)
+    path = manifest_path(chroma_path)
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    os.replace(tmp_path, path)
+
+def file_hash(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_hash(source: str, page, text: str) -> str:
+    return hashlib.sha256(f"{source}\x00{page}\x00{text}".encode("utf-8")).hexdigest()
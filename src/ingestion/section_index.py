@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Tuple
+from langchain_core.documents import Document
+from src.config import CHROMA_PATH
+from src.ingestion.structure import FOOTNOTE
+
+SECTION_INDEX_FILE = "section_index.json"
+
+# Headings in the bare acts look like "302. Punishment for murder.—Whoever ..." or
+# "2[41A. Notice of appearance before police officer. —(1) ...". Requiring the dash
+# after the title keeps the table-of-contents lines at the start of each act out.
+SECTION_HEADING = re.compile(
+    r"^\s*(?:\d+\[)?\s*(\d{1,3}[A-Z]{0,3})\.\s+[A-Z][^\n]{0,200}?\s*(?:—|–|--)",
+    re.MULTILINE
+)
+
+# Where an act's own text ends and appended material begins, e.g. "APPENDIX" followed by
+# "EXTRACTS FROM THE CODE OF CRIMINAL PROCEDURE (AMENDMENT) ACT, 2005", whose numbered
+# sections are the amending Act's, not the act's
+APPENDIX_START = re.compile(r"^\s*(?:APPENDIX\s*$|EXTRACTS FROM\b|[A-Z ,]*\(AMENDMENT\) ACT\b)", re.MULTILINE)
+
+SECTION_NUMBER = re.compile(r"(\d+)([A-Z]*)")
+
+# A section rarely spans more chunks than this; the cap stops schedules after the last section piling up
+MAX_CHUNKS_PER_SECTION = 8
+
+def find_section_headings(text: str) -> List[str]:
+    """Section numbers headed in text, skipping amendment footnotes ("2. Subs. by Act 26 of 1955, ...")."""
+    headings = []
+    for match in SECTION_HEADING.finditer(text):
+        line_end = text.find("\n", match.start())
+        if not FOOTNOTE.search(text[match.start():line_end if line_end != -1 else len(text)]):
+            headings.append(match.group(1).upper())
+    return headings
+
+def section_key(section: str) -> Tuple[int, str]:
+    # "41" < "41A" < "41B" < "42"
+    number, suffix = SECTION_NUMBER.match(section).groups()
+    return int(number), suffix
+
+def in_order(sections: List[str]) -> List[bool]:
+    """
+    Marks the occurrences that belong to the longest run of non-decreasing section numbers.
+
+    The act's own headings run in order from first to last; stray matches (table-of-contents
+    lines, cross-references, a footnote the FOOTNOTE pattern misses) break that order and are
+    left out, wherever they appear.
+    """
+    keys = [section_key(section) for section in sections]
+    # tails[length - 1] is the position ending the best run of that length found so far
+    tails: List[int] = []
+    previous = [-1] * len(keys)
+    for position, key in enumerate(keys):
+        low, high = 0, len(tails)
+        while low < high:
+            middle = (low + high) // 2
+            if keys[tails[middle]] <= key:
+                low = middle + 1
+            else:
+                high = middle
+        previous[position] = tails[low - 1] if low else -1
+        if low == len(tails):
+            tails.append(position)
+        else:
+            tails[low] = position
+
+    kept = [False] * len(keys)
+    position = tails[-1] if tails else -1
+    while position != -1:
+        kept[position] = True
+        position = previous[position]
+    return kept
+
+def sections_for_chunks(chunks: Iterable[Tuple[str, Document]]) -> Dict[str, List[str]]:
+    """
+    Maps every section number in one act to the IDs of the chunks that hold its text.
+
+    Chunks must be in document order. A chunk belongs to each section whose heading it
+    contains, and to the section still open from the previous chunk. Chunks from the
+    structure chunker carry a 'section' label ("302" or "225A-225B"), which also covers
+    headings that wrap onto a second line, and only continue a section they are
+    labelled with. Amendment footnotes and everything from an appendix on are ignored,
+    and only headings whose numbers run in order through the act count, so a section
+    points at its first heading in the body.
+    """
+    chunks = list(chunks)
+
+    found: List[Tuple[int, str]] = []
+    previous: List[str] = []
+    for position, (_, doc) in enumerate(chunks):
+        text = doc.page_content
+        appendix = APPENDIX_START.search(text)
+        if appendix:
+            text = text[:appendix.start()]
+
+        # A structure chunk's own label would point into the appendix too
+        labelled = doc.metadata.get("section", "").split("-") if doc.metadata.get("section") and not appendix else []
+        headings = list(dict.fromkeys(labelled[:1] + find_section_headings(text) + labelled[1:]))
+        # A heading repeated by the next chunk (overlap, or a section split across chunks) counts once
+        found.extend((position, section) for section in headings if section not in previous)
+        previous = headings
+
+        if appendix:
+            # The chunk still continues the open section if any of the act's text precedes the appendix
+            chunks = chunks[:position + 1] if re.search(r"[a-z]", text) else chunks[:position]
+            break
+
+    kept = in_order([section for _, section in found])
+    headings_at: Dict[int, List[str]] = {}
+    for (position, section), keep in zip(found, kept):
+        if keep:
+            headings_at.setdefault(position, []).append(section)
+
+    sections: Dict[str, List[str]] = {}
+    current = None
+
+    for position, (chunk_id, doc) in enumerate(chunks):
+        labelled = doc.metadata.get("section", "").split("-") if doc.metadata.get("section") else []
+
+        if current is not None and len(sections[current]) < MAX_CHUNKS_PER_SECTION and (
+                not labelled or current in labelled):
+            sections[current].append(chunk_id)
+
+        for section in headings_at.get(position, []):
+            # Headings arrive in order, so a section seen before is only repeated by chunk overlap
+            sections.setdefault(section, [])
+            if chunk_id not in sections[section]:
+                sections[section].append(chunk_id)
+            current = section
+
+    return sections
+
+def section_index_path(chroma_path: str = CHROMA_PATH) -> str:
+    return os.path.join(chroma_path, SECTION_INDEX_FILE)
+
+def write_section_index(statute_files: Dict, chroma_path: str = CHROMA_PATH):
+    """Writes {source: {section: [chunk ids]}} for every statute file recorded in the manifest."""
+    index = {filename: entry.get("sections", {}) for filename, entry in statute_files.items()}
+
+    path = section_index_path(chroma_path)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+_loaded: Dict[str, Tuple[float, Dict]] = {}
+_loaded_lock = threading.Lock()
+
+def load_section_index(chroma_path: str = CHROMA_PATH) -> Dict[str, Dict[str, List[str]]]:
+    path = section_index_path(chroma_path)
+
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = _loaded[path] = (mtime, json.load(f))
+        return cached[1]
+
+def lookup_section(source: str, section: str, chroma_path: str = CHROMA_PATH) -> List[str]:
+    return load_section_index(chroma_path).get(source, {}).get(section.upper(), [])
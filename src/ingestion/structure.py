@@ -0,0 +1,194 @@
+import re
+from itertools import groupby
+from typing import Iterable, Iterator, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.config import STRUCTURE_CHUNK_CHARS, STRUCTURE_MIN_CHARS
+
+# "CHAPTER XVI" / "Chapter III" on a line of its own
+CHAPTER_HEADING = re.compile(r"^\s*CHAPTER\s+([IVXLC]+|\d+)[A-Z]?\s*\.?\s*$", re.IGNORECASE)
+
+# "302. Punishment for murder.—" and "2[41A. Notice of appearance ... —"; the dash can be on the next line
+NUMBERED_LINE = re.compile(r"^\s*(?:\d+\[)?\s*(\d{1,3}[A-Z]{0,3})\.\s+[A-Z]")
+HEADING_DASH = re.compile(r"—|–|--|\.-")
+
+# Model Police Act style: "24. Rank structure at the primary levels of Civil Police" with the text below
+TITLE_LINE = re.compile(r"^\s*(\d{1,3}[A-Z]{0,3})\.\s+[A-Z][^.;:,]{2,150}$")
+
+# Lines that start a new paragraph inside a section: sub-sections, clauses, provisos, numbered paragraphs
+PARAGRAPH_START = re.compile(
+    r"^\s*(?:\(\d+[A-Z]?\)|\([a-z]{1,4}\)|\d+(?:\.\d+)*\.?\s|•|Explanation|Illustration|Provided)"
+)
+
+PAGE_NUMBER = re.compile(r"^\s*\d{1,4}\s*$")
+
+# Amendment footnotes ("2. Subs. by Act 13 of 2013, s. 4 ...") are numbered too but aren't contents entries
+FOOTNOTE = re.compile(r"\bby Act\b|w\.e\.f\.|\bRep\. by\b|\bOmitted by\b")
+
+# A unit with this many numbered entries, making up this share of its lines, is a table of contents
+CONTENTS_MIN_ENTRIES = 4
+CONTENTS_MIN_SHARE = 0.25
+
+# Which boundaries mean a new section for each document type; judgments are only cut at paragraphs
+SECTION_STYLES = {
+    "statutes": ("dash",),
+    "case_laws": (),
+    "regulations": ("dash", "title")
+}
+
+Line = Tuple[str, int]
+
+def _lines(pages: Iterable[Document]) -> Iterator[Line]:
+    # (text, page) for every line of a file, without the page number printed at the top of each page
+    for page in pages:
+        lines = page.page_content.splitlines()
+        first = next((i for i, line in enumerate(lines) if line.strip()), None)
+        if first is not None and PAGE_NUMBER.match(lines[first]):
+            del lines[first]
+        for line in lines:
+            yield line.rstrip(), page.metadata["page"]
+
+def section_heading(line: str, next_line: str, styles: Tuple[str, ...]) -> Optional[str]:
+    """Section number if line starts a section under the given heading styles."""
+    if "dash" in styles:
+        match = NUMBERED_LINE.match(line)
+        # Table-of-contents entries have no dash after the title, so they aren't headings; a title
+        # wrapping onto the next line is allowed, unless that line is the next numbered entry
+        if match and (HEADING_DASH.search(line) or (
+                not NUMBERED_LINE.match(next_line) and HEADING_DASH.search((line + " " + next_line)[:260]))):
+            return match.group(1).upper()
+    if "title" in styles:
+        match = TITLE_LINE.match(line)
+        following = next_line.strip()
+        if match and (not following or following.startswith("(") or following[:1].isupper()):
+            return match.group(1).upper()
+    return None
+
+def _is_contents(lines: List[Line]) -> bool:
+    text_lines = [text for text, _ in lines if text.strip()]
+    entries = sum(1 for text in text_lines if NUMBERED_LINE.match(text) and not FOOTNOTE.search(text))
+    return entries >= CONTENTS_MIN_ENTRIES and entries >= CONTENTS_MIN_SHARE * len(text_lines)
+
+class _Unit:
+    """A chapter preamble or section being collected: its lines, pages and section numbers."""
+
+    def __init__(self, chapter: Optional[str]):
+        self.chapter = chapter
+        self.sections: List[str] = []
+        self.lines: List[Line] = []
+
+    def size(self) -> int:
+        return sum(len(text) + 1 for text, _ in self.lines)
+
+    def section_label(self) -> Optional[str]:
+        if not self.sections:
+            return None
+        if len(self.sections) == 1:
+            return self.sections[0]
+        return f"{self.sections[0]}-{self.sections[-1]}"
+
+def _paragraphs(lines: List[Line]) -> List[List[Line]]:
+    paragraphs = []
+    for i, (text, page) in enumerate(lines):
+        previous = lines[i - 1][0].rstrip() if i else ""
+        starts_paragraph = (
+            not paragraphs
+            or not text.strip()
+            or not previous.strip()
+            or PARAGRAPH_START.match(text)
+            # A sentence ending at the line end followed by a capital usually means a new paragraph
+            or (previous.endswith((".", ":", ";")) and text.lstrip()[:1].isupper())
+        )
+        if starts_paragraph:
+            paragraphs.append([])
+        if text.strip():
+            paragraphs[-1].append((text, page))
+    return [paragraph for paragraph in paragraphs if paragraph]
+
+def _pack(unit: _Unit, max_chars: int, splitter: RecursiveCharacterTextSplitter) -> Iterator[Tuple[str, int, int]]:
+    # Whole sections stay whole; longer ones are packed paragraph by paragraph up to max_chars
+    text = "\n".join(line for line, _ in unit.lines).strip()
+    if len(text) <= max_chars:
+        yield text, unit.lines[0][1], unit.lines[-1][1]
+        return
+
+    current: List[Line] = []
+    size = 0
+    for paragraph in _paragraphs(unit.lines):
+        paragraph_size = sum(len(line) + 1 for line, _ in paragraph)
+        if current and size + paragraph_size > max_chars:
+            yield "\n".join(line for line, _ in current).strip(), current[0][1], current[-1][1]
+            current, size = [], 0
+
+        if paragraph_size > max_chars:
+            # A single paragraph longer than a chunk is the only place text is cut mid-paragraph
+            pages = (paragraph[0][1], paragraph[-1][1])
+            for piece in splitter.split_text("\n".join(line for line, _ in paragraph)):
+                yield piece, pages[0], pages[1]
+            continue
+
+        current.extend(paragraph)
+        size += paragraph_size
+
+    if current:
+        yield "\n".join(line for line, _ in current).strip(), current[0][1], current[-1][1]
+
+def _file_chunks(source: str, pages: Iterable[Document], doc_type: str) -> Iterator[Document]:
+    max_chars = STRUCTURE_CHUNK_CHARS.get(doc_type, STRUCTURE_CHUNK_CHARS["regulations"])
+    styles = SECTION_STYLES.get(doc_type, ())
+    splitter = RecursiveCharacterTextSplitter(chunk_size=max_chars, chunk_overlap=0, length_function=len)
+
+    def emit(unit: _Unit) -> Iterator[Document]:
+        if not unit.lines:
+            return
+        for text, page, page_end in _pack(unit, max_chars, splitter):
+            if not text:
+                continue
+            metadata = {"source": source, "page": page, "page_end": page_end, "doc_type": doc_type}
+            if unit.chapter:
+                metadata["chapter"] = unit.chapter
+            # Contents pages list sections with the same dashes as their headings; don't label them
+            if unit.section_label() and not _is_contents(unit.lines):
+                metadata["section"] = unit.section_label()
+            yield Document(page_content=text, metadata=metadata)
+
+    lines = _lines(pages)
+    unit = _Unit(chapter=None)
+
+    # One line of lookahead, for headings that wrap
+    current = next(lines, None)
+    while current is not None:
+        following = next(lines, None)
+        text, page = current
+        next_line = following[0] if following is not None else ""
+        current = following
+
+        chapter = CHAPTER_HEADING.match(text)
+        section = None if chapter else section_heading(text, next_line, styles)
+
+        # Headings, repealed one-liners and other fragments are kept with what follows
+        if (chapter or section) and unit.size() >= STRUCTURE_MIN_CHARS:
+            yield from emit(unit)
+            unit = _Unit(chapter=unit.chapter)
+
+        if chapter:
+            unit.chapter = chapter.group(1).upper()
+        if section:
+            unit.sections.append(section)
+        unit.lines.append((text, page))
+
+    yield from emit(unit)
+
+def structure_chunks(pages: Iterable[Document], doc_type: str) -> Iterator[Document]:
+    """
+    Chunks a stream of pages at chapter, section and paragraph boundaries.
+
+    Pages must arrive in document order; each file is read as one continuous text, so
+    a section crossing a page break stays in one chunk. A section no longer than
+    STRUCTURE_CHUNK_CHARS becomes exactly one chunk; a longer one is packed paragraph
+    by paragraph. Chunks carry 'section' (e.g. "302", or "225A-225B" when short
+    sections are kept together), 'chapter' where known, and the 'page' / 'page_end'
+    span. Judgments have no sections and are only packed by paragraph.
+    """
+    for source, file_pages in groupby(pages, key=lambda page: page.metadata["source"]):
+        yield from _file_chunks(source, file_pages, doc_type)
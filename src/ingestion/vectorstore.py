@@ -1,45 +1,378 @@
-import chromadb
-from typing import List, Dict
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+from itertools import groupby, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
-from sentence_transformers import SentenceTransformer
-from src.config import CHROMA_PATH, COLLECTION_NAMES, EMBEDDING_MODEL
+from src.config import (
+    COLLECTION_NAMES,
+    DATA_PATHS,
+    EMBEDDING_MODEL,
+    INDEX_COLLECTIONS,
+    INDEX_LAYOUT,
+    INGEST_WORKERS,
+    RETRIEVAL_BACKEND,
+    UNIFIED_COLLECTION_NAME,
+    UPSERT_BATCH_SIZE
+)
+from src.embeddings import get_embedding_service
+from src.resources import get_chroma_client
+from src.ingestion.manifest import chunk_hash, file_hash, load_manifest, save_manifest
+from src.ingestion.lexical_index import build_lexical_index, lexical_index_dir
+from src.ingestion.quantized_index import build_quantized_index, exported_quantization, quantized_index_dir
+from src.ingestion.section_index import sections_for_chunks, write_section_index
+from src.ingestion.artifact import chunking_spec, write_artifact_metadata
+from src.ingestion.chunk_store import (
+    ChunkStore,
+    SourceTable,
+    chunk_store_dir,
+    resolve_chunks,
+    storage_spec,
+    stored_metadata
+)
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+def get_collection(client, collection_name: str):
+    return client.get_or_create_collection(
+        name=collection_name,
+        metadata={"hnsw:space": "cosine"}
+    )
+
+def reset_collection(client, collection_name: str):
+    # Drops everything stored for a collection, including text kept outside Chroma
+    client.delete_collection(collection_name)
+    shutil.rmtree(chunk_store_dir(collection_name), ignore_errors=True)
+    return get_collection(client, collection_name)
+
+def drop_other_layout(client):
+    # Collections of the layout not in use are left behind by switching INDEX_LAYOUT
+    existing = {collection.name for collection in client.list_collections()}
+    for collection_name in set(COLLECTION_NAMES.values()) | {UNIFIED_COLLECTION_NAME}:
+        if collection_name in existing and collection_name not in INDEX_COLLECTIONS.values():
+            client.delete_collection(collection_name)
+            shutil.rmtree(chunk_store_dir(collection_name), ignore_errors=True)
+            shutil.rmtree(quantized_index_dir(collection_name), ignore_errors=True)
+
+def type_filter(doc_type: str) -> Optional[Dict]:
+    # Selects one document type's chunks; only needed when types share a collection
+    return {"doc_type": doc_type} if INDEX_LAYOUT == "unified" else None
+
+def type_chunk_ids(collection, doc_type: str) -> List[str]:
+    return collection.get(where=type_filter(doc_type), include=[])["ids"]
+
+def open_source_table() -> Optional[SourceTable]:
+    return SourceTable() if storage_spec()["metadata"] == "compact" else None
+
+def open_chunk_store(collection_name: str) -> Optional[ChunkStore]:
+    return ChunkStore(chunk_store_dir(collection_name)) if storage_spec()["text"] == "chunk_store" else None
 
 def create_vectorstore():
-    client = chromadb.PersistentClient(path=CHROMA_PATH)
-    embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+    client = get_chroma_client()
+    embedding_model = get_embedding_service()
 
+    # Under the unified layout every document type maps to the same collection
     collections = {}
-    for doc_type, collection_name in COLLECTION_NAMES.items():
-        collection = client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
-        collections[doc_type] = collection
+    for doc_type, collection_name in INDEX_COLLECTIONS.items():
+        collections[doc_type] = get_collection(client, collection_name)
 
     return client, collections, embedding_model
 
-def add_documents_to_collection(collection, documents: List[Document], embedding_model):
-    texts = [doc.page_content for doc in documents]
-    metadatas = [doc.metadata for doc in documents]
-    ids = [f"{doc.metadata.get('source', 'unknown')}_{i}" for i, doc in enumerate(documents)]
+def batched(documents: Iterable, batch_size: int) -> Iterator[List]:
+    iterator = iter(documents)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
 
-    embeddings = embedding_model.encode(texts).tolist()
+def peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
 
-    collection.add(
-        embeddings=embeddings,
-        documents=texts,
-        metadatas=metadatas,
-        ids=ids
-    )
+def with_chunk_ids(documents: Iterable[Document]) -> Iterator[Tuple[str, str, Document]]:
+    # IDs are derived from content, so adding or removing a file never shifts the IDs of others
+    seen = Counter()
+    for doc in documents:
+        source = doc.metadata.get('source', 'unknown')
+        digest = chunk_hash(source, doc.metadata.get('page', ''), doc.page_content)
+
+        chunk_id = f"{source}_{digest[:16]}"
+        seen[chunk_id] += 1
+        if seen[chunk_id] > 1:
+            # Identical text repeated on the same page still needs distinct IDs
+            chunk_id = f"{chunk_id}_{seen[chunk_id] - 1}"
+
+        yield chunk_id, digest, doc
+
+def upsert_chunks(collection, chunks: Iterable[Tuple[str, Document]], embedding_model,
+                  batch_size: int = UPSERT_BATCH_SIZE, sources: Optional[SourceTable] = None,
+                  chunk_store: Optional[ChunkStore] = None) -> int:
+    # Pull, embed and upsert one batch at a time so memory is bounded by batch_size.
+    # With a source table metadata is compacted; with a chunk store the text goes there instead of Chroma
+    total = 0
+    for batch_number, batch in enumerate(batched(chunks, batch_size), start=1):
+        start = time.perf_counter()
+
+        ids = [chunk_id for chunk_id, _ in batch]
+        texts = [doc.page_content for _, doc in batch]
+        metadatas = [stored_metadata(doc.metadata, sources) for _, doc in batch]
+
+        embeddings = embedding_model.encode(texts)
 
-def build_vectorstore(all_chunked_docs: Dict[str, List[Document]]):
+        if chunk_store is not None:
+            chunk_store.put(zip(ids, texts))
+
+        collection.upsert(
+            embeddings=embeddings,
+            documents=texts if chunk_store is None else None,
+            metadatas=metadatas,
+            ids=ids
+        )
+
+        total += len(batch)
+        elapsed = time.perf_counter() - start
+        print(f"  Batch {batch_number}: {len(batch)} chunks in {elapsed:.2f}s "
+              f"({len(batch) / max(elapsed, 1e-6):.1f} chunks/s), peak RSS {peak_rss_mb():.0f} MB")
+
+    return total
+
+def add_documents_to_collection(collection, documents: Iterable[Document], embedding_model,
+                                batch_size: int = UPSERT_BATCH_SIZE, sources: Optional[SourceTable] = None,
+                                chunk_store: Optional[ChunkStore] = None) -> int:
+    chunks = ((chunk_id, doc) for chunk_id, _, doc in with_chunk_ids(documents))
+    return upsert_chunks(collection, chunks, embedding_model, batch_size, sources, chunk_store)
+
+def delete_chunks(collection, ids: List[str], batch_size: int = UPSERT_BATCH_SIZE,
+                  chunk_store: Optional[ChunkStore] = None):
+    for batch in batched(ids, batch_size):
+        collection.delete(ids=batch)
+    if chunk_store is not None:
+        chunk_store.delete(ids)
+
+def iter_collection(collection, batch_size: int = UPSERT_BATCH_SIZE,
+                    where: Optional[Dict] = None) -> Iterator[Tuple[str, str, Dict]]:
+    # Pages through everything stored in a collection (or matching where) as (id, text, metadata),
+    # whatever the storage mode
+    offset = 0
+    while True:
+        page = collection.get(limit=batch_size, offset=offset, where=where, include=["documents", "metadatas"])
+        if not page["ids"]:
+            return
+        texts, metadatas = resolve_chunks(collection.name, page["ids"], page["documents"], page["metadatas"])
+        yield from zip(page["ids"], texts, metadatas)
+        offset += len(page["ids"])
+
+def iter_collection_vectors(collection, batch_size: int = UPSERT_BATCH_SIZE) -> Iterator[Tuple[str, List[float], str, Dict]]:
+    # Like iter_collection, with each chunk's embedding: (id, embedding, text, metadata)
+    offset = 0
+    while True:
+        page = collection.get(limit=batch_size, offset=offset, include=["embeddings", "documents", "metadatas"])
+        if not page["ids"]:
+            return
+        texts, metadatas = resolve_chunks(collection.name, page["ids"], page["documents"], page["metadatas"])
+        yield from zip(page["ids"], page["embeddings"], texts, metadatas)
+        offset += len(page["ids"])
+
+def export_quantized_collection(collection, batch_size: int = UPSERT_BATCH_SIZE):
+    # Always int8: binary codes lose too much recall on these embeddings to serve from (see build_quantized_index)
+    exported = build_quantized_index(iter_collection_vectors(collection, batch_size), collection.count(),
+                                     quantized_index_dir(collection.name), "int8")
+    print(f"Exported int8 quantized index for {collection.name} ({exported} chunks)")
+
+def wants_quantized_export(collection) -> bool:
+    # Once anything has been exported here, keep every collection exported, including those a layout change creates
+    return RETRIEVAL_BACKEND == "quantized" or os.path.exists(os.path.dirname(quantized_index_dir(collection.name)))
+
+def build_collection_lexical_index(collection, doc_type: str, batch_size: int = UPSERT_BATCH_SIZE):
+    # One BM25 index per document type, named after its per-type collection whichever layout is in use
+    chunks = ((chunk_id, text) for chunk_id, text, _ in iter_collection(collection, batch_size, type_filter(doc_type)))
+    indexed = build_lexical_index(chunks, lexical_index_dir(COLLECTION_NAMES[doc_type]))
+    print(f"Built lexical index for {doc_type} ({indexed} chunks)")
+
+def build_vectorstore(all_chunked_docs: Dict[str, Iterable[Document]]):
     print("Creating ChromaDB collections...")
     client, collections, embedding_model = create_vectorstore()
 
+    # Never send more than Chroma accepts in a single request
+    batch_size = min(UPSERT_BATCH_SIZE, client.get_max_batch_size())
+    sources = open_source_table()
+
     for doc_type, documents in all_chunked_docs.items():
-        print(f"Adding {len(documents)} chunks to {doc_type} collection...")
-        add_documents_to_collection(collections[doc_type], documents, embedding_model)
-        print(f"Completed {doc_type} collection")
+        print(f"Adding chunks to {doc_type} collection...")
+        chunk_store = open_chunk_store(collections[doc_type].name)
+        added = add_documents_to_collection(collections[doc_type], documents, embedding_model, batch_size,
+                                            sources, chunk_store)
+        if sources is not None:
+            sources.save()
+        if chunk_store is not None:
+            chunk_store.save()
+        build_collection_lexical_index(collections[doc_type], doc_type, batch_size)
+        print(f"Completed {doc_type} collection ({added} chunks)")
+
+    for collection in {collection.name: collection for collection in collections.values()}.values():
+        if wants_quantized_export(collection):
+            export_quantized_collection(collection, batch_size=batch_size)
 
     print("Vector database built successfully!")
     return client
+
+def sync_vectorstore(workers: int = INGEST_WORKERS):
+    """
+    Brings the collections in line with DATA_PATHS, embedding only what changed.
+
+    Files whose content hash matches the manifest are skipped without parsing.
+    Changed or new files are re-chunked, and only chunks whose content-derived ID
+    is not already stored get embedded; chunks that disappeared and all chunks of
+    removed files are deleted.
+
+    The manifest records the embedding model, chunking settings, storage mode and
+    index layout: a different model, storage mode or layout starts every collection
+    over (dropping the other layout's collections), and different
+    chunking re-chunks every file (re-embedding only chunks whose text actually
+    changed). Finally the artifact metadata servers verify against is written next
+    to the index.
+    """
+    from src.ingestion.loader import iter_chunks
+
+    print("Syncing ChromaDB collections with data directories...")
+    client, collections, embedding_model = create_vectorstore()
+    batch_size = min(UPSERT_BATCH_SIZE, client.get_max_batch_size())
+    manifest = load_manifest()
+
+    # Manifests from before these were recorded were built with the current model and full storage
+    rebuild_reason = None
+    if manifest.setdefault("embedding_model", EMBEDDING_MODEL) != EMBEDDING_MODEL:
+        rebuild_reason = f"Embedding model changed from {manifest['embedding_model']}"
+    elif manifest.setdefault("storage", {"metadata": "full", "text": "chroma"}) != storage_spec():
+        rebuild_reason = f"Storage mode changed from {manifest['storage']}"
+    elif manifest.setdefault("layout", "per_type") != INDEX_LAYOUT:
+        rebuild_reason = f"Index layout changed from {manifest['layout']}"
+
+    if rebuild_reason:
+        print(f"{rebuild_reason}, rebuilding every collection...")
+        drop_other_layout(client)
+        reset = {name: reset_collection(client, name) for name in set(INDEX_COLLECTIONS.values())}
+        collections = {doc_type: reset[name] for doc_type, name in INDEX_COLLECTIONS.items()}
+        manifest["files"] = {}
+        manifest["embedding_model"] = EMBEDDING_MODEL
+        manifest["storage"] = storage_spec()
+        manifest["layout"] = INDEX_LAYOUT
+
+    sources = open_source_table()
+
+    exports_due = {}
+
+    rechunk_all = manifest.setdefault("chunking", chunking_spec()) != chunking_spec()
+    if rechunk_all:
+        print("Chunking settings changed, re-chunking every file...")
+
+    for doc_type, path in DATA_PATHS.items():
+        collection = collections[doc_type]
+        known_files = manifest["files"].get(doc_type)
+
+        chunk_store = open_chunk_store(collection.name)
+
+        if known_files is None:
+            known_files = {}
+            if INDEX_LAYOUT == "unified":
+                # Chunks of this type nothing in the manifest accounts for
+                delete_chunks(collection, type_chunk_ids(collection, doc_type), batch_size, chunk_store)
+            elif collection.count() > 0:
+                # Built before manifests existed; positional IDs can't be diffed, so start over
+                print(f"No manifest entry for {doc_type}, rebuilding its collection...")
+                collection = collections[doc_type] = reset_collection(client, collection.name)
+                chunk_store = open_chunk_store(collection.name)
+
+        current_hashes = {
+            filename: file_hash(os.path.join(path, filename))
+            for filename in os.listdir(path)
+            if filename.endswith('.pdf')
+        }
+
+        removed = [f for f in known_files if f not in current_hashes]
+        for filename in removed:
+            delete_chunks(collection, list(known_files[filename]["chunks"]), batch_size, chunk_store)
+            print(f"Removed {filename} ({len(known_files[filename]['chunks'])} chunks)")
+            del known_files[filename]
+
+        changed = [f for f in current_hashes if rechunk_all or known_files.get(f, {}).get("hash") != current_hashes[f]]
+        if doc_type == "statutes":
+            # Statutes synced before the section index existed are re-chunked (not re-embedded) once
+            changed += [f for f in current_hashes if f not in changed and "sections" not in known_files[f]]
+        if not changed:
+            print(f"{doc_type} is up to date")
+
+        synced = set()
+        file_chunks = iter_chunks(path, doc_type, workers, filenames=changed) if changed else []
+
+        for filename, chunks in groupby(file_chunks, key=lambda doc: doc.metadata['source']):
+            entries = list(with_chunk_ids(chunks))
+            old_chunks = known_files.get(filename, {}).get("chunks", {})
+            new_chunks = {chunk_id: digest for chunk_id, digest, _ in entries}
+
+            stale = [chunk_id for chunk_id in old_chunks if chunk_id not in new_chunks]
+            fresh = [(chunk_id, doc) for chunk_id, _, doc in entries if chunk_id not in old_chunks]
+
+            delete_chunks(collection, stale, batch_size, chunk_store)
+            upsert_chunks(collection, fresh, embedding_model, batch_size, sources, chunk_store)
+
+            known_files[filename] = {"hash": current_hashes[filename], "chunks": new_chunks}
+            if doc_type == "statutes":
+                known_files[filename]["sections"] = sections_for_chunks(
+                    (chunk_id, doc) for chunk_id, _, doc in entries
+                )
+            synced.add(filename)
+            print(f"{filename}: {len(fresh)} chunks embedded, {len(stale)} removed")
+
+        # Files that produced no text at all never show up in the chunk stream
+        for filename in changed:
+            if filename not in synced:
+                delete_chunks(collection, list(known_files.get(filename, {}).get("chunks", {})), batch_size,
+                              chunk_store)
+                known_files[filename] = {"hash": current_hashes[filename], "chunks": {}, "sections": {}}
+
+        # Saved before the BM25 rebuild below, which reads the text back
+        if sources is not None:
+            sources.save()
+        if chunk_store is not None:
+            chunk_store.save()
+
+        # The BM25 index is rebuilt from the collection whenever its contents changed
+        if changed or removed or not os.path.exists(lexical_index_dir(COLLECTION_NAMES[doc_type])):
+            build_collection_lexical_index(collection, doc_type, batch_size)
+
+        # Likewise the quantized export, when this replica serves from one (older binary exports are
+        # rebuilt as int8); a unified collection is exported once, after every type has been synced
+        if wants_quantized_export(collection) and (
+                changed or removed or exported_quantization(collection.name) != "int8"):
+            exports_due[collection.name] = collection
+
+        manifest["files"][doc_type] = known_files
+        save_manifest(manifest)
+
+        if doc_type == "statutes":
+            write_section_index(known_files)
+
+    for collection in exports_due.values():
+        export_quantized_collection(collection, batch_size=batch_size)
+
+    # Recorded last, so an interrupted re-chunk is picked up again by the next sync
+    manifest["chunking"] = chunking_spec()
+    save_manifest(manifest)
+
+    write_artifact_metadata(manifest, {
+        doc_type: len(type_chunk_ids(collection, doc_type)) if INDEX_LAYOUT == "unified" else collection.count()
+        for doc_type, collection in collections.items()
+    })
+
+    print("Vector database synced successfully!")
+    return client
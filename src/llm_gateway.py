@@ -0,0 +1,440 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from itertools import chain
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from src.config import (
+    GROQ_API_KEY,
+    GROQ_BASE_URL,
+    LLM_FALLBACK_MODEL,
+    LLM_HEDGE_AFTER,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_RETRIES,
+    LLM_MODEL,
+    LLM_REQUEST_TIMEOUT,
+    LLM_RPM,
+    LLM_TPM
+)
+from src.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Tokens reserved for a reply before its real size is known; settled against the reported usage afterwards
+OUTPUT_TOKEN_ESTIMATE = 500
+
+# Idle connections are kept this long, so bursts of calls skip the TCP and TLS handshakes
+KEEPALIVE_SECONDS = 30.0
+
+
+def status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError", "TimeoutError")
+
+
+def backoff_delay(attempt: int, error: Exception) -> float:
+    """The server's Retry-After, or exponential backoff with jitter so callers don't retry in lockstep."""
+    return retry_after(error) or min(60.0, 2.0 ** attempt) * random.uniform(0.5, 1.5)
+
+
+class TokenBucket:
+    """
+    Budget of per_minute units, refilled continuously; 0 means unlimited.
+
+    reserve() takes its units at once, going into debt if need be, and returns how
+    long the caller has to wait before using them. Concurrent callers are therefore
+    scheduled in arrival order instead of all racing for the next refill.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self._level = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def reserve(self, units: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            # A request larger than the whole budget is let through once the bucket is full
+            self._level -= min(units, self.capacity)
+            return max(0.0, -self._level * 60 / self.capacity)
+
+    def adjust(self, units: float):
+        """Gives back (or, when negative, takes) units once a reservation's real size is known."""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._level = min(self.capacity, self._level + units)
+
+
+class RateLimiter:
+    """Requests- and tokens-per-minute budget of one model, shared by every call in the process."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """Books one request of about `tokens` tokens; returns the seconds to wait before sending it."""
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        return max(delay, self._resume_at - time.monotonic())
+
+    def settle(self, estimated: int, used: int):
+        self.tokens.adjust(estimated - used)
+
+    def pause(self, seconds: float):
+        """Holds every caller back, e.g. for a 429's Retry-After, instead of letting each retry on its own."""
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(model_name: str) -> RateLimiter:
+    # Groq's limits apply per model, so the primary and the fallback each get their own budget
+    with _limiters_lock:
+        if model_name not in _limiters:
+            _limiters[model_name] = RateLimiter(LLM_RPM, LLM_TPM)
+        return _limiters[model_name]
+
+
+def model_name(model: BaseChatModel) -> str:
+    return getattr(model, "model_name", None) or model._llm_type
+
+
+def answered_by(message: BaseMessage) -> Optional[str]:
+    """Model that wrote a gateway reply, or None for a message that didn't come through a gateway."""
+    return message.response_metadata.get("answered_by")
+
+
+def from_fallback(message: BaseMessage) -> bool:
+    return bool(message.response_metadata.get("fallback"))
+
+
+def estimate_tokens(messages: List[BaseMessage], kwargs: Dict) -> int:
+    prompt_chars = sum(len(str(message.content)) for message in messages) + len(str(kwargs.get("tools", "")))
+    return prompt_chars // 4 + OUTPUT_TOKEN_ESTIMATE
+
+
+def _used_tokens(message) -> int:
+    usage = getattr(message, "usage_metadata", None) or {}
+    return usage.get("total_tokens", 0)
+
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=LLM_MAX_CONNECTIONS, thread_name_prefix="llm-hedge")
+        return _hedge_pool
+
+
+class LLMGateway(BaseChatModel):
+    """
+    Chat model that sends every call through one rate-limited, retrying path.
+
+    Each call books a request and its estimated tokens with the model's RateLimiter
+    and waits its turn. 429s, server errors and connection failures are retried with
+    jittered backoff; a 429 pauses every caller of that model for its Retry-After.
+    A primary that still fails hands the call to the fallback model. With
+    hedge_after > 0, a call unanswered after that many seconds is also sent to the
+    fallback, and whichever answers first wins. Streams are rate-limited and retried
+    up to their first chunk, but not hedged.
+
+    Synchronous calls come from the graph's worker threads, asynchronous ones from
+    an event loop; both reuse the wrapped models' pooled connections.
+    """
+
+    primary: BaseChatModel
+    fallback: Optional[BaseChatModel] = None
+    hedge_after: float = 0.0
+    max_retries: int = LLM_MAX_RETRIES
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm-gateway"
+
+    def bind_tools(self, tools, **kwargs: Any):
+        # The primary formats the tool schemas; the resulting kwargs reach whichever model answers
+        return self.bind(**self.primary.bind_tools(tools, **kwargs).kwargs)
+
+    def _tag(self, message: BaseMessage, model: BaseChatModel):
+        # Lets callers tell a fallback reply from the primary's, e.g. to keep it out of the answer cache
+        message.response_metadata["answered_by"] = model_name(model)
+        message.response_metadata["fallback"] = model is self.fallback
+
+    def _failed(self, limiter: RateLimiter, name: str, attempt: int, error: Exception) -> float:
+        """Seconds to back off before retrying error, or re-raises it when it isn't worth retrying."""
+        if attempt == self.max_retries or not is_retryable(error):
+            raise error
+        delay = backoff_delay(attempt, error)
+        logger.warning("Retrying %s after %s (attempt %d, waiting %.1fs)", name, error, attempt + 1, delay)
+        if status_code(error) == 429:
+            # The next reserve() waits out the pause, along with every other caller
+            limiter.pause(delay)
+            return 0.0
+        return delay
+
+    def _call(self, model: BaseChatModel, messages: List[BaseMessage], stop: Optional[List[str]],
+              **kwargs: Any) -> ChatResult:
+        name = model_name(model)
+        limiter = limiter_for(name)
+        estimate = estimate_tokens(messages, kwargs)
+
+        for attempt in range(self.max_retries + 1):
+            delay = limiter.reserve(estimate)
+            if delay > 0:
+                with span("llm.rate_limit_wait", model=name):
+                    time.sleep(delay)
+            try:
+                result = model._generate(messages, stop=stop, **kwargs)
+            except Exception as error:
+                limiter.settle(estimate, 0)
+                time.sleep(self._failed(limiter, name, attempt, error))
+                continue
+            limiter.settle(estimate, _used_tokens(result.generations[0].message))
+            self._tag(result.generations[0].message, model)
+            return result
+
+    async def _acall(self, model: BaseChatModel, messages: List[BaseMessage], stop: Optional[List[str]],
+                     **kwargs: Any) -> ChatResult:
+        name = model_name(model)
+        limiter = limiter_for(name)
+        estimate = estimate_tokens(messages, kwargs)
+
+        for attempt in range(self.max_retries + 1):
+            delay = limiter.reserve(estimate)
+            if delay > 0:
+                with span("llm.rate_limit_wait", model=name):
+                    await asyncio.sleep(delay)
+            try:
+                result = await model._agenerate(messages, stop=stop, **kwargs)
+            except Exception as error:
+                limiter.settle(estimate, 0)
+                await asyncio.sleep(self._failed(limiter, name, attempt, error))
+                continue
+            limiter.settle(estimate, _used_tokens(result.generations[0].message))
+            self._tag(result.generations[0].message, model)
+            return result
+
+    def _falls_back(self, error: Exception) -> bool:
+        return self.fallback is not None and is_retryable(error)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.fallback is None or self.hedge_after <= 0:
+            try:
+                return self._call(self.primary, messages, stop, **kwargs)
+            except Exception as error:
+                if not self._falls_back(error):
+                    raise
+                logger.warning("%s failed (%s), falling back to %s",
+                               model_name(self.primary), error, model_name(self.fallback))
+                return self._call(self.fallback, messages, stop, **kwargs)
+
+        pool = _get_hedge_pool()
+        primary = pool.submit(copy_context().run, self._call, self.primary, messages, stop, **kwargs)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done and (primary.exception() is None or not self._falls_back(primary.exception())):
+            return primary.result()
+
+        with span("llm.hedge", model=model_name(self.fallback)):
+            hedge = pool.submit(copy_context().run, self._call, self.fallback, messages, stop, **kwargs)
+            pending = {primary, hedge}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        # The slower call can't be cancelled mid-request; its answer is simply dropped
+                        return future.result()
+        raise primary.exception()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.fallback is None or self.hedge_after <= 0:
+            try:
+                return await self._acall(self.primary, messages, stop, **kwargs)
+            except Exception as error:
+                if not self._falls_back(error):
+                    raise
+                logger.warning("%s failed (%s), falling back to %s",
+                               model_name(self.primary), error, model_name(self.fallback))
+                return await self._acall(self.fallback, messages, stop, **kwargs)
+
+        primary = asyncio.ensure_future(self._acall(self.primary, messages, stop, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done and (primary.exception() is None or not self._falls_back(primary.exception())):
+            return primary.result()
+
+        with span("llm.hedge", model=model_name(self.fallback)):
+            hedge = asyncio.ensure_future(self._acall(self.fallback, messages, stop, **kwargs))
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        for other in pending:
+                            other.cancel()
+                        return task.result()
+        raise primary.exception()
+
+    def _open_stream(self, model: BaseChatModel, messages: List[BaseMessage], stop: Optional[List[str]],
+                     **kwargs: Any):
+        """Starts a stream, retrying until its first chunk arrives; returns (limiter, estimate, first, chunks)."""
+        name = model_name(model)
+        limiter = limiter_for(name)
+        estimate = estimate_tokens(messages, kwargs)
+
+        for attempt in range(self.max_retries + 1):
+            delay = limiter.reserve(estimate)
+            if delay > 0:
+                with span("llm.rate_limit_wait", model=name):
+                    time.sleep(delay)
+            chunks = model._stream(messages, stop=stop, **kwargs)
+            try:
+                return limiter, estimate, next(chunks, None), chunks
+            except Exception as error:
+                limiter.settle(estimate, 0)
+                time.sleep(self._failed(limiter, name, attempt, error))
+
+    async def _aopen_stream(self, model: BaseChatModel, messages: List[BaseMessage], stop: Optional[List[str]],
+                            **kwargs: Any):
+        name = model_name(model)
+        limiter = limiter_for(name)
+        estimate = estimate_tokens(messages, kwargs)
+
+        for attempt in range(self.max_retries + 1):
+            delay = limiter.reserve(estimate)
+            if delay > 0:
+                with span("llm.rate_limit_wait", model=name):
+                    await asyncio.sleep(delay)
+            chunks = model._astream(messages, stop=stop, **kwargs)
+            try:
+                return limiter, estimate, await anext(chunks, None), chunks
+            except Exception as error:
+                limiter.settle(estimate, 0)
+                await asyncio.sleep(self._failed(limiter, name, attempt, error))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        model = self.primary
+        try:
+            limiter, estimate, first, chunks = self._open_stream(model, messages, stop, **kwargs)
+        except Exception as error:
+            if not self._falls_back(error):
+                raise
+            logger.warning("%s failed (%s), streaming from %s",
+                           model_name(self.primary), error, model_name(self.fallback))
+            model = self.fallback
+            limiter, estimate, first, chunks = self._open_stream(model, messages, stop, **kwargs)
+
+        used = 0
+        if first is not None:
+            # Only the first chunk is tagged, since merging chunks concatenates repeated strings
+            self._tag(first.message, model)
+            for chunk in chain([first], chunks):
+                used += _used_tokens(chunk.message)
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        limiter.settle(estimate, used)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        model = self.primary
+        try:
+            limiter, estimate, first, chunks = await self._aopen_stream(model, messages, stop, **kwargs)
+        except Exception as error:
+            if not self._falls_back(error):
+                raise
+            logger.warning("%s failed (%s), streaming from %s",
+                           model_name(self.primary), error, model_name(self.fallback))
+            model = self.fallback
+            limiter, estimate, first, chunks = await self._aopen_stream(model, messages, stop, **kwargs)
+
+        used = 0
+        if first is not None:
+            self._tag(first.message, model)
+            chunk = first
+            while chunk is not None:
+                used += _used_tokens(chunk.message)
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                chunk = await anext(chunks, None)
+        limiter.settle(estimate, used)
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                        keepalive_expiry=KEEPALIVE_SECONDS)
+
+
+def build_llm(base_url: str = GROQ_BASE_URL) -> LLMGateway:
+    """
+    The gateway over LLM_MODEL (and LLM_FALLBACK_MODEL, unless it is empty or the same model).
+
+    Both models share one connection pool per flavour: an httpx.Client for the
+    graph's threads and an httpx.AsyncClient, whose connections belong to the event
+    loop that first uses them. The Groq client's own retries are turned off, since
+    the gateway retries.
+    """
+    from langchain_groq import ChatGroq
+
+    http_client = httpx.Client(limits=_http_limits(), timeout=LLM_REQUEST_TIMEOUT)
+    http_async_client = httpx.AsyncClient(limits=_http_limits(), timeout=LLM_REQUEST_TIMEOUT)
+
+    def chat_model(model: str) -> ChatGroq:
+        return ChatGroq(
+            model=model,
+            temperature=0,
+            groq_api_key=GROQ_API_KEY,
+            groq_api_base=base_url or None,
+            request_timeout=LLM_REQUEST_TIMEOUT,
+            max_retries=0,
+            http_client=http_client,
+            http_async_client=http_async_client
+        )
+
+    fallback = chat_model(LLM_FALLBACK_MODEL) if LLM_FALLBACK_MODEL and LLM_FALLBACK_MODEL != LLM_MODEL else None
+    return LLMGateway(primary=chat_model(LLM_MODEL), fallback=fallback, hedge_after=LLM_HEDGE_AFTER)
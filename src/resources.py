@@ -0,0 +1,143 @@
+import threading
+from typing import Any, Callable, Dict
+from src.config import CHROMA_PATH, RERANK_ENABLED
+from src.tracing import span
+
+
+class ResourceRegistry:
+    """
+    Process-wide registry of the expensive shared objects, each built on first use.
+
+    Nothing is created at import time: the first get() of a name runs its factory
+    and every later call returns the same instance. override() swaps in a stand-in
+    (a mock LLM, a test client) before or after the real one was built.
+    """
+
+    def __init__(self, factories: Dict[str, Callable[[], Any]]):
+        self._factories = factories
+        self._instances: Dict[str, Any] = {}
+        # One lock per resource, so a slow model load doesn't block unrelated lookups
+        self._locks = {name: threading.Lock() for name in factories}
+
+    def get(self, name: str) -> Any:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._locks[name]:
+            if name not in self._instances:
+                with span(f"resource_load.{name}"):
+                    self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def override(self, name: str, instance: Any):
+        if name not in self._factories:
+            raise KeyError(f"Unknown resource: {name}")
+        with self._locks[name]:
+            self._instances[name] = instance
+
+    def clear(self, name: str = None):
+        """Drops one built resource, or all of them, so the next get() rebuilds it."""
+        for key in [name] if name else list(self._factories):
+            with self._locks[key]:
+                self._instances.pop(key, None)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+
+def _build_llm():
+    from src.llm_gateway import build_llm
+    return build_llm()
+
+
+def _build_llm_with_tools():
+    from src.agents.orchestrator import tools
+    return get_llm().bind_tools(tools)
+
+
+def _build_chroma_client():
+    import chromadb
+    return chromadb.PersistentClient(path=CHROMA_PATH)
+
+
+def _build_embedding_service():
+    from src.embeddings import EmbeddingService
+    return EmbeddingService()
+
+
+def _build_retrieval_backend():
+    from src.tools.backends import build_backend
+    return build_backend()
+
+
+def _build_graph():
+    from src.agents.orchestrator import build_graph
+    return build_graph()
+
+
+def _build_reranker():
+    from src.tools.reranker import Reranker
+    return Reranker()
+
+
+def _build_answer_cache():
+    from src.answer_cache import AnswerCache
+    return AnswerCache()
+
+
+registry = ResourceRegistry({
+    "llm": _build_llm,
+    "llm_with_tools": _build_llm_with_tools,
+    "chroma_client": _build_chroma_client,
+    "embedding_service": _build_embedding_service,
+    "retrieval_backend": _build_retrieval_backend,
+    "graph": _build_graph,
+    "reranker": _build_reranker,
+    "answer_cache": _build_answer_cache
+})
+
+
+def get_llm():
+    return registry.get("llm")
+
+
+def get_llm_with_tools():
+    return registry.get("llm_with_tools")
+
+
+def get_chroma_client():
+    return registry.get("chroma_client")
+
+
+def get_retrieval_backend():
+    return registry.get("retrieval_backend")
+
+
+def get_graph():
+    return registry.get("graph")
+
+
+def warm_up(load_models: bool = True):
+    """
+    Builds every resource a query needs, so the first request doesn't pay for it.
+
+    Args:
+        load_models: Also load the embedding model (and the reranker's, when RERANK_ENABLED)
+            rather than just their wrappers
+    """
+    from src.embeddings import get_embedding_service
+    from src.tools.reranker import get_reranker
+    from src.answer_cache import get_answer_cache
+
+    # The quantized backend serves without Chroma, so only the Chroma backend opens a client
+    if get_retrieval_backend().name == "chroma":
+        get_chroma_client()
+    get_llm_with_tools()
+    get_graph()
+    get_answer_cache()
+
+    if load_models:
+        get_embedding_service().model
+        if RERANK_ENABLED:
+            get_reranker().model
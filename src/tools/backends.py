@@ -0,0 +1,238 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from src.config import EMBEDDING_MODEL, RETRIEVAL_BACKEND
+from src.ingestion.chunk_store import load_source_table, resolve_chunks
+from src.ingestion.manifest import chunk_labels
+from src.ingestion.quantized_index import load_quantized_index
+from src.resources import get_chroma_client
+
+# A search hit: chunk ID and its Document, with metadata['score'] set to the cosine similarity
+Hit = Tuple[str, Document]
+
+# How many more hits than needed a grouped Chroma search asks for, so no type is crowded out
+GROUPED_OVERFETCH = 8
+
+
+def _source_filter(sources: List[str]) -> Dict:
+    # Compact indexes store interned source IDs rather than names; match either
+    clauses = [{"source": {"$in": sources}}]
+    table = load_source_table()
+    source_ids = [table.names.index(name) for name in sources if name in table.names]
+    if source_ids:
+        clauses.append({"source_id": {"$in": source_ids}})
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def _where(doc_types: Optional[List[str]] = None, sources: Optional[List[str]] = None) -> Optional[Dict]:
+    clauses = []
+    if doc_types is not None:
+        clauses.append({"doc_type": {"$in": doc_types}})
+    if sources is not None:
+        clauses.append(_source_filter(sources))
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class ChromaBackend:
+    """Dense search over the Chroma collections with Chroma's HNSW index."""
+
+    name = "chroma"
+
+    def _query(self, collection_name: str, query_embeddings: List[List[float]], n_results: int,
+               where: Optional[Dict]) -> List[List[Hit]]:
+        collection = get_chroma_client().get_collection(name=collection_name)
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        rows = []
+        for row in range(len(query_embeddings)):
+            # Text and source names may live outside Chroma, depending on how the index was built
+            texts, metadatas = resolve_chunks(
+                collection_name,
+                results['ids'][row],
+                results['documents'][row] if results['documents'] else None,
+                results['metadatas'][row] if results['metadatas'] else None
+            )
+
+            hits = []
+            for i, (chunk_id, text, metadata) in enumerate(zip(results['ids'][row], texts, metadatas)):
+                # Collections use cosine distance, so similarity is 1 - distance
+                metadata['score'] = 1 - results['distances'][row][i]
+                hits.append((chunk_id, Document(page_content=text, metadata=metadata)))
+            rows.append(hits)
+
+        return rows
+
+    def search(self, collection_name: str, query_embeddings: List[List[float]], n_results: int,
+               sources: Optional[List[str]] = None) -> List[List[Hit]]:
+        """
+        Runs one multi-query search, optionally only over chunks from the given source files.
+
+        Returns:
+            For each query embedding, up to n_results hits, best first
+        """
+        return self._query(collection_name, query_embeddings, n_results, _where(sources=sources))
+
+    def search_by_type(self, collection_name: str, query_embeddings: List[List[float]], n_results: int,
+                       doc_types: List[str], sources: Optional[List[str]] = None) -> List[Dict[str, List[Hit]]]:
+        """
+        Top n_results of each doc_type in a collection holding several, from one search.
+
+        Chroma has no grouped search, and filtering on metadata makes it read every
+        candidate's metadata, which costs far more than the search itself. So one
+        unfiltered search fetches only the IDs and distances of GROUPED_OVERFETCH
+        times as many hits as needed; the manifest says which type and file each ID
+        belongs to, and text is then fetched for the winners alone. A type still
+        short (crowded out by the others) is searched again with a filter.
+
+        Returns:
+            For each query embedding, a dict from doc_type to its hits, best first
+        """
+        labels = chunk_labels()
+        collection = get_chroma_client().get_collection(name=collection_name)
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results * len(doc_types) * GROUPED_OVERFETCH,
+            include=["distances"]
+        )
+
+        scored = []
+        for ids, distances in zip(results['ids'], results['distances']):
+            by_type = {doc_type: [] for doc_type in doc_types}
+            for chunk_id, distance in zip(ids, distances):
+                # IDs the manifest doesn't know yet (a sync in progress) are skipped
+                doc_type, source = labels.get(chunk_id, (None, None))
+                group = by_type.get(doc_type)
+                if group is not None and len(group) < n_results and (sources is None or source in sources):
+                    group.append((chunk_id, 1 - distance))
+            scored.append(by_type)
+
+        fetched = self.fetch(collection_name, list({chunk_id for by_type in scored
+                                                     for hits in by_type.values() for chunk_id, _ in hits}))
+        grouped = []
+        for by_type in scored:
+            grouped.append({
+                doc_type: [
+                    (chunk_id, Document(page_content=fetched[chunk_id].page_content,
+                                        metadata={**fetched[chunk_id].metadata, 'score': score}))
+                    for chunk_id, score in hits if chunk_id in fetched
+                ]
+                for doc_type, hits in by_type.items()
+            })
+
+        for doc_type in doc_types:
+            short = [row for row, by_type in enumerate(grouped) if len(by_type[doc_type]) < n_results]
+            if not short:
+                continue
+            refilled = self._query(collection_name, [query_embeddings[row] for row in short], n_results,
+                                   _where([doc_type], sources))
+            for row, hits in zip(short, refilled):
+                grouped[row][doc_type] = hits
+
+        return grouped
+
+    def fetch(self, collection_name: str, ids: List[str],
+              query_embedding: Optional[List[float]] = None) -> Dict[str, Document]:
+        """
+        Fetches chunks by ID; IDs the collection doesn't have are left out.
+
+        With a query embedding, each Document's metadata['score'] is its cosine similarity to it.
+        """
+        collection = get_chroma_client().get_collection(name=collection_name)
+        include = ["documents", "metadatas"] + (["embeddings"] if query_embedding is not None else [])
+        fetched = collection.get(ids=ids, include=include)
+        texts, metadatas = resolve_chunks(collection_name, fetched['ids'], fetched['documents'], fetched['metadatas'])
+
+        documents = {}
+        for i, (chunk_id, text, metadata) in enumerate(zip(fetched['ids'], texts, metadatas)):
+            if query_embedding is not None:
+                embedding = np.asarray(fetched['embeddings'][i], dtype=np.float32)
+                query_vector = np.asarray(query_embedding, dtype=np.float32)
+                denominator = np.linalg.norm(embedding) * np.linalg.norm(query_vector)
+                metadata['score'] = float(embedding @ query_vector / denominator) if denominator else 0.0
+            documents[chunk_id] = Document(page_content=text, metadata=metadata)
+
+        return documents
+
+
+class QuantizedBackend:
+    """
+    Dense search over the read-only quantized export of each collection.
+
+    Never opens Chroma: vectors, codes and chunk records are all memory-mapped from
+    the export, so worker processes on one machine share a single page-cached copy.
+    """
+
+    name = "quantized"
+
+    def _index(self, collection_name: str):
+        index = load_quantized_index(collection_name)
+        if index is None:
+            raise FileNotFoundError(
+                f"No quantized index for {collection_name}; run python -m scripts.export_quantized_index"
+            )
+        if index.meta["embedding_model"] != EMBEDDING_MODEL:
+            raise ValueError(
+                f"Quantized index for {collection_name} was built with {index.meta['embedding_model']}, "
+                f"not {EMBEDDING_MODEL}; re-export it"
+            )
+        return index
+
+    def _hits(self, index, found: List[Tuple[str, float]]) -> List[Hit]:
+        hits = []
+        for (chunk_id, score), record in zip(found, index.fetch([chunk_id for chunk_id, _ in found])):
+            if record is None:
+                continue
+            text, metadata = record
+            hits.append((chunk_id, Document(page_content=text, metadata={**metadata, 'score': score})))
+        return hits
+
+    def search(self, collection_name: str, query_embeddings: List[List[float]], n_results: int,
+               sources: Optional[List[str]] = None) -> List[List[Hit]]:
+        index = self._index(collection_name)
+        return [self._hits(index, index.search(query_embedding, n_results, sources=sources))
+                for query_embedding in query_embeddings]
+
+    def search_by_type(self, collection_name: str, query_embeddings: List[List[float]], n_results: int,
+                       doc_types: List[str], sources: Optional[List[str]] = None) -> List[Dict[str, List[Hit]]]:
+        index = self._index(collection_name)
+
+        grouped = []
+        for query_embedding in query_embeddings:
+            found = index.search_by_type(query_embedding, n_results, doc_types, sources=sources)
+            grouped.append({doc_type: self._hits(index, hits) for doc_type, hits in found.items()})
+        return grouped
+
+    def fetch(self, collection_name: str, ids: List[str],
+              query_embedding: Optional[List[float]] = None) -> Dict[str, Document]:
+        index = self._index(collection_name)
+
+        documents = {}
+        for chunk_id, record in zip(ids, index.fetch(ids)):
+            if record is None:
+                continue
+            text, metadata = record
+            metadata = dict(metadata)
+            if query_embedding is not None:
+                metadata['score'] = index.similarity(chunk_id, query_embedding)
+            documents[chunk_id] = Document(page_content=text, metadata=metadata)
+
+        return documents
+
+
+BACKENDS = {
+    "chroma": ChromaBackend,
+    "quantized": QuantizedBackend
+}
+
+
+def build_backend(name: str = RETRIEVAL_BACKEND):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown RETRIEVAL_BACKEND {name!r}; expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
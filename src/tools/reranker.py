@@ -0,0 +1,73 @@
+import threading
+from typing import Dict, List
+from langchain_core.documents import Document
+from src.config import RERANK_MODEL, RERANK_TOP_K, RERANK_MAX_CANDIDATES
+from src.resources import registry
+from src.tracing import span
+
+
+class Reranker:
+    """
+    Small CPU cross-encoder that rescores retrieved chunks against the question.
+
+    The model is loaded on first use. All collections are scored together in a
+    single predict call, so a request costs one forward pass regardless of how
+    many collections were searched.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    with span("model_load.reranker", model=self.model_name):
+                        from sentence_transformers import CrossEncoder
+                        self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def rerank(self, question: str, retrieved_docs: Dict[str, List[Document]], top_k: int = RERANK_TOP_K,
+               max_candidates: int = RERANK_MAX_CANDIDATES) -> Dict[str, List[Document]]:
+        """
+        Rerank every collection's candidates and keep the best top_k of each.
+
+        Args:
+            question: The user's original question
+            retrieved_docs: Dict with keys 'statutes', 'cases', 'regulations' mapping to candidate Documents
+            top_k: Documents kept per collection
+            max_candidates: Total candidates scored across all collections; each
+                non-empty collection gets an equal share, in first-stage order
+
+        Returns:
+            Dict of the same shape with fewer, reordered Documents carrying metadata['rerank_score']
+        """
+        non_empty = [name for name, docs in retrieved_docs.items() if docs]
+        if not non_empty:
+            return retrieved_docs
+
+        share = max(top_k, max_candidates // len(non_empty))
+        candidates = {name: retrieved_docs[name][:share] for name in non_empty}
+
+        pairs = [(question, doc.page_content) for name in non_empty for doc in candidates[name]]
+        scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+
+        reranked = {name: [] for name in retrieved_docs}
+        position = 0
+        for name in non_empty:
+            scored = []
+            for doc in candidates[name]:
+                doc.metadata['rerank_score'] = float(scores[position])
+                scored.append(doc)
+                position += 1
+            reranked[name] = sorted(scored, key=lambda doc: doc.metadata['rerank_score'], reverse=True)[:top_k]
+
+        return reranked
+
+
+def get_reranker() -> Reranker:
+    """Returns the process-wide Reranker, creating it on first call."""
+    return registry.get("reranker")
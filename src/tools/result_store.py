@@ -0,0 +1,92 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases a query and collapses whitespace so trivially different phrasings share a key."""
+    return " ".join(query.lower().split())
+
+
+class RetrievalStore:
+    """
+    Per-request store of retrieval results keyed by (collection, normalized query, k).
+
+    The search tools fill the store and the retrieval agent node reads from it,
+    so each distinct tool call costs exactly one vector search.
+    """
+
+    def __init__(self):
+        self._results: Dict[Tuple[str, str, int], List[Document]] = {}
+        self._pending: Dict[Tuple[str, str, int], threading.Event] = {}
+        self._lock = threading.Lock()
+        self.searches = 0
+
+    @staticmethod
+    def key(collection: str, query: str, k: int) -> Tuple[str, str, int]:
+        return (collection, normalize_query(query), k)
+
+    def fetch(self, collection: str, query: str, k: int,
+              search_fn: Callable[[str, int], List[Document]]) -> List[Document]:
+        """
+        Returns the stored result for (collection, query, k), running search_fn only on a miss.
+
+        Args:
+            collection: Logical collection name ('statutes', 'cases', 'regulations')
+            query: Search query as emitted by the LLM
+            k: Number of results requested
+            search_fn: Retrieval function called as search_fn(query, k) on a miss
+
+        Returns:
+            List of Document objects
+        """
+        key = self.key(collection, query, k)
+
+        while True:
+            with self._lock:
+                if key in self._results:
+                    return self._results[key]
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            # Another caller is already running this search; wait for its result
+            pending.wait()
+
+        try:
+            documents = search_fn(query, k)
+            with self._lock:
+                self._results[key] = documents
+                self.searches += 1
+            return documents
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+
+    def put(self, collection: str, query: str, k: int, documents: List[Document]):
+        with self._lock:
+            self._results[self.key(collection, query, k)] = documents
+
+    def get(self, collection: str, query: str, k: int) -> Optional[List[Document]]:
+        with self._lock:
+            return self._results.get(self.key(collection, query, k))
+
+
+_active_store: ContextVar[Optional[RetrievalStore]] = ContextVar("retrieval_store", default=None)
+
+
+def current_store() -> Optional[RetrievalStore]:
+    return _active_store.get()
+
+
+@contextmanager
+def use_store(store: RetrievalStore):
+    """Makes store the active retrieval store for the current context."""
+    token = _active_store.set(store)
+    try:
+        yield store
+    finally:
+        _active_store.reset(token)
@@ -1,13 +1,197 @@
-import chromadb
-import os
-from typing import List
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 from langchain_core.documents import Document
-from dotenv import load_dotenv
+from src.config import COLLECTION_NAMES, INDEX_COLLECTIONS, INDEX_LAYOUT, RETRIEVAL_MODE, HYBRID_CANDIDATES, RRF_K
+from src.embeddings import get_embedding_service
+from src.ingestion.lexical_index import load_lexical_index
+from src.ingestion.manifest import source_doc_types
+from src.tracing import span
+from src.resources import get_retrieval_backend
 
-load_dotenv()
+# Logical collection names used by the tools and the API, mapped to the doc_type each chunk records
+DOC_TYPES = {
+    "statutes": "statutes",
+    "cases": "case_laws",
+    "regulations": "regulations"
+}
+
+# ... and to the Chroma collection each is stored in; under the unified layout they all share one
+COLLECTIONS = {name: INDEX_COLLECTIONS[doc_type] for name, doc_type in DOC_TYPES.items()}
+
+
+class UnknownSourceError(ValueError):
+    """A requested act or file name that matches no indexed source."""
+
+
+def resolve_sources(names: List[str]) -> List[str]:
+    """
+    Maps act or file names to the source files they refer to.
+
+    A name matches every source file it equals (with or without ".pdf") or appears
+    in, ignoring case, so "Indian Penal Code" selects "THE INDIAN PENAL CODE.pdf".
+
+    Raises:
+        UnknownSourceError: If a name matches no source file
+    """
+    known = sorted(source_doc_types())
+
+    resolved = []
+    for name in names:
+        wanted = name.strip().lower()
+        matches = [source for source in known if wanted and wanted in source.lower()]
+        if not matches:
+            raise UnknownSourceError(f"No source matches {name!r}; known sources: {', '.join(known)}")
+        resolved.extend(source for source in matches if source not in resolved)
+
+    return resolved
+
+
+def _fuse(backend, collection_name: str, lexical_index, query: str, query_embedding: List[float],
+          hits: List[Tuple[str, Document]], k: int, sources: Optional[List[str]] = None) -> List[Document]:
+    """
+    Fuses one query's dense hits with BM25 rankings using reciprocal rank fusion.
+
+    Both retrievers contribute k * HYBRID_CANDIDATES candidates; each candidate scores
+    sum(1 / (RRF_K + rank)) over the rankings it appears in. Chunks found only by BM25
+    are fetched from the backend and given their cosine score so metadata['score']
+    stays comparable across all results. The BM25 index covers a whole document
+    type, so with a source filter its candidates are fetched first and filtered too.
+    """
+    candidates = k * HYBRID_CANDIDATES
+
+    by_id = dict(hits)
+
+    lexical_ids = [chunk_id for chunk_id, _ in lexical_index.search(query, candidates)]
+    if sources is not None:
+        unseen = [chunk_id for chunk_id in lexical_ids if chunk_id not in by_id]
+        if unseen:
+            by_id.update(backend.fetch(collection_name, unseen, query_embedding))
+        lexical_ids = [chunk_id for chunk_id in lexical_ids
+                       if chunk_id in by_id and by_id[chunk_id].metadata.get('source') in sources]
+
+    fused = defaultdict(float)
+    for rank, (chunk_id, _) in enumerate(hits, start=1):
+        fused[chunk_id] += 1 / (RRF_K + rank)
+    for rank, chunk_id in enumerate(lexical_ids, start=1):
+        fused[chunk_id] += 1 / (RRF_K + rank)
+
+    top_ids = sorted(fused, key=fused.get, reverse=True)[:k]
+
+    missing = [chunk_id for chunk_id in top_ids if chunk_id not in by_id]
+    if missing:
+        by_id.update(backend.fetch(collection_name, missing, query_embedding))
+
+    documents = []
+    # The lexical index can briefly lag the collection; skip IDs the backend no longer has
+    for chunk_id in top_ids:
+        if chunk_id in by_id:
+            doc = by_id[chunk_id]
+            doc.metadata['rrf_score'] = fused[chunk_id]
+            documents.append(doc)
+
+    return documents
+
+
+def _search_batch(queries: List[str], k: int, names: List[str],
+                  sources: Optional[List[str]] = None) -> List[Dict[str, List[Document]]]:
+    """
+    Runs several searches over several logical collections in one pass.
+
+    The queries are embedded together with the same model used at ingestion time and
+    searched with the configured backend (Chroma, or the quantized export): one
+    multi-query search per stored collection, which under the unified layout means
+    one search returning the top hits of every requested type. In hybrid mode each
+    type's dense hits are fused with that type's BM25 index.
+    """
+    backend = get_retrieval_backend()
+
+    results = [{name: [] for name in names} for _ in queries]
+
+    if sources is not None:
+        # Types holding none of the sources can't match
+        source_types = {source_doc_types().get(source) for source in sources}
+        names = [name for name in names if DOC_TYPES[name] in source_types]
+
+    targets = defaultdict(list)
+    for name in names:
+        targets[COLLECTIONS[name]].append(name)
+
+    with span("retrieval.search", collection=",".join(targets), queries=len(queries),
+              backend=backend.name) as search_span:
+        with span("retrieval.embed_query"):
+            query_embeddings = get_embedding_service().embed_queries(queries)
+
+        lexical_indexes = {
+            name: load_lexical_index(COLLECTION_NAMES[DOC_TYPES[name]]) if RETRIEVAL_MODE == "hybrid" else None
+            for name in names
+        }
+        hybrid = any(lexical_index is not None for lexical_index in lexical_indexes.values())
+        n_results = k * HYBRID_CANDIDATES if hybrid else k
+
+        for collection_name, group in targets.items():
+            if INDEX_LAYOUT == "unified":
+                rows = backend.search_by_type(collection_name, query_embeddings, n_results,
+                                              [DOC_TYPES[name] for name in group], sources)
+                rows = [{name: by_type[DOC_TYPES[name]] for name in group} for by_type in rows]
+            else:
+                rows = [{group[0]: hits} for hits in backend.search(collection_name, query_embeddings,
+                                                                     n_results, sources)]
+
+            for name in group:
+                lexical_index = lexical_indexes[name]
+                for row, (query, query_embedding) in enumerate(zip(queries, query_embeddings)):
+                    hits = rows[row][name]
+                    if lexical_index is not None:
+                        results[row][name] = _fuse(backend, collection_name, lexical_index, query,
+                                                   query_embedding, hits, k, sources)
+                    else:
+                        results[row][name] = [doc for _, doc in hits[:k]]
+
+        search_span.set(mode="hybrid" if hybrid else "vector",
+                        documents=sum(len(docs) for found in results for docs in found.values()))
+        return results
+
+
+def search_all_many(queries: List[str], k: int = 5, collections: Optional[List[str]] = None,
+                    sources: Optional[List[str]] = None) -> List[Dict[str, List[Document]]]:
+    """
+    Searches several logical collections for many queries with one embedding pass.
+
+    Args:
+        queries: Search queries
+        k: Number of top results per query and collection
+        collections: Any of 'statutes', 'cases' and 'regulations' (default: all three)
+        sources: Acts or file names to restrict the search to, see resolve_sources
+
+    Returns:
+        One dict per query, in query order, from collection name to its Document objects
+
+    Raises:
+        ValueError: For an unknown collection, or a source that matches no file
+    """
+    names = list(dict.fromkeys(collections or COLLECTIONS))
+    unknown = [name for name in names if name not in COLLECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown collections {unknown}; expected any of {list(COLLECTIONS)}")
+
+    if not queries:
+        return []
+    return _search_batch(queries, k, names, resolve_sources(sources) if sources else None)
+
+
+def search_all(query: str, k: int = 5, collections: Optional[List[str]] = None,
+               sources: Optional[List[str]] = None) -> Dict[str, List[Document]]:
+    """
+    Retrieves the top k chunks of each collection for one query.
+
+    Under the unified layout this is a single search whatever the number of
+    collections; sources=["Indian Penal Code"] restricts results to the IPC.
+
+    Returns:
+        Dict from collection name to its Document objects
+    """
+    return search_all_many([query], k, collections, sources)[0]
 
-CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma_db")
-chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
 
 def retrieve_statutes(query: str, k: int = 5) -> List[Document]:
     """
@@ -20,23 +204,7 @@ def retrieve_statutes(query: str, k: int = 5) -> List[Document]:
     Returns:
         List of Document objects with statute chunks and metadata
     """
-    collection = chroma_client.get_collection(name="statutes_collection")
-
-    results = collection.query(
-        query_texts=[query],
-        n_results=k,
-        include=["documents", "metadatas", "distances"]
-    )
-
-    documents = []
-    for i in range(len(results['documents'][0])):
-        doc = Document(
-            page_content=results['documents'][0][i],
-            metadata=results['metadatas'][0][i] if results['metadatas'] else {}
-        )
-        documents.append(doc)
-
-    return documents
+    return search_all(query, k, ["statutes"])["statutes"]
 
 
 def retrieve_cases(query: str, k: int = 5) -> List[Document]:
@@ -50,23 +218,7 @@ def retrieve_cases(query: str, k: int = 5) -> List[Document]:
     Returns:
         List of Document objects with case law chunks and metadata
     """
-    collection = chroma_client.get_collection(name="cases_collection")
-
-    results = collection.query(
-        query_texts=[query],
-        n_results=k,
-        include=["documents", "metadatas", "distances"]
-    )
-
-    documents = []
-    for i in range(len(results['documents'][0])):
-        doc = Document(
-            page_content=results['documents'][0][i],
-            metadata=results['metadatas'][0][i] if results['metadatas'] else {}
-        )
-        documents.append(doc)
-
-    return documents
+    return search_all(query, k, ["cases"])["cases"]
 
 
 def retrieve_regulations(query: str, k: int = 5) -> List[Document]:
@@ -80,20 +232,42 @@ def retrieve_regulations(query: str, k: int = 5) -> List[Document]:
     Returns:
         List of Document objects with regulation chunks and metadata
     """
-    collection = chroma_client.get_collection(name="regulations_collection")
+    return search_all(query, k, ["regulations"])["regulations"]
 
-    results = collection.query(
-        query_texts=[query],
-        n_results=k,
-        include=["documents", "metadatas", "distances"]
-    )
 
-    documents = []
-    for i in range(len(results['documents'][0])):
-        doc = Document(
-            page_content=results['documents'][0][i],
-            metadata=results['metadatas'][0][i] if results['metadatas'] else {}
-        )
-        documents.append(doc)
+def retrieve_many(collection: str, queries: List[str], k: int = 5) -> List[List[Document]]:
+    """
+    Runs many searches against one collection with a single embedding pass and search.
 
-    return documents
+    Args:
+        collection: 'statutes', 'cases' or 'regulations'
+        queries: Search queries
+        k: Number of top results per query
+
+    Returns:
+        One list of Document objects per query, in query order
+    """
+    return [found[collection] for found in search_all_many(queries, k, [collection])]
+
+
+def retrieve_statutes_by_ids(ids: List[str]) -> List[Document]:
+    """
+    Fetches specific statute chunks, e.g. those the section index maps a section to.
+
+    Args:
+        ids: Chunk IDs in the order they should be returned
+
+    Returns:
+        List of Document objects; IDs no longer in the collection are skipped
+    """
+    if not ids:
+        return []
+
+    with span("retrieval.fetch_by_ids", collection=COLLECTIONS["statutes"], documents=len(ids)):
+        by_id = get_retrieval_backend().fetch(COLLECTIONS["statutes"], ids)
+
+    for doc in by_id.values():
+        # An exact section match is as relevant as retrieval gets
+        doc.metadata['score'] = 1.0
+
+    return [by_id[chunk_id] for chunk_id in ids if chunk_id in by_id]
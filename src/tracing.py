@@ -0,0 +1,242 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.config import TRACING_ENABLED
+
+logger = logging.getLogger("legal_rag.trace")
+
+# Latency buckets in seconds, covering sub-millisecond cache hits to slow LLM calls
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Metrics:
+    """In-process counters and histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[LabelKey, float] = {}
+        self._histograms: Dict[LabelKey, List[float]] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> LabelKey:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            # Per-bucket counts followed by the running sum and count
+            histogram = self._histograms.setdefault(key, [0.0] * (len(DURATION_BUCKETS) + 2))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def render(self) -> str:
+        def labels_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{labels_text(labels)} {value}")
+
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(DURATION_BUCKETS, histogram):
+                        lines.append(f"{name}_bucket{labels_text(labels, [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{labels_text(labels, [('le', '+Inf')])} {histogram[-1]}")
+                    lines.append(f"{name}_sum{labels_text(labels)} {histogram[-2]}")
+                    lines.append(f"{name}_count{labels_text(labels)} {histogram[-1]}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class Trace:
+    """All spans recorded while handling one request."""
+
+    def __init__(self, name: str, attributes: Dict):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = dict(attributes)
+        self.spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Dict):
+        with self._lock:
+            self.spans.append(span)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+class Span:
+    """
+    Times one unit of work and records it on the active trace and in the metrics.
+
+    Attributes such as token or document counts can be attached with set().
+    """
+
+    def __init__(self, name: str, attributes: Dict):
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record = self._finish(exc_type)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(record)
+        return False
+
+    def _finish(self, exc_type) -> Dict:
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+
+        metrics.observe("legal_rag_span_duration_seconds", duration, span=self.name)
+
+        for kind in ("input_tokens", "output_tokens"):
+            if kind in self.attributes:
+                metrics.inc("legal_rag_llm_tokens_total", self.attributes[kind], span=self.name, kind=kind)
+        if "documents" in self.attributes:
+            metrics.inc("legal_rag_documents_total", self.attributes["documents"], span=self.name)
+
+        return {"span": self.name, "duration_ms": round(duration * 1000, 2), **self.attributes}
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """Context manager timing a unit of work; a shared no-op when tracing is disabled."""
+    if not TRACING_ENABLED:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+class RequestTrace(Span):
+    """Root span for a request: owns the Trace and logs it as one JSON line when done."""
+
+    def __init__(self, name: str, attributes: Dict):
+        super().__init__(name, attributes)
+        self.trace = Trace(name, attributes)
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_trace.set(self.trace)
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_trace.reset(self._token)
+        self._log(exc_type)
+        return False
+
+    def _log(self, exc_type):
+        record = self._finish(exc_type)
+        metrics.inc("legal_rag_requests_total", request=self.name, status="error" if exc_type else "ok")
+        logger.info(json.dumps({
+            "trace_id": self.trace.trace_id,
+            "request": record.pop("span"),
+            **record,
+            "spans": self.trace.spans
+        }, default=str))
+
+
+def trace_request(name: str, **attributes):
+    """Context manager wrapping a whole request; a shared no-op when tracing is disabled."""
+    if not TRACING_ENABLED:
+        return _NOOP_SPAN
+    return RequestTrace(name, attributes)
+
+
+def trace_iterator(name: str, iterator: Iterator, **attributes) -> Iterator:
+    """
+    Traces a generator as one request.
+
+    The trace is only active while the generator is being advanced: a context
+    variable left set across a yield would leak into whichever context resumes it.
+    """
+    if not TRACING_ENABLED:
+        return iterator
+    return _traced_iterator(RequestTrace(name, attributes), iterator)
+
+
+def _traced_iterator(request: RequestTrace, iterator: Iterator) -> Iterator:
+    request.start = time.perf_counter()
+    exc_type = None
+    try:
+        while True:
+            token = _current_trace.set(request.trace)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _current_trace.reset(token)
+            yield item
+    except BaseException as exc:
+        exc_type = type(exc)
+        raise
+    finally:
+        request._log(exc_type)
+
+
+def record_cache(cache: str, hit: bool):
+    if TRACING_ENABLED:
+        metrics.inc("legal_rag_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def record_llm_usage(current_span, response):
+    """Copies token counts, and the model that answered, from a chat model response onto a span."""
+    model = (getattr(response, "response_metadata", None) or {}).get("answered_by")
+    if model:
+        current_span.set(model=model)
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        current_span.set(input_tokens=usage.get("input_tokens", 0), output_tokens=usage.get("output_tokens", 0))
+
+
+def render_metrics() -> str:
+    return metrics.render()
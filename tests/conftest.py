@@ -0,0 +1,14 @@
+import pytest
+from benchmarks.mocks import HashingEmbeddingModel
+from src.embeddings import EmbeddingService
+from src.resources import registry
+
+
+@pytest.fixture
+def hash_embeddings():
+    """Swaps the SentenceTransformer for the benchmarks' hashing embedder."""
+    service = EmbeddingService()
+    service._model = HashingEmbeddingModel()
+    registry.override("embedding_service", service)
+    yield service
+    registry.clear("embedding_service")
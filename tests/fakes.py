@@ -0,0 +1,48 @@
+import time
+from typing import Any, Iterator, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class Response:
+    def __init__(self, status_code: int, retry_after: Optional[str] = None):
+        self.status_code = status_code
+        self.headers = {"retry-after": retry_after} if retry_after else {}
+
+
+class APIStatusError(Exception):
+    def __init__(self, status: int, retry_after: Optional[str] = "0.001"):
+        super().__init__(f"HTTP {status}")
+        self.response = Response(status, retry_after)
+
+
+class ScriptedModel(BaseChatModel):
+    """Fails with the given errors, in order, then answers with its own name."""
+    model_name: str
+    errors: List[Exception] = []
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _next(self):
+        self.calls += 1
+        if self.calls <= len(self.errors):
+            raise self.errors[self.calls - 1]
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self._next()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.model_name))])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self._next()
+        for word in ("answer ", "from ", self.model_name):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+
+def unique(name: str) -> str:
+    # Every model name gets its own process-wide rate limiter
+    return f"{name}-{time.monotonic_ns()}"
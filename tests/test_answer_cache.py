@@ -0,0 +1,69 @@
+import pytest
+from src.agents.query_router import acts_named
+from src.answer_cache import AnswerCache
+
+
+@pytest.fixture
+def cache(tmp_path, hash_embeddings):
+    # The hashing embedder scores paraphrases far lower than the real model does
+    return AnswerCache(path=str(tmp_path / "answers.sqlite3"), threshold=0.5)
+
+
+def test_exact_match_ignores_case_and_spacing(cache):
+    cache.store("What is Section 302 IPC?", "Murder.")
+
+    assert cache.lookup("what is  section 302 ipc?") == "Murder."
+
+
+def test_similar_question_about_the_same_section_hits(cache):
+    cache.store("what is section 41 of the crpc", "When police may arrest without warrant.")
+
+    assert cache.lookup("explain section 41 of the crpc") == "When police may arrest without warrant."
+
+
+def test_different_section_misses(cache):
+    cache.store("what is section 41 of the crpc", "When police may arrest without warrant.")
+
+    assert cache.lookup("what is section 42 of the crpc") is None
+
+
+def test_same_section_of_a_different_act_misses(cache):
+    cache.store("section 41 crpc", "When police may arrest without warrant.")
+
+    assert cache.lookup("section 41 ipc") is None
+    assert cache.lookup("section 41") is None
+
+
+def test_expired_answers_are_not_served(cache):
+    cache.store("section 41 crpc", "When police may arrest without warrant.")
+    cache.ttl = -1
+
+    assert cache.lookup("section 41 crpc") is None
+
+
+def test_least_recently_used_answers_are_evicted(cache):
+    cache.max_entries = 2
+    cache.store("section 41 crpc", "Arrest.")
+    cache.store("section 302 ipc", "Murder.")
+    cache.lookup("section 41 crpc")
+    cache.store("section 498a ipc", "Cruelty.")
+
+    assert cache.lookup("section 41 crpc") == "Arrest."
+    assert cache.lookup("section 302 ipc") is None
+
+
+def test_acts_named_matches_whole_aliases_only():
+    assert acts_named("Is s. 41 of the Cr.P.C. bailable?") == {"THE CODE OF CRIMINAL PROCEDURE 1973.pdf"}
+    assert acts_named("section 41 ipc") == {"THE INDIAN PENAL CODE.pdf"}
+    assert acts_named("what is a recipe") == set()
+
+
+def test_answers_from_an_older_index_are_skipped_then_deleted_on_store(cache, monkeypatch):
+    cache.store("section 41 crpc", "When police may arrest without warrant.")
+    monkeypatch.setattr("src.answer_cache.current_index_version", lambda: "rebuilt")
+
+    assert cache.lookup("section 41 crpc") is None
+    # Lookups only read; the stale row goes with the next store
+    assert cache._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] == 1
+    cache.store("section 302 ipc", "Murder.")
+    assert [row[0] for row in cache._conn.execute("SELECT question FROM answers")] == ["section 302 ipc"]
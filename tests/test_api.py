@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from api.server import ConcurrencyLimiter, QueryRequest, app, limiter, query_stream, resources
+from src.tools.retrieval_tools import UnknownSourceError
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def stream_query(question):
+        yield {"type": "token", "content": "Section 41"}
+        yield {"type": "answer", "content": "Section 41 lets police arrest without warrant."}
+
+    def search_all(query, k, collections, sources):
+        if sources not in (None, ["Indian Penal Code"]):
+            raise UnknownSourceError(f"No source matches {sources[0]!r}")
+        return {name: [Document(page_content=f"{name}: {query}", metadata={"k": k})] for name in collections}
+
+    monkeypatch.setattr(resources, "run_query", lambda question: f"Answer to {question}")
+    monkeypatch.setattr(resources, "stream_query", stream_query)
+    monkeypatch.setattr(resources, "search_all", search_all)
+    # No lifespan, so the real models and index are never loaded
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_query_returns_the_answer(client):
+    response = client.post("/query", json={"question": "section 41 crpc"})
+
+    assert response.json() == {"answer": "Answer to section 41 crpc"}
+    assert limiter.in_flight == 0
+
+
+def test_stream_frees_its_slot(client):
+    response = client.post("/query/stream", json={"question": "section 41 crpc"})
+
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 2
+    assert limiter.in_flight == 0
+
+
+def test_stream_that_is_never_read_frees_its_slot(monkeypatch):
+    monkeypatch.setattr(resources, "stream_query", lambda question: iter(()))
+
+    async def respond_without_reading():
+        response = await query_stream(QueryRequest(question="section 41 crpc"))
+        assert limiter.in_flight == 1
+        await response.background()
+
+    asyncio.run(respond_without_reading())
+    assert limiter.in_flight == 0
+
+
+def test_search_returns_each_requested_collection_once(client):
+    response = client.post("/search", json={"query": "arrest", "k": 2, "collections": ["cases", "cases", "statutes"]})
+
+    assert response.json() == {"results": {
+        "cases": [{"content": "cases: arrest", "metadata": {"k": 2}}],
+        "statutes": [{"content": "statutes: arrest", "metadata": {"k": 2}}]
+    }}
+
+
+def test_unknown_source_is_a_bad_request(client):
+    response = client.post("/search", json={"query": "arrest", "sources": ["Companies Act"]})
+
+    assert response.status_code == 400
+    assert "Companies Act" in response.json()["detail"]
+    assert limiter.in_flight == 0
+
+
+def test_search_failure_is_a_server_error(client, monkeypatch):
+    def broken_index(query, k, collections, sources):
+        raise ValueError("Index was built with a 768-dimension model; the loaded model has 384")
+    monkeypatch.setattr(resources, "search_all", broken_index)
+
+    response = client.post("/search", json={"query": "arrest", "sources": ["Indian Penal Code"]})
+
+    assert response.status_code == 500
+    assert limiter.in_flight == 0
+
+
+def test_full_queue_is_turned_away(client, monkeypatch):
+    # Every slot taken and no room to wait
+    monkeypatch.setattr("api.server.limiter", ConcurrencyLimiter(max_concurrency=0, max_queue=0, queue_timeout=1))
+
+    response = client.post("/query", json={"question": "section 41 crpc"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
@@ -0,0 +1,85 @@
+import json
+import pytest
+from src.ingestion import artifact
+from src.ingestion.artifact import (
+    ArtifactError,
+    corpus_hash,
+    pack_artifact,
+    prepare_index,
+    verify_artifact,
+    write_artifact_metadata
+)
+
+MANIFEST = {
+    "files": {"statutes": {"THE INDIAN PENAL CODE.pdf": {"hash": "abc", "chunks": 3}}},
+    "index_version": "0123456789abcdef"
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    chroma_path = tmp_path / "chroma_db"
+    chroma_path.mkdir()
+    (chroma_path / "chroma.sqlite3").write_bytes(b"index")
+    write_artifact_metadata(MANIFEST, {"statutes_collection": 3}, str(chroma_path))
+    return chroma_path
+
+
+def edit_metadata(chroma_path, **changes):
+    path = chroma_path / "artifact.json"
+    path.write_text(json.dumps({**json.loads(path.read_text()), **changes}))
+
+
+def test_corpus_hash_depends_only_on_file_contents():
+    rechunked = {"files": {"statutes": {"THE INDIAN PENAL CODE.pdf": {"hash": "abc", "chunks": 9}}}}
+    edited = {"files": {"statutes": {"THE INDIAN PENAL CODE.pdf": {"hash": "abd", "chunks": 3}}}}
+
+    assert corpus_hash(rechunked) == corpus_hash(MANIFEST)
+    assert corpus_hash(edited) != corpus_hash(MANIFEST)
+
+
+def test_index_built_for_this_configuration_verifies(index):
+    assert verify_artifact(str(index))["corpus_hash"] == corpus_hash(MANIFEST)
+
+
+@pytest.mark.parametrize("changes, problem", [
+    ({"embedding_model": "another-model"}, "embedding model"),
+    ({"chunking": {"splitter": "character"}}, "chunking"),
+    ({"layout": "unified"}, "index layout")
+])
+def test_mismatched_index_is_refused(index, changes, problem):
+    edit_metadata(index, **changes)
+
+    with pytest.raises(ArtifactError, match=problem):
+        verify_artifact(str(index))
+
+
+def test_pinned_corpus_hash_is_enforced(index, monkeypatch):
+    monkeypatch.setattr(artifact, "INDEX_CORPUS_HASH", "0" * 64)
+
+    with pytest.raises(ArtifactError, match="corpus hash"):
+        verify_artifact(str(index))
+
+
+def test_missing_index_without_an_archive_is_refused(tmp_path):
+    with pytest.raises(ArtifactError, match="INDEX_ARTIFACT is not set"):
+        prepare_index(str(tmp_path / "chroma_db"), archive="")
+
+    (tmp_path / "chroma_db").mkdir()
+    with pytest.raises(ArtifactError, match="No index artifact"):
+        prepare_index(str(tmp_path / "chroma_db"), archive="")
+
+
+def test_packed_index_unpacks_into_a_missing_directory(index, tmp_path):
+    (index / "leftover.tmp").write_text("partial")
+    (tmp_path / "dist").mkdir()
+    archive = pack_artifact(str(tmp_path / "dist"), str(index))
+    assert archive.endswith(f"-{corpus_hash(MANIFEST)[:12]}-01234567.tar.gz")
+
+    replica = tmp_path / "replica"
+    metadata = prepare_index(str(replica), archive=archive)
+
+    assert metadata == verify_artifact(str(index))
+    assert (replica / "chroma.sqlite3").read_bytes() == b"index"
+    assert not (replica / "leftover.tmp").exists()
+    assert not list(tmp_path.glob("replica.unpack-*"))
@@ -0,0 +1,93 @@
+import json
+import pytest
+from src.agents import batch
+from src.agents.batch import RateLimitGate, call_with_retry, completed_ids
+from src.llm_gateway import LLMGateway
+from src.resources import registry
+from tests.fakes import APIStatusError, ScriptedModel
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(batch, "backoff_delay", lambda attempt, error: 0.01)
+
+
+def flaky(errors, answer="ok"):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return answer
+    return fn, calls
+
+
+def test_retryable_errors_are_retried():
+    fn, calls = flaky([APIStatusError(503), APIStatusError(429)])
+
+    assert call_with_retry(fn, RateLimitGate(), max_retries=2) == "ok"
+    assert len(calls) == 3
+
+
+def test_client_errors_are_not_retried():
+    fn, calls = flaky([APIStatusError(400)])
+
+    with pytest.raises(APIStatusError):
+        call_with_retry(fn, RateLimitGate(), max_retries=2)
+    assert len(calls) == 1
+
+
+def test_rate_limit_pauses_the_gate_even_without_retries():
+    gate = RateLimitGate()
+    fn, calls = flaky([APIStatusError(429)])
+
+    with pytest.raises(APIStatusError):
+        call_with_retry(fn, gate, max_retries=0)
+    assert len(calls) == 1
+    assert gate._resume_at > 0
+
+
+def test_completed_ids_skip_failures_and_torn_lines(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    output.write_text(
+        json.dumps({"id": "a", "answer": "yes"}) + "\n" +
+        json.dumps({"id": "b", "error": "routing failed"}) + "\n" +
+        '{"id": "c", "ans'
+    )
+
+    assert completed_ids(str(output)) == {"a"}
+
+
+def test_steps_are_not_retried_around_the_gateway():
+    registry.override("llm", LLMGateway(primary=ScriptedModel(model_name="primary")))
+    try:
+        assert batch.step_retries() == 0
+    finally:
+        registry.clear("llm")
+
+
+def test_only_questions_in_this_run_count_as_skipped(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    output.write_text(
+        json.dumps({"id": "a", "answer": "yes"}) + "\n" +
+        json.dumps({"id": "old", "answer": "from an earlier question file"}) + "\n"
+    )
+
+    summary = batch.run_batch([("a", "section 41 crpc")], str(output))
+
+    assert summary == {"answered": 0, "skipped": 1, "failed": 0}
+
+
+def test_line_cut_inside_a_character_is_terminated(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    answered = json.dumps({"id": "a", "answer": "yes"}) + "\n"
+    # A Devanagari answer cut after the first byte of a three-byte character
+    torn = json.dumps({"id": "b", "answer": "धारा 41"}, ensure_ascii=False).encode("utf-8")[:24]
+    output.write_bytes(answered.encode("utf-8") + torn)
+
+    summary = batch.run_batch([("a", "section 41 crpc")], str(output))
+
+    assert summary == {"answered": 0, "skipped": 1, "failed": 0}
+    assert output.read_bytes() == answered.encode("utf-8") + torn + b"\n"
+    assert completed_ids(str(output)) == {"a"}
@@ -0,0 +1,35 @@
+import json
+import sys
+import pytest
+from benchmarks import compare
+from benchmarks.compare import flatten
+
+
+def test_flatten_keeps_numbers_only():
+    assert flatten({"10x": {"retrieval": {"p50_ms": 3, "ok": True}, "label": "x"}}) == {"10x.retrieval.p50_ms": 3.0}
+
+
+def run(monkeypatch, tmp_path, old, new, threshold="0.1"):
+    paths = []
+    for name, scales in (("old", old), ("new", new)):
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps({"commit": name, "scales": scales}))
+        paths.append(str(path))
+    monkeypatch.setattr(sys, "argv", ["compare", *paths, "--threshold", threshold])
+
+    with pytest.raises(SystemExit) as exit_info:
+        compare.main()
+    return exit_info.value.code
+
+
+@pytest.mark.parametrize("old, new, code", [
+    ({"query": {"p95_ms": 100}}, {"query": {"p95_ms": 105}}, 0),
+    ({"query": {"p95_ms": 100}}, {"query": {"p95_ms": 120}}, 1),
+    ({"query": {"p95_ms": 100}}, {"query": {"p95_ms": 50}}, 0),
+    ({"load": {"qps": 100}}, {"load": {"qps": 80}}, 1),
+    ({"load": {"qps": 100}}, {"load": {"qps": 150}}, 0),
+    # Counts aren't timings, and metrics missing from either run are skipped
+    ({"ingest": {"chunks": 100, "p50_ms": 1}}, {"ingest": {"chunks": 500}}, 0)
+])
+def test_regressions_set_the_exit_status(monkeypatch, tmp_path, old, new, code):
+    assert run(monkeypatch, tmp_path, old, new) == code
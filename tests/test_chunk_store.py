@@ -0,0 +1,87 @@
+import os
+from src.ingestion.chunk_store import ChunkStore, SourceTable, resolve_chunks, stored_metadata
+
+TEXTS = {f"chunk-{i}": f"{i}. Section text number {i}. " * 20 for i in range(10)}
+
+
+def test_round_trip_across_reopen(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put(TEXTS.items())
+    store.save()
+
+    reopened = ChunkStore(str(tmp_path))
+    assert reopened.get(["chunk-3", "missing", "chunk-0"]) == [TEXTS["chunk-3"], None, TEXTS["chunk-0"]]
+
+
+def test_reads_see_appends_after_the_file_was_mapped(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put([("chunk-0", TEXTS["chunk-0"])])
+    assert store.get(["chunk-0"]) == [TEXTS["chunk-0"]]
+
+    store.put([("chunk-1", TEXTS["chunk-1"])])
+    assert store.get(["chunk-1"]) == [TEXTS["chunk-1"]]
+
+
+def test_few_deletes_keep_the_data_file(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put(TEXTS.items())
+    store.delete(["chunk-0", "chunk-1"])
+    store.save()
+
+    assert sorted(os.listdir(tmp_path)) == ["data-0.bin", "index.json"]
+    assert ChunkStore(str(tmp_path)).get(["chunk-0", "chunk-2"]) == [None, TEXTS["chunk-2"]]
+
+
+def test_mostly_deleted_store_is_compacted(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put(TEXTS.items())
+    store.save()
+    old_size = os.path.getsize(tmp_path / "data-0.bin")
+
+    kept = ["chunk-7", "chunk-2"]
+    store.delete([chunk_id for chunk_id in TEXTS if chunk_id not in kept])
+    store.save()
+
+    assert sorted(os.listdir(tmp_path)) == ["data-1.bin", "index.json"]
+    assert os.path.getsize(tmp_path / "data-1.bin") < old_size / 2
+    reopened = ChunkStore(str(tmp_path))
+    assert reopened.get(kept) == [TEXTS[chunk_id] for chunk_id in kept]
+
+
+def test_reader_opened_before_compaction_keeps_reading(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.put(TEXTS.items())
+    store.save()
+    reader = ChunkStore(str(tmp_path))
+
+    store.delete([chunk_id for chunk_id in TEXTS if chunk_id != "chunk-5"])
+    store.save()
+
+    assert reader.get(["chunk-9"]) == [TEXTS["chunk-9"]]
+
+
+def test_compact_metadata_interns_sources(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.ingestion.chunk_store.METADATA_FIELDS", ["source", "page"])
+    sources = SourceTable(str(tmp_path))
+
+    stored = stored_metadata({"source": "THE INDIAN PENAL CODE.pdf", "page": 60, "creator": "pdfTeX"}, sources)
+    sources.save()
+
+    assert stored == {"page": 60, "source_id": 0}
+    assert SourceTable(str(tmp_path)).name(0) == "THE INDIAN PENAL CODE.pdf"
+    assert stored_metadata({"creator": "pdfTeX"}, None) == {"creator": "pdfTeX"}
+
+
+def test_resolve_chunks_restores_text_and_sources(tmp_path):
+    store = ChunkStore(os.path.join(tmp_path, "chunks", "statutes_collection"))
+    store.put([("chunk-0", TEXTS["chunk-0"])])
+    store.save()
+    sources = SourceTable(str(tmp_path))
+    sources.intern("THE INDIAN PENAL CODE.pdf")
+    sources.save()
+
+    texts, metadatas = resolve_chunks("statutes_collection", ["chunk-0"], [None], [{"source_id": 0, "page": 60}],
+                                      chroma_path=str(tmp_path))
+
+    assert texts == [TEXTS["chunk-0"]]
+    assert metadatas == [{"source": "THE INDIAN PENAL CODE.pdf", "page": 60}]
@@ -0,0 +1,68 @@
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.agents.citation_agent import build_citations, filter_citations
+from src.resources import registry
+
+
+def doc(source, page, score):
+    return Document(page_content=f"{source} page {page}", metadata={"source": source, "page": page, "score": score})
+
+
+RETRIEVED = {
+    "statutes": [doc("THE INDIAN PENAL CODE.pdf", 60, 0.4), doc("THE INDIAN PENAL CODE.pdf", 60, 0.3),
+                 doc("THE CODE OF CRIMINAL PROCEDURE 1973.pdf", 30, 0.8)],
+    "cases": [doc("State v. Accused.pdf", 2, 0.6)],
+    "regulations": []
+}
+
+
+@pytest.fixture
+def llm_replying():
+    def install(reply):
+        registry.override("llm", FakeListChatModel(responses=[reply]))
+    yield install
+    registry.clear("llm")
+
+
+def test_metadata_citations_list_each_page_once_best_first():
+    assert build_citations(RETRIEVED) == (
+        "**STATUTE CITATIONS:**\n"
+        "1. THE CODE OF CRIMINAL PROCEDURE 1973, Page 31 - Retrieval relevance 0.80\n"
+        "2. THE INDIAN PENAL CODE, Page 61 - Retrieval relevance 0.40\n\n"
+        "**CASE LAW CITATIONS:**\n"
+        "1. State v. Accused, Page 3 - Retrieval relevance 0.60\n\n"
+        "**REGULATION CITATIONS:**\n"
+        "None"
+    )
+
+
+def test_filter_keeps_the_documents_the_llm_names(llm_replying):
+    llm_replying("2, 3")
+
+    citations, reply = filter_citations("punishment for murder", RETRIEVED)
+
+    assert "INDIAN PENAL CODE" in citations and "State v. Accused" in citations
+    assert "CRIMINAL PROCEDURE" not in citations
+    assert reply.content == "2, 3"
+
+
+def test_filter_can_drop_everything(llm_replying):
+    llm_replying("None")
+
+    citations, _ = filter_citations("punishment for murder", RETRIEVED)
+
+    assert citations.count("None") == 3
+
+
+def test_unparseable_filter_reply_cites_everything(llm_replying):
+    llm_replying("I think the first one")
+
+    citations, _ = filter_citations("punishment for murder", RETRIEVED)
+
+    assert citations == build_citations(RETRIEVED)
+
+
+def test_nothing_to_filter_skips_the_llm():
+    assert filter_citations("punishment for murder", {}) == (build_citations({}), None)
+
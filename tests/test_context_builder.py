@@ -0,0 +1,66 @@
+from langchain_core.documents import Document
+from src.agents.context_builder import MIN_BLOCK_TOKENS, build_context, estimate_tokens, location_label
+
+SECTION_302 = ("302. Punishment for murder.—Whoever commits murder shall be punished with death, "
+               "or imprisonment for life, and shall also be liable to fine.")
+
+
+def doc(text, page=60, score=0.5, source="THE INDIAN PENAL CODE.pdf", **metadata):
+    return Document(page_content=text, metadata={"source": source, "page": page, "score": score, **metadata})
+
+
+def test_overlapping_chunks_of_a_page_are_merged():
+    first, second = SECTION_302[:90], SECTION_302[60:]
+
+    blocks = build_context({"statutes": [doc(second), doc(first)]}, token_budget=1000)["statutes"]
+
+    assert [block.text for block in blocks] == [SECTION_302]
+    assert (blocks[0].source, blocks[0].page_str) == ("THE INDIAN PENAL CODE", "Page 61")
+
+
+def test_duplicates_are_dropped_and_other_pages_kept_apart():
+    blocks = build_context({"statutes": [doc(SECTION_302), doc(SECTION_302[10:70]), doc(SECTION_302, page=61)]},
+                           token_budget=1000)["statutes"]
+
+    assert [block.page_str for block in blocks] == ["Page 61", "Page 62"]
+
+
+def test_a_chunk_can_bridge_two_blocks():
+    a, b, c = SECTION_302[:50], SECTION_302[30:100], SECTION_302[80:]
+
+    blocks = build_context({"statutes": [doc(a), doc(c), doc(b)]}, token_budget=1000)["statutes"]
+
+    assert [block.text for block in blocks] == [SECTION_302]
+
+
+def test_budget_admits_best_blocks_first_and_truncates_the_last():
+    long_text = "x" * (MIN_BLOCK_TOKENS * 4 * 4)
+    retrieved = {
+        "statutes": [doc("best " * 100, page=1, score=0.9)],
+        "cases": [doc(long_text, page=2, score=0.5, source="State v. Accused.pdf")],
+        "regulations": [doc("worst " * 100, page=3, score=0.1, source="Police Manual.pdf")]
+    }
+    budget = estimate_tokens("best " * 100) + MIN_BLOCK_TOKENS * 2
+
+    blocks = build_context(retrieved, token_budget=budget)
+
+    assert len(blocks["statutes"]) == 1
+    assert blocks["cases"][0].text.endswith("...")
+    assert estimate_tokens(blocks["cases"][0].text[:-3]) == MIN_BLOCK_TOKENS * 2
+    # Too little budget left to be worth a fragment
+    assert blocks["regulations"] == []
+
+
+def test_rerank_score_outranks_vector_score():
+    retrieved = {"statutes": [doc("first " * 20, page=1, score=0.9, rerank_score=0.1),
+                              doc("second " * 20, page=2, score=0.1, rerank_score=0.8)]}
+
+    blocks = build_context(retrieved, token_budget=1000)["statutes"]
+
+    assert [block.page_str for block in blocks] == ["Page 3", "Page 2"]
+
+
+def test_location_labels():
+    assert location_label({"page": 11}) == "Page 12"
+    assert location_label({"page": 60, "page_end": 61, "section": "302"}) == "Section 302, Pages 61-62"
+    assert location_label({}) == "Page N/A"
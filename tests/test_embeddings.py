@@ -0,0 +1,58 @@
+import numpy as np
+from src.embeddings import EmbeddingService
+
+
+class CountingModel:
+    """Encodes each text as [len(text)] and remembers every batch it was asked for."""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts, batch_size=64, **kwargs):
+        self.batches.append(list(texts))
+        return np.array([[float(len(text))] for text in texts])
+
+
+def service(cache_size=2):
+    service = EmbeddingService(cache_size=cache_size)
+    service._model = CountingModel()
+    return service
+
+
+def test_misses_are_encoded_in_one_batch_and_repeats_served_from_cache():
+    embeddings = service()
+
+    assert embeddings.embed_queries(["ipc", "crpc", "ipc"]) == [[3.0], [4.0], [3.0]]
+    assert embeddings.embed_query("crpc") == [4.0]
+    assert embeddings.model.batches == [["ipc", "crpc"]]
+    assert (embeddings.cache_hits, embeddings.cache_misses) == (1, 3)
+
+
+def test_least_recently_used_query_is_evicted():
+    embeddings = service(cache_size=2)
+
+    embeddings.embed_queries(["ipc", "crpc"])
+    embeddings.embed_query("ipc")
+    embeddings.embed_query("pocso")
+    embeddings.embed_queries(["ipc", "crpc"])
+
+    assert embeddings.model.batches[-1] == ["crpc"]
+
+
+def test_cache_can_be_turned_off():
+    embeddings = service(cache_size=0)
+
+    embeddings.embed_query("ipc")
+    embeddings.embed_query("ipc")
+
+    assert embeddings.model.batches == [["ipc"], ["ipc"]]
+
+
+def test_documents_are_not_cached():
+    embeddings = service()
+
+    assert embeddings.encode([]) == []
+    embeddings.encode(["302. Punishment for murder."])
+    embeddings.embed_query("302. Punishment for murder.")
+
+    assert len(embeddings.model.batches) == 2
@@ -0,0 +1,77 @@
+from langchain_core.documents import Document
+from src.ingestion.lexical_index import LexicalIndex, build_lexical_index, tokenize
+from src.tools import retrieval_tools
+
+CHUNKS = [
+    ("ipc-498a", "498A. Husband or relative of husband of a woman subjecting her to cruelty."),
+    ("ipc-302", "302. Punishment for murder. Whoever commits murder shall be punished with death."),
+    ("ipc-304b", "304B. Dowry death. Where the death of a woman is caused within seven years of marriage."),
+    ("crpc-41", "41. When police may arrest without warrant."),
+]
+
+
+def test_tokens_keep_section_numbers_whole():
+    assert tokenize("Section 498A, IPC (Cr.P.C.)") == ["section", "498a", "ipc", "cr", "p", "c"]
+
+
+def test_bm25_ranks_exact_section_numbers(tmp_path):
+    assert build_lexical_index(CHUNKS, str(tmp_path / "statutes")) == 4
+    index = LexicalIndex(str(tmp_path / "statutes"))
+
+    assert index.search("section 498a cruelty", 2)[0][0] == "ipc-498a"
+    assert index.search("dowry death", 10)[0][0] == "ipc-304b"
+    assert index.search("bail", 5) == []
+    assert index.search("murder", 0) == []
+
+
+def test_rebuild_replaces_the_index(tmp_path):
+    index_dir = str(tmp_path / "statutes")
+    build_lexical_index(CHUNKS, index_dir)
+    build_lexical_index(CHUNKS[:1], index_dir)
+
+    assert LexicalIndex(index_dir).ids == ["ipc-498a"]
+    assert not (tmp_path / "statutes.tmp").exists()
+
+
+class FakeLexicalIndex:
+    def __init__(self, ids):
+        self.ids = ids
+
+    def search(self, query, k):
+        return [(chunk_id, 1.0) for chunk_id in self.ids[:k]]
+
+
+class FakeBackend:
+    def __init__(self, docs):
+        self.docs = docs
+        self.fetched = []
+
+    def fetch(self, collection_name, ids, query_embedding):
+        self.fetched.extend(ids)
+        return [(chunk_id, self.docs[chunk_id]) for chunk_id in ids if chunk_id in self.docs]
+
+
+def hit(chunk_id, source="THE INDIAN PENAL CODE.pdf"):
+    return chunk_id, Document(page_content=chunk_id, metadata={"source": source})
+
+
+def test_reciprocal_rank_fusion_favours_chunks_both_retrievers_found():
+    # "gone" is still in the BM25 index but was deleted from the collection
+    backend = FakeBackend({"bm25-only": hit("bm25-only")[1]})
+    dense = [hit("dense-only"), hit("both")]
+
+    docs = retrieval_tools._fuse(backend, "statutes_collection", FakeLexicalIndex(["both", "bm25-only", "gone"]),
+                                 "query", [0.0], dense, k=4)
+
+    assert [doc.page_content for doc in docs] == ["both", "dense-only", "bm25-only"]
+    assert docs[0].metadata["rrf_score"] > docs[1].metadata["rrf_score"]
+    assert "bm25-only" in backend.fetched
+
+
+def test_fusion_applies_the_source_filter_to_bm25_candidates():
+    backend = FakeBackend({"crpc": hit("crpc", "THE CODE OF CRIMINAL PROCEDURE 1973.pdf")[1]})
+
+    docs = retrieval_tools._fuse(backend, "statutes_collection", FakeLexicalIndex(["crpc"]), "query", [0.0],
+                                 [hit("ipc")], k=5, sources=["THE INDIAN PENAL CODE.pdf"])
+
+    assert [doc.page_content for doc in docs] == ["ipc"]
@@ -0,0 +1,225 @@
+import asyncio
+import time
+import pytest
+from langchain_core.messages import HumanMessage
+from benchmarks.mocks import MockGroqServer
+from src import llm_gateway
+from src.llm_gateway import (
+    LLMGateway,
+    TokenBucket,
+    answered_by,
+    backoff_delay,
+    build_llm,
+    from_fallback,
+    is_retryable,
+    limiter_for,
+    status_code
+)
+from tests.fakes import APIStatusError, ScriptedModel, unique
+
+
+QUESTION = [HumanMessage(content="What does section 41 of the CrPC say?")]
+
+
+def test_errors_worth_retrying():
+    assert is_retryable(APIStatusError(429))
+    assert is_retryable(APIStatusError(503))
+    assert not is_retryable(APIStatusError(400))
+    assert not is_retryable(ValueError("bad prompt"))
+    assert status_code(APIStatusError(429)) == 429
+
+
+def test_backoff_honours_retry_after():
+    assert backoff_delay(3, APIStatusError(429, retry_after="7")) == 7.0
+    assert 0.5 <= backoff_delay(0, APIStatusError(503, retry_after=None)) <= 1.5
+
+
+def test_token_bucket_schedules_callers_in_turn():
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.reserve(60) == 0.0
+    # The next caller waits for one unit to refill, the one after for two
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve(1) == pytest.approx(2.0, abs=0.05)
+
+
+def test_unlimited_token_bucket_never_waits():
+    assert TokenBucket(per_minute=0).reserve(10 ** 6) == 0.0
+
+
+def test_primary_is_retried_before_falling_back():
+    primary = ScriptedModel(model_name=unique("primary"), errors=[APIStatusError(503)])
+    fallback = ScriptedModel(model_name=unique("fallback"))
+    gateway = LLMGateway(primary=primary, fallback=fallback, max_retries=2)
+
+    reply = gateway.invoke(QUESTION)
+
+    assert reply.content == primary.model_name
+    assert answered_by(reply) == primary.model_name
+    assert not from_fallback(reply)
+    assert (primary.calls, fallback.calls) == (2, 0)
+
+
+def test_fallback_answer_is_marked():
+    primary = ScriptedModel(model_name=unique("primary"), errors=[APIStatusError(503)] * 3)
+    fallback = ScriptedModel(model_name=unique("fallback"))
+    gateway = LLMGateway(primary=primary, fallback=fallback, max_retries=2)
+
+    reply = gateway.invoke(QUESTION)
+
+    assert answered_by(reply) == fallback.model_name
+    assert from_fallback(reply)
+    assert primary.calls == 3
+
+
+def test_client_errors_are_not_retried_or_sent_to_the_fallback():
+    primary = ScriptedModel(model_name=unique("primary"), errors=[APIStatusError(400)])
+    fallback = ScriptedModel(model_name=unique("fallback"))
+    gateway = LLMGateway(primary=primary, fallback=fallback, max_retries=2)
+
+    with pytest.raises(APIStatusError):
+        gateway.invoke(QUESTION)
+    assert (primary.calls, fallback.calls) == (1, 0)
+
+
+def test_streamed_fallback_answer_is_marked_once():
+    primary = ScriptedModel(model_name=unique("primary"), errors=[APIStatusError(503)] * 2)
+    fallback = ScriptedModel(model_name=unique("fallback"))
+    gateway = LLMGateway(primary=primary, fallback=fallback, max_retries=1)
+
+    chunks = list(gateway.stream(QUESTION))
+    reply = chunks[0]
+    for chunk in chunks[1:]:
+        reply += chunk
+
+    assert reply.content == f"answer from {fallback.model_name}"
+    assert answered_by(reply) == fallback.model_name
+    assert from_fallback(reply)
+
+
+@pytest.fixture
+def groq(monkeypatch):
+    """Builds the real gateway against a MockGroqServer, with its own rate limiters."""
+    primary, fallback = unique("primary"), unique("fallback")
+    monkeypatch.setattr(llm_gateway, "GROQ_API_KEY", "test")
+    monkeypatch.setattr(llm_gateway, "LLM_MODEL", primary)
+    monkeypatch.setattr(llm_gateway, "LLM_FALLBACK_MODEL", fallback)
+
+    def serve(errors, retry_after=0.05):
+        server = MockGroqServer(retry_after=retry_after, errors=errors(primary, fallback))
+        return server, build_llm(base_url=server.base_url)
+    return serve
+
+
+def test_server_errors_are_retried_against_the_mock_server(groq):
+    server, gateway = groq(lambda primary, fallback: {primary: [503, 500]})
+
+    with server:
+        reply = gateway.invoke(QUESTION)
+
+    primary = gateway.primary.model_name
+    assert answered_by(reply) == primary
+    assert not from_fallback(reply)
+    assert server.calls == [(primary, 503), (primary, 500), (primary, 200)]
+
+
+def test_rate_limit_pauses_the_model_before_the_retry(groq):
+    server, gateway = groq(lambda primary, fallback: {primary: [429]}, retry_after=0.3)
+    started = time.monotonic()
+
+    with server:
+        reply = gateway.invoke(QUESTION)
+
+    primary = gateway.primary.model_name
+    assert answered_by(reply) == primary
+    assert time.monotonic() - started >= 0.3
+    assert limiter_for(primary)._resume_at >= started + 0.3
+    assert limiter_for(gateway.fallback.model_name)._resume_at == 0.0
+    assert server.calls == [(primary, 429), (primary, 200)]
+
+
+def test_fallback_answers_once_the_mock_server_keeps_failing(groq):
+    server, gateway = groq(lambda primary, fallback: {primary: [503, 429]})
+    gateway.max_retries = 1
+
+    with server:
+        reply = gateway.invoke(QUESTION)
+
+    fallback = gateway.fallback.model_name
+    assert answered_by(reply) == fallback
+    assert from_fallback(reply)
+    assert [status for _, status in server.calls] == [503, 429, 200]
+    assert server.calls[-1][0] == fallback
+
+
+def test_hedged_call_is_answered_by_the_fallback(groq):
+    # The primary would answer after two 0.3s backoffs; the hedge goes out after 0.1s
+    server, gateway = groq(lambda primary, fallback: {primary: [503, 503]}, retry_after=0.3)
+    gateway.hedge_after = 0.1
+    primary = gateway.primary.model_name
+
+    with server:
+        started = time.monotonic()
+        reply = gateway.invoke(QUESTION)
+        elapsed = time.monotonic() - started
+
+        # Let the primary's abandoned call finish before the server goes away
+        deadline = time.monotonic() + 5
+        while (primary, 200) not in server.calls and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    assert answered_by(reply) == gateway.fallback.model_name
+    assert from_fallback(reply)
+    assert elapsed < 0.5
+
+
+def test_ainvoke_retries_and_falls_back(groq):
+    server, gateway = groq(lambda primary, fallback: {primary: [500, 502], fallback: [429]})
+    gateway.max_retries = 1
+
+    with server:
+        reply = asyncio.run(gateway.ainvoke(QUESTION))
+
+    fallback = gateway.fallback.model_name
+    assert answered_by(reply) == fallback
+    assert from_fallback(reply)
+    assert server.calls[2:] == [(fallback, 429), (fallback, 200)]
+
+
+def test_astream_retries_before_its_first_chunk_and_falls_back(groq):
+    server, gateway = groq(lambda primary, fallback: {primary: [429, 503]})
+    gateway.max_retries = 1
+
+    async def collect():
+        return [chunk async for chunk in gateway.astream(QUESTION)]
+
+    with server:
+        chunks = asyncio.run(collect())
+
+    reply = chunks[0]
+    for chunk in chunks[1:]:
+        reply += chunk
+
+    fallback = gateway.fallback.model_name
+    assert reply.content
+    assert answered_by(reply) == fallback
+    assert from_fallback(reply)
+    assert [status for _, status in server.calls] == [429, 503, 200]
+
+
+def test_astream_from_a_healthy_primary_streams_every_token(groq):
+    server, gateway = groq(lambda primary, fallback: {})
+
+    async def collect():
+        return [chunk async for chunk in gateway.astream(QUESTION)]
+
+    with server:
+        chunks = asyncio.run(collect())
+
+    reply = chunks[0]
+    for chunk in chunks[1:]:
+        reply += chunk
+
+    assert len(chunks) > 1
+    assert answered_by(reply) == gateway.primary.model_name
+    assert not from_fallback(reply)
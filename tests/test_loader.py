@@ -0,0 +1,46 @@
+import pytest
+from benchmarks.corpus import write_pdf
+from src.ingestion.loader import (
+    chunk_documents,
+    iter_chunks,
+    iter_page_ranges,
+    load_pdfs_from_directory,
+    plan_page_ranges
+)
+
+
+@pytest.fixture
+def statutes(tmp_path):
+    for name, pages in (("A.pdf", 5), ("B.pdf", 2)):
+        with open(tmp_path / name, "wb") as f:
+            write_pdf(f, [[f"{name} page {n}", f"{n}. Section text on page {n} " * 8] for n in range(pages)])
+    (tmp_path / "notes.txt").write_text("not a pdf")
+    return str(tmp_path)
+
+
+def test_files_are_split_into_page_ranges(statutes):
+    tasks = plan_page_ranges(statutes, "statutes", pages_per_task=2)
+
+    assert sorted((filename, start, end) for _, filename, _, start, end in tasks) == [
+        ("A.pdf", 0, 2), ("A.pdf", 2, 4), ("A.pdf", 4, 5), ("B.pdf", 0, 2)
+    ]
+    assert [task[1] for task in plan_page_ranges(statutes, "statutes", filenames=["B.pdf"])] == ["B.pdf"]
+
+
+def test_worker_processes_yield_pages_in_document_order(statutes):
+    serial = [doc for pages in iter_page_ranges(statutes, "statutes", workers=1) for doc in pages]
+    parallel = [doc for pages in iter_page_ranges(statutes, "statutes", workers=2) for doc in pages]
+
+    assert parallel == serial
+    assert len(serial) == 7
+    pages = [(doc.metadata["source"], doc.metadata["page"]) for doc in serial]
+    assert [page for source, page in pages if source == "A.pdf"] == [0, 1, 2, 3, 4]
+
+
+def test_pages_match_pypdf_loader(statutes):
+    expected = chunk_documents(load_pdfs_from_directory(statutes, "statutes"), "statutes")
+    chunks = list(iter_chunks(statutes, "statutes", workers=1, mode="fixed"))
+
+    assert [chunk.page_content for chunk in chunks] == [chunk.page_content for chunk in expected]
+    assert [(chunk.metadata["source"], chunk.metadata["page"], chunk.metadata["page_label"]) for chunk in chunks] == \
+        [(chunk.metadata["source"], chunk.metadata["page"], chunk.metadata["page_label"]) for chunk in expected]
@@ -0,0 +1,188 @@
+import time
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models import FakeListChatModel
+from src.agents import orchestrator
+from src.agents.citation_agent import build_citations
+from src.agents.orchestrator import SEARCH_K, initial_state_for, is_cacheable, run_tool_calls
+from src.agents.response_agent import append_citations
+from src.llm_gateway import LLMGateway
+from src.resources import registry
+from src.tools.result_store import RetrievalStore
+from tests.fakes import APIStatusError, ScriptedModel, unique
+
+
+def tool_call(name, query):
+    return {"name": name, "args": {"query": query}, "id": name}
+
+
+@pytest.fixture
+def store():
+    store = RetrievalStore()
+    store.put("statutes", "arrest without warrant", SEARCH_K, [Document(page_content="41. When police may arrest")])
+    return store
+
+
+def test_every_search_completed(store):
+    retrieved_docs, complete = run_tool_calls([tool_call("search_statutes", "arrest without warrant")], store)
+
+    assert complete
+    assert [doc.page_content for doc in retrieved_docs["statutes"]] == ["41. When police may arrest"]
+
+
+def test_a_failed_search_keeps_the_rest_but_is_reported(store, monkeypatch):
+    def unavailable(query, k):
+        raise ConnectionError("cases collection unavailable")
+    monkeypatch.setattr(orchestrator, "retrieve_cases", unavailable)
+
+    retrieved_docs, complete = run_tool_calls([
+        tool_call("search_statutes", "arrest without warrant"),
+        tool_call("search_cases", "arrest without warrant")
+    ], store)
+
+    assert not complete
+    assert len(retrieved_docs["statutes"]) == 1
+    assert retrieved_docs["cases"] == []
+
+
+def test_degraded_and_empty_answers_are_not_cacheable():
+    state = initial_state_for("section 41 crpc")
+    assert not is_cacheable(state)
+
+    state["final_answer"] = "When police may arrest without warrant."
+    assert is_cacheable(state)
+
+    state["degraded"] = True
+    assert not is_cacheable(state)
+
+
+@pytest.fixture
+def llm_falling_back():
+    primary = ScriptedModel(model_name=unique("primary"), errors=[APIStatusError(503)] * 2)
+    fallback = ScriptedModel(model_name=unique("fallback"))
+    registry.override("llm", LLMGateway(primary=primary, fallback=fallback, max_retries=1))
+    yield fallback.model_name
+    registry.clear("llm")
+
+
+def retrieved_state():
+    state = initial_state_for("section 41 crpc")
+    state["retrieved_docs"] = {
+        "statutes": [Document(page_content="41. When police may arrest without warrant.",
+                              metadata={"source": "THE CODE OF CRIMINAL PROCEDURE 1973.pdf", "page": 30})],
+        "cases": [],
+        "regulations": []
+    }
+    return state
+
+
+def test_answer_from_the_fallback_model_is_recorded_and_not_cacheable(llm_falling_back):
+    state = orchestrator.response_node(retrieved_state())
+
+    assert state["answered_by"] == llm_falling_back
+    assert state["degraded"]
+    assert not is_cacheable(state)
+
+
+def test_parallel_response_reports_the_fallback(llm_falling_back):
+    update = orchestrator.parallel_response_node(retrieved_state())
+
+    assert update["answered_by"] == llm_falling_back
+    assert update["degraded"]
+
+
+def test_searches_run_concurrently(monkeypatch):
+    def slow(query, k):
+        time.sleep(0.3)
+        return [Document(page_content=query)]
+    monkeypatch.setattr(orchestrator, "retrieve_statutes", slow)
+    monkeypatch.setattr(orchestrator, "retrieve_cases", slow)
+    monkeypatch.setattr(orchestrator, "retrieve_regulations", slow)
+
+    started = time.monotonic()
+    retrieved_docs, complete = run_tool_calls([
+        tool_call("search_statutes", "arrest"),
+        tool_call("search_cases", "arrest"),
+        tool_call("search_regulations", "arrest")
+    ], RetrievalStore())
+
+    assert complete
+    assert time.monotonic() - started < 0.8
+    assert all(len(docs) == 1 for docs in retrieved_docs.values())
+
+
+def test_a_search_past_the_timeout_is_dropped(store, monkeypatch):
+    def stuck(query, k):
+        time.sleep(1)
+        return []
+    monkeypatch.setattr(orchestrator, "retrieve_cases", stuck)
+    monkeypatch.setattr(orchestrator, "RETRIEVAL_TIMEOUT", 0.1)
+
+    retrieved_docs, complete = run_tool_calls([
+        tool_call("search_statutes", "arrest without warrant"),
+        tool_call("search_cases", "arrest without warrant")
+    ], store)
+
+    assert not complete
+    assert len(retrieved_docs["statutes"]) == 1
+
+
+def test_every_search_failing_raises(monkeypatch):
+    def unavailable(query, k):
+        raise ConnectionError("chroma unavailable")
+    monkeypatch.setattr(orchestrator, "retrieve_statutes", unavailable)
+
+    with pytest.raises(ConnectionError):
+        run_tool_calls([tool_call("search_statutes", "arrest")], RetrievalStore())
+
+
+@pytest.fixture
+def parallel_graph(monkeypatch):
+    def retrieve(state):
+        if state["question"] == "hello":
+            state["final_answer"] = "Hello!"
+            return state
+        return retrieved_state()
+    monkeypatch.setattr(orchestrator, "retrieval_agent_node", retrieve)
+    monkeypatch.setattr(orchestrator, "CITATION_MODE", "metadata")
+    registry.override("llm", FakeListChatModel(responses=["Police may arrest without a warrant."]))
+    yield orchestrator.build_graph(parallel=True)
+    registry.clear("llm")
+
+
+def test_parallel_graph_appends_the_citations_to_the_answer(parallel_graph):
+    final_state = parallel_graph.invoke(initial_state_for("section 41 crpc"))
+
+    citations = build_citations(retrieved_state()["retrieved_docs"])
+    assert citations
+    assert final_state["final_answer"] == append_citations("Police may arrest without a warrant.", citations)
+    assert not final_state["degraded"]
+
+
+def test_parallel_graph_ends_after_retrieval_without_docs(parallel_graph):
+    final_state = parallel_graph.invoke(initial_state_for("hello"))
+
+    assert final_state["final_answer"] == "Hello!"
+    assert final_state["citations"] == ""
+
+
+def test_empty_citations_leave_the_answer_alone():
+    assert append_citations("Answer.", "  ") == "Answer."
+    assert append_citations("Answer.", "Citations:\n1. IPC 302") == "Answer.\n\nCitations:\n1. IPC 302"
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_stream_reports_nodes_and_response_tokens(parallel_graph, parallel):
+    registry.override("graph", orchestrator.build_graph(parallel=parallel))
+    try:
+        events = list(orchestrator.stream_query("section 41 crpc"))
+    finally:
+        registry.clear("graph")
+
+    nodes = [event["node"] for event in events if event["type"] == "node"]
+    assert nodes[0] == "retrieval_agent"
+    assert {"citations", "response"} <= set(nodes)
+    tokens = "".join(event["content"] for event in events if event["type"] == "token")
+    assert tokens == "Police may arrest without a warrant."
+    assert events[-1]["type"] == "answer"
+    assert events[-1]["content"].startswith(tokens + "\n\n")
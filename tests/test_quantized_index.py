@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from src.ingestion.quantized_index import QuantizedIndex, build_quantized_index
+
+DIMS = 32
+
+
+def corpus(count, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, DIMS)).astype(np.float32)
+    chunks = [
+        (f"chunk-{row}", vectors[row].tolist(), f"text {row}",
+         {"source": f"file-{row % 3}.pdf", "doc_type": ("statutes", "case_laws")[row % 2], "page": row})
+        for row in range(count)
+    ]
+    return vectors, chunks
+
+
+def exact_top(vectors, query, k, rows=None):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    candidates = np.arange(len(vectors)) if rows is None else np.asarray(rows)
+    best = candidates[np.argsort(-scores[candidates])][:k]
+    return [f"chunk-{row}" for row in best]
+
+
+def build(tmp_path, chunks, **kwargs):
+    index_dir = str(tmp_path / "index")
+    assert build_quantized_index(iter(chunks), len(chunks), index_dir, **kwargs) == len(chunks)
+    return QuantizedIndex(index_dir)
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_rescoring_returns_exact_cosine_scores(tmp_path, quantization):
+    vectors, chunks = corpus(200)
+    index = build(tmp_path, chunks, quantization=quantization)
+    query = vectors[7] + 0.1
+
+    hits = index.search(query.tolist(), 5, rescore_factor=len(chunks))
+
+    # Rescoring every row makes the result exact whatever the codes
+    assert [chunk_id for chunk_id, _ in hits] == exact_top(vectors, query, 5)
+    scores = [score for _, score in hits]
+    assert scores == sorted(scores, reverse=True)
+    assert scores[0] == pytest.approx(index.similarity(hits[0][0], query.tolist()), abs=1e-5)
+
+
+def test_int8_codes_rank_close_to_exact(tmp_path):
+    vectors, chunks = corpus(500)
+    index = build(tmp_path, chunks, quantization="int8")
+    rng = np.random.default_rng(1)
+
+    recall = []
+    for query in rng.normal(size=(20, DIMS)):
+        found = {chunk_id for chunk_id, _ in index.search(query.tolist(), 10)}
+        recall.append(len(found & set(exact_top(vectors, query, 10))) / 10)
+
+    assert np.mean(recall) >= 0.95
+
+
+def test_ivf_search_and_narrow_filters_fall_back_to_a_full_scan(tmp_path):
+    vectors, chunks = corpus(400)
+    index = build(tmp_path, chunks, ivf_min_vectors=100)
+    assert index.ivf
+    query = vectors[11]
+
+    hits = index.search(query.tolist(), 3, nprobe=index.meta["ivf_lists"])
+    assert [chunk_id for chunk_id, _ in hits] == exact_top(vectors, query, 3)
+
+    # One probed list rarely holds k chunks of one file; the filtered search still fills up
+    hits = index.search(query.tolist(), 20, nprobe=1, sources=["file-1.pdf"])
+    assert len(hits) == 20
+    assert all(int(chunk_id.split("-")[1]) % 3 == 1 for chunk_id, _ in hits)
+
+
+def test_search_by_type_returns_each_types_top_k(tmp_path):
+    vectors, chunks = corpus(120)
+    index = build(tmp_path, chunks)
+    query = vectors[4]
+
+    grouped = index.search_by_type(query.tolist(), 4, ["statutes", "case_laws", "regulations"],
+                                   rescore_factor=len(chunks), sources=["file-0.pdf", "file-2.pdf"])
+
+    assert grouped["regulations"] == []
+    for doc_type, parity in (("statutes", 0), ("case_laws", 1)):
+        rows = [row for row in range(120) if row % 2 == parity and row % 3 != 1]
+        assert [chunk_id for chunk_id, _ in grouped[doc_type]] == exact_top(vectors, query, 4, rows)
+
+
+def test_fetch_returns_records_and_none_for_unknown_ids(tmp_path):
+    _, chunks = corpus(10)
+    index = build(tmp_path, chunks)
+
+    assert index.fetch(["chunk-3", "missing"]) == [("text 3", chunks[3][3]), None]
+    assert index.similarity("missing", [1.0] * DIMS) is None
+
+
+def test_empty_collection_is_searchable(tmp_path):
+    index = build(tmp_path, [])
+
+    assert index.search([1.0] * DIMS, 5) == []
+    assert index.search_by_type([1.0] * DIMS, 5, ["statutes"]) == {"statutes": []}
@@ -0,0 +1,49 @@
+import pytest
+from src.agents.query_router import classify_query
+
+IPC = "THE INDIAN PENAL CODE.pdf"
+CRPC = "THE CODE OF CRIMINAL PROCEDURE 1973.pdf"
+EVIDENCE = "THE INDIAN EVIDENCE ACT 1872 .pdf"
+
+
+@pytest.mark.parametrize("question, source, section", [
+    ("IPC 302", IPC, "302"),
+    ("ipc section 498a", IPC, "498A"),
+    ("Section 154 CrPC", CRPC, "154"),
+    ("what is section 41 of the crpc?", CRPC, "41"),
+    ("What does s. 65B of the Indian Evidence Act say?", EVIDENCE, "65B"),
+    ("explain  Sec. 41A   Cr.P.C.", CRPC, "41A"),
+])
+def test_section_lookups(question, source, section):
+    route = classify_query(question)
+
+    assert (route.kind, route.source, route.section) == ("section_lookup", source, section)
+
+
+@pytest.mark.parametrize("question", [
+    # Anything more than the bare lookup needs the LLM
+    "is section 302 ipc bailable?",
+    "difference between section 299 and 300 ipc",
+    "section 302",
+    "what is the punishment for murder",
+    "can the police arrest me without a warrant for my bitcoin trades",
+    "is cruelty under 498a a ground for divorce",
+])
+def test_questions_left_to_the_llm(question):
+    assert classify_query(question).kind == "llm"
+
+
+@pytest.mark.parametrize("question", ["hi", "Hello there!", "good  morning", "Thank you so much."])
+def test_greetings(question):
+    route = classify_query(question)
+
+    assert route.kind == "greeting"
+    assert route.reply
+
+
+@pytest.mark.parametrize("question", ["Give me a pasta recipe", "how do I file for divorce and alimony?"])
+def test_off_topic(question):
+    route = classify_query(question)
+
+    assert route.kind == "off_topic"
+    assert route.reply
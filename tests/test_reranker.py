@@ -0,0 +1,53 @@
+from langchain_core.documents import Document
+from src.tools.reranker import Reranker
+
+
+class LengthModel:
+    """Scores each pair by the length of the chunk, recording every predict call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size, show_progress_bar):
+        self.calls.append(len(pairs))
+        return [float(len(text)) for _, text in pairs]
+
+
+def reranker():
+    reranker = Reranker("test-model")
+    reranker._model = LengthModel()
+    return reranker
+
+
+def docs(*lengths):
+    return [Document(page_content="x" * length) for length in lengths]
+
+
+def test_every_collection_is_scored_in_one_call():
+    reranker_ = reranker()
+    reranked = reranker_.rerank("question", {"statutes": docs(1, 5, 3), "cases": docs(2, 4), "regulations": []},
+                                top_k=2)
+
+    assert reranker_.model.calls == [5]
+    assert [len(doc.page_content) for doc in reranked["statutes"]] == [5, 3]
+    assert [doc.metadata["rerank_score"] for doc in reranked["cases"]] == [4.0, 2.0]
+    assert reranked["regulations"] == []
+
+
+def test_candidate_budget_is_shared_between_collections():
+    reranker_ = reranker()
+    reranked = reranker_.rerank("question", {"statutes": docs(1, 2, 3, 9), "cases": docs(8, 7, 6, 5)},
+                                top_k=1, max_candidates=4)
+
+    # Each collection scores only its first two first-stage candidates
+    assert reranker_.model.calls == [4]
+    assert [len(doc.page_content) for doc in reranked["statutes"]] == [2]
+    assert [len(doc.page_content) for doc in reranked["cases"]] == [8]
+
+
+def test_nothing_retrieved_skips_the_model():
+    reranker_ = reranker()
+    retrieved_docs = {"statutes": [], "cases": []}
+
+    assert reranker_.rerank("question", retrieved_docs) is retrieved_docs
+    assert reranker_.model.calls == []
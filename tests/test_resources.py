@@ -0,0 +1,94 @@
+import threading
+import time
+import pytest
+from src import resources
+from src.resources import ResourceRegistry, registry, warm_up
+
+
+def counting_factory(calls, delay=0.0):
+    def build():
+        calls.append(threading.get_ident())
+        time.sleep(delay)
+        return object()
+    return build
+
+
+def test_nothing_is_built_until_first_use():
+    calls = []
+    registry = ResourceRegistry({"model": counting_factory(calls)})
+
+    assert not registry.is_loaded("model")
+    assert calls == []
+
+    model = registry.get("model")
+    assert registry.get("model") is model
+    assert registry.is_loaded("model")
+    assert len(calls) == 1
+
+
+def test_concurrent_first_use_builds_once():
+    calls = []
+    registry = ResourceRegistry({"model": counting_factory(calls, delay=0.05)})
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(registry.get("model"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_override_and_clear():
+    calls = []
+    registry = ResourceRegistry({"model": counting_factory(calls), "client": counting_factory(calls)})
+    stand_in = object()
+
+    registry.override("model", stand_in)
+    assert registry.get("model") is stand_in
+    assert calls == []
+
+    registry.get("client")
+    registry.clear("model")
+    assert not registry.is_loaded("model")
+    assert registry.is_loaded("client")
+
+    registry.clear()
+    assert not registry.is_loaded("client")
+    assert registry.get("model") is not stand_in
+
+
+def test_unknown_resource_cannot_be_overridden():
+    with pytest.raises(KeyError):
+        ResourceRegistry({}).override("model", object())
+
+
+def test_warm_up_loads_the_reranker_when_enabled(monkeypatch):
+    class Backend:
+        name = "quantized"
+
+    class StandIn:
+        model_loads = 0
+
+        @property
+        def model(self):
+            self.model_loads += 1
+
+    embeddings, reranker = StandIn(), StandIn()
+    stand_ins = {"retrieval_backend": Backend(), "llm_with_tools": object(), "graph": object(),
+                 "embedding_service": embeddings, "reranker": reranker}
+    for name, instance in stand_ins.items():
+        registry.override(name, instance)
+    try:
+        monkeypatch.setattr(resources, "RERANK_ENABLED", False)
+        warm_up()
+        assert (embeddings.model_loads, reranker.model_loads) == (1, 0)
+
+        monkeypatch.setattr(resources, "RERANK_ENABLED", True)
+        warm_up()
+        assert reranker.model_loads == 1
+    finally:
+        for name in stand_ins:
+            registry.clear(name)
@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from langchain_core.documents import Document
+from src.tools.result_store import RetrievalStore, current_store, normalize_query, use_store
+
+DOCS = [Document(page_content="302. Punishment for murder.")]
+
+
+def test_queries_differing_only_in_case_and_spacing_share_a_result():
+    store = RetrievalStore()
+    calls = []
+
+    def search(query, k):
+        calls.append(query)
+        return DOCS
+
+    store.fetch("statutes", "Punishment for  murder", 5, search)
+    assert store.fetch("statutes", "punishment for murder", 5, search) is DOCS
+    assert len(calls) == 1
+    assert store.searches == 1
+    assert normalize_query(" Punishment\tfor murder ") == "punishment for murder"
+
+
+def test_collection_and_k_are_part_of_the_key():
+    store = RetrievalStore()
+    calls = []
+
+    def search(query, k):
+        calls.append(k)
+        return DOCS[:k]
+
+    store.fetch("statutes", "murder", 5, search)
+    store.fetch("cases", "murder", 5, search)
+    store.fetch("statutes", "murder", 10, search)
+    assert len(calls) == 3
+
+
+def test_concurrent_fetches_of_one_query_run_one_search():
+    store = RetrievalStore()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_search(query, k):
+        calls.append(query)
+        started.set()
+        release.wait(5)
+        return DOCS
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(store.fetch, "statutes", "murder", 5, slow_search) for _ in range(4)]
+        started.wait(5)
+        release.set()
+        results = [future.result(5) for future in futures]
+
+    assert calls == ["murder"]
+    assert all(result is DOCS for result in results)
+
+
+def test_a_failed_search_is_retried_by_the_next_caller():
+    store = RetrievalStore()
+
+    def failing(query, k):
+        raise ConnectionError("chroma unavailable")
+
+    with pytest.raises(ConnectionError):
+        store.fetch("statutes", "murder", 5, failing)
+    assert store.fetch("statutes", "murder", 5, lambda query, k: DOCS) is DOCS
+    assert store.searches == 1
+
+
+def test_use_store_is_scoped_to_the_block():
+    store = RetrievalStore()
+
+    with use_store(store):
+        assert current_store() is store
+    assert current_store() is None
@@ -0,0 +1,104 @@
+from langchain_core.documents import Document
+from src.ingestion.section_index import find_section_headings, in_order, sections_for_chunks
+
+# Excerpts from the bundled bare acts, as the fixed-size splitter cuts them
+
+IPC_TABLE_OF_CONTENTS = """SECTIONS
+115.  Abetment of offence punishable with death or imprisonment for life—if offence not committed.
+116.  Abetment of offence punishable with imprisonment.—if offence be not committed."""
+
+IPC_SECTIONS_1_TO_3 = """THE INDIAN PENAL CODE
+ACT NO. 45 OF 18601
+CHAPTER I
+INTRODUCTION
+1. Title and extent of operation of the Code .—This Act shall be called the Indian Penal Code, and
+shall 3[extend to the whole of India 4***].
+2. Punishment of offences committed within India .—Every person shall be liable to punishment
+under this Code and not otherwise for every act or omission contrary to the provi sions thereof.
+3. Punishment of offences committed beyond, but which by law may be tried within, India .—
+Any person liable, by any 7[Indian law], to be tried for an offence committed beyond 8[India]."""
+
+IPC_SECTION_53 = """53. Punishments.—The punishments to which offenders are liable under the provisions of this Code are—
+First.—Death;"""
+
+IPC_PAGE_20_FOOTNOTES = """1. Ins. by Act 8 of 1942, s. 2 (w.e.f. 14-2-1942).
+2. Subs. by Act 26 of 1955, s. 117 and the Sch., for “Secondly.—Transportation” (w.e.f. 1-1-1956).
+3. The words “Thirdly,--Penal servitude;" omitted by Act 17 of 1949, s. 2 (w.e.f. 6-4-1949)."""
+
+IPC_SECTION_116 = """116. Abetment of offence punishable with imprisonment —if offence be not committed.—Whoever
+abets an offence punishable with imprisonment shall, if that offence be not committed."""
+
+CRPC_SECTION_1 = """THE CODE OF CRIMINAL PROCEDURE, 1973
+CHAPTER I
+PRELIMINARY
+1. Short title, extent and commencement .—(1) This Act may be called the Code of Criminal
+Procedure, 1973.
+2. Definitions.—In this Code, unless the context otherwise requires,—"""
+
+CRPC_SECTION_484 = """484. Repeal and savings.—(1) The Code of Criminal Procedure, 1898 (5 of 1898) is hereby repealed."""
+
+CRPC_APPENDIX = """261
+APPENDIX
+EXTRACTS FROM THE CODE OF CRIMINAL PROCEDURE (AMENDMENT) ACT, 2005
+NO. 25 OF 2005
+1. Short title and commencement. —(1) This Act may be called the Code of Criminal Procedure
+(Amendment) Act, 2005.
+16. Insertion of new section 144A .—In Chapter X of the principal Act, under sub -heading"""
+
+
+def chunk_list(*texts, labels=None):
+    labels = labels or [None] * len(texts)
+    chunks = []
+    for i, (text, label) in enumerate(zip(texts, labels)):
+        metadata = {"section": label} if label else {}
+        chunks.append((f"c{i}", Document(page_content=text, metadata=metadata)))
+    return chunks
+
+
+def test_footnotes_are_not_headings():
+    assert find_section_headings(IPC_PAGE_20_FOOTNOTES) == []
+    assert find_section_headings(IPC_SECTIONS_1_TO_3) == ["1", "2", "3"]
+
+
+def test_ipc_sections_2_and_3_point_at_the_body_not_the_footnotes():
+    sections = sections_for_chunks(chunk_list(IPC_SECTIONS_1_TO_3, IPC_SECTION_53, IPC_PAGE_20_FOOTNOTES))
+
+    assert sections["2"][0] == "c0"
+    assert sections["3"][0] == "c0"
+    assert "c2" not in sections["2"] + sections["3"]
+
+
+def test_crpc_section_1_ignores_the_amendment_act_appendix():
+    sections = sections_for_chunks(chunk_list(CRPC_SECTION_1, CRPC_SECTION_484, CRPC_APPENDIX))
+
+    assert sections["1"] == ["c0"]
+    # The amending Act's s.16 is not the Code's s.16, and the appendix extends no section
+    assert "16" not in sections
+    assert sections["484"] == ["c1"]
+
+
+def test_table_of_contents_entries_lose_to_the_body():
+    sections = sections_for_chunks(chunk_list(IPC_TABLE_OF_CONTENTS, IPC_SECTIONS_1_TO_3, IPC_SECTION_116))
+
+    assert sections["116"] == ["c2"]
+    assert sections["1"][0] == "c1"
+
+
+def test_structure_labels_repeated_across_chunks_stay_in_order():
+    # A long section split over several chunks carries the same label on each
+    sections = sections_for_chunks(chunk_list(
+        "444. Lurking house-trespass by night.—Whoever commits",
+        "lurking house-trespass by night.",
+        "shall be punished.",
+        "446. House-breaking.—A person is said to commit",
+        labels=["444", "444", "444", "446"]
+    ))
+
+    assert sections["444"] == ["c0", "c1", "c2"]
+    assert sections["446"] == ["c3"]
+
+
+def test_in_order_keeps_the_longest_ascending_run():
+    assert in_order(["115", "116", "1", "2", "3", "41", "41A", "42", "2", "43"]) == [
+        False, False, True, True, True, True, True, True, False, True
+    ]
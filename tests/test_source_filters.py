@@ -0,0 +1,53 @@
+import pytest
+from src.ingestion.chunk_store import SourceTable
+from src.tools import backends, retrieval_tools
+from src.tools.backends import _where
+from src.tools.retrieval_tools import resolve_sources
+
+IPC = "THE INDIAN PENAL CODE.pdf"
+CRPC = "THE CODE OF CRIMINAL PROCEDURE 1973.pdf"
+EVIDENCE = "THE INDIAN EVIDENCE ACT 1872 .pdf"
+
+
+@pytest.fixture
+def sources(monkeypatch):
+    known = {IPC: "statutes", CRPC: "statutes", EVIDENCE: "statutes", "Bachan Singh.pdf": "case_laws"}
+    monkeypatch.setattr(retrieval_tools, "source_doc_types", lambda: known)
+
+
+def test_names_match_files_ignoring_case(sources):
+    assert resolve_sources(["Indian Penal Code"]) == [IPC]
+    assert resolve_sources(["the indian penal code.pdf", "bachan singh"]) == [IPC, "Bachan Singh.pdf"]
+
+
+def test_a_name_in_several_files_selects_all_of_them_once(sources):
+    assert resolve_sources(["Indian", "Indian Penal Code"]) == [EVIDENCE, IPC]
+
+
+@pytest.mark.parametrize("name", ["Companies Act", "  "])
+def test_unknown_names_are_rejected(sources, name):
+    with pytest.raises(ValueError, match="No source matches"):
+        resolve_sources([name])
+
+
+def test_where_combines_type_and_source_clauses(monkeypatch, tmp_path):
+    monkeypatch.setattr(backends, "load_source_table", lambda: SourceTable(str(tmp_path)))
+
+    assert _where() is None
+    assert _where(doc_types=["statutes"]) == {"doc_type": {"$in": ["statutes"]}}
+    assert _where(["statutes"], [IPC]) == {"$and": [
+        {"doc_type": {"$in": ["statutes"]}},
+        {"source": {"$in": [IPC]}}
+    ]}
+
+
+def test_source_filter_also_matches_interned_ids(monkeypatch, tmp_path):
+    table = SourceTable(str(tmp_path))
+    table.intern(CRPC)
+    table.intern(IPC)
+    monkeypatch.setattr(backends, "load_source_table", lambda: table)
+
+    assert _where(sources=[IPC, EVIDENCE]) == {"$or": [
+        {"source": {"$in": [IPC, EVIDENCE]}},
+        {"source_id": {"$in": [1]}}
+    ]}
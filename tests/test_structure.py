@@ -0,0 +1,85 @@
+from langchain_core.documents import Document
+from src.ingestion import structure
+from src.ingestion.structure import section_heading, structure_chunks
+
+SOURCE = "THE INDIAN PENAL CODE.pdf"
+BODY = "Whoever does this shall be punished with imprisonment which may extend to seven years. "
+
+
+def page(number, *lines):
+    return Document(page_content="\n".join(lines), metadata={"source": SOURCE, "page": number})
+
+
+def test_dash_headings_and_wrapped_titles():
+    assert section_heading("302. Punishment for murder.—Whoever commits", "", ("dash",)) == "302"
+    assert section_heading("2[41A. Notice of appearance before police officer. —(1)", "", ("dash",)) == "41A"
+    assert section_heading("3. Punishment of offences committed beyond, but which by law may be tried",
+                           "within, India .—Any person", ("dash",)) == "3"
+    # A contents entry has no dash, and the next numbered entry is not a wrapped title
+    assert section_heading("115. Abetment of offence punishable with death.", "116. Abetment of offence",
+                           ("dash",)) is None
+    assert section_heading("24. Rank structure at the primary levels of Civil Police", "(1) The rank",
+                           ("title",)) == "24"
+
+
+def test_sections_become_chunks_labelled_with_chapter_and_pages():
+    pages = [
+        page(59, "61", "CHAPTER XVI", "OF OFFENCES AFFECTING THE HUMAN BODY",
+             "302. Punishment for murder.—" + BODY * 4),
+        page(60, "62", BODY * 2, "303. Punishment for murder by life-convict.—" + BODY * 4),
+    ]
+
+    chunks = list(structure_chunks(pages, "statutes"))
+
+    assert [chunk.metadata["section"] for chunk in chunks] == ["302", "303"]
+    assert chunks[0].metadata["chapter"] == "XVI"
+    # Section 302 crosses the page break and stays whole; printed page numbers are dropped
+    assert (chunks[0].metadata["page"], chunks[0].metadata["page_end"]) == (59, 60)
+    assert "\n62\n" not in chunks[0].page_content
+
+
+def test_short_sections_are_kept_together(monkeypatch):
+    monkeypatch.setattr(structure, "STRUCTURE_MIN_CHARS", 200)
+    pages = [page(10, "225A. Omission by public servant.—Short.", "225B. Resistance.—Short.",
+                  "226. Unlawful return from transportation.—" + BODY * 4)]
+
+    chunks = list(structure_chunks(pages, "statutes"))
+
+    # Both short sections are too small to stand alone, so they open section 226's chunk
+    assert len(chunks) == 1
+    assert chunks[0].metadata["section"] == "225A-226"
+
+
+def test_long_sections_are_packed_by_paragraph(monkeypatch):
+    monkeypatch.setitem(structure.STRUCTURE_CHUNK_CHARS, "statutes", 400)
+    clauses = [f"({n}) " + BODY * 2 for n in range(1, 7)]
+    pages = [page(20, "41. When police may arrest without warrant.—", *clauses)]
+
+    chunks = list(structure_chunks(pages, "statutes"))
+
+    assert len(chunks) > 1
+    assert all(chunk.metadata["section"] == "41" for chunk in chunks)
+    assert all(len(chunk.page_content) <= 400 for chunk in chunks)
+    # Cuts fall between sub-sections, not inside them
+    assert all(chunk.page_content.startswith(("41.", "(")) for chunk in chunks)
+
+
+def test_contents_pages_are_not_labelled():
+    entries = [f"{n}. Title of section {n}—" for n in range(1, 9)]
+    pages = [page(1, "SECTIONS", *entries), page(2, "CHAPTER I", "1. Title and extent.—" + BODY * 4)]
+
+    chunks = list(structure_chunks(pages, "statutes"))
+
+    assert "section" not in chunks[0].metadata
+    assert chunks[-1].metadata["section"] == "1"
+
+
+def test_judgments_are_packed_by_paragraph_without_sections():
+    text = "1. The appellant was convicted.\n\n2. " + BODY * 30
+    pages = [Document(page_content=text, metadata={"source": "Bachan Singh.pdf", "page": 1})]
+
+    chunks = list(structure_chunks(pages, "case_laws"))
+
+    assert len(chunks) > 1
+    assert all("section" not in chunk.metadata for chunk in chunks)
+    assert all(len(chunk.page_content) <= structure.STRUCTURE_CHUNK_CHARS["case_laws"] for chunk in chunks)
@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from benchmarks.corpus import write_pdf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Configuration is read from the environment at import time, so each sync runs in its own process
+SYNC = """
+import json
+from benchmarks.mocks import HashingEmbeddingModel
+from src.embeddings import EmbeddingService
+from src.resources import registry
+from src.ingestion.manifest import load_manifest
+from src.ingestion.vectorstore import sync_vectorstore
+
+service = EmbeddingService()
+service._model = HashingEmbeddingModel()
+registry.override("embedding_service", service)
+sync_vectorstore(workers=1)
+print(json.dumps(load_manifest()["files"]))
+"""
+
+
+def act(name, sections):
+    return [[f"{name}", ""] + [f"{number}. {title}.—{body}" for number, title, body in sections[i:i + 3]]
+            for i in range(0, len(sections), 3)]
+
+
+SECTIONS = [(n, f"Heading of section {n}", f"Whoever does thing number {n} shall be punished " * 20)
+            for n in range(1, 13)]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for doc_type in ("statutes", "case_laws", "regulations"):
+        (tmp_path / "data" / doc_type).mkdir(parents=True)
+    return tmp_path
+
+
+def write_act(data_dir, filename, sections):
+    with open(data_dir / "data" / "statutes" / filename, "wb") as f:
+        write_pdf(f, act(filename, sections))
+
+
+def sync(data_dir):
+    env = dict(os.environ, DATA_DIR=str(data_dir / "data"), CHROMA_PATH=str(data_dir / "chroma"),
+               ANSWER_CACHE_ENABLED="false", GROQ_API_KEY="test")
+    result = subprocess.run([sys.executable, "-c", SYNC], cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=300)
+    assert result.returncode == 0, result.stderr
+    *log, files = result.stdout.strip().splitlines()
+    return "\n".join(log), json.loads(files)["statutes"]
+
+
+def test_sync_embeds_only_what_changed(data_dir):
+    write_act(data_dir, "A.pdf", SECTIONS)
+    write_act(data_dir, "B.pdf", SECTIONS)
+    _, files = sync(data_dir)
+    chunks_before = files["B.pdf"]["chunks"]
+    assert set(files) == {"A.pdf", "B.pdf"}
+    assert files["A.pdf"]["sections"]["12"]
+
+    log, files = sync(data_dir)
+    assert "statutes is up to date" in log
+
+    # One section of B rewritten, C added, A removed
+    write_act(data_dir, "B.pdf", SECTIONS[:-1] + [(12, "Heading of section 12", "Amended text " * 40)])
+    write_act(data_dir, "C.pdf", SECTIONS[:3])
+    os.remove(data_dir / "data" / "statutes" / "A.pdf")
+    log, files = sync(data_dir)
+
+    assert set(files) == {"B.pdf", "C.pdf"}
+    assert f"Removed A.pdf ({len(chunks_before)} chunks)" in log
+    changed = set(files["B.pdf"]["chunks"]) - set(chunks_before)
+    assert 0 < len(changed) < len(chunks_before)
+    assert f"B.pdf: {len(changed)} chunks embedded" in log
@@ -0,0 +1,87 @@
+import json
+import logging
+import pytest
+from langchain_core.messages import AIMessage
+from src import tracing
+from src.tracing import Metrics, record_llm_usage, span, trace_iterator, trace_request
+
+
+@pytest.fixture
+def traced(monkeypatch, caplog):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    monkeypatch.setattr(tracing, "metrics", Metrics())
+    caplog.set_level(logging.INFO, logger="legal_rag.trace")
+
+    def logged():
+        return [json.loads(record.getMessage()) for record in caplog.records if record.name == "legal_rag.trace"]
+    return logged
+
+
+def test_disabled_tracing_shares_one_no_op_span(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", False)
+
+    assert span("a") is span("b") is trace_request("query")
+    iterator = iter([1])
+    assert trace_iterator("stream", iterator) is iterator
+
+
+def test_request_logs_its_spans_as_one_json_line(traced):
+    with trace_request("run_query", question_chars=12):
+        with span("llm.route") as current:
+            record_llm_usage(current, AIMessage(
+                content="", usage_metadata={"input_tokens": 10, "output_tokens": 2, "total_tokens": 12},
+                response_metadata={"answered_by": "llama-3.1-8b-instant"}
+            ))
+        with pytest.raises(ConnectionError):
+            with span("chroma.search", collection="statutes"):
+                raise ConnectionError
+
+    [line] = traced()
+    assert line["request"] == "run_query"
+    assert line["question_chars"] == 12
+    route, search = line["spans"]
+    assert route["span"] == "llm.route"
+    assert (route["input_tokens"], route["output_tokens"], route["model"]) == (10, 2, "llama-3.1-8b-instant")
+    assert search["error"] == "ConnectionError"
+
+    rendered = tracing.metrics.render()
+    assert 'legal_rag_llm_tokens_total{kind="input_tokens",span="llm.route"} 10' in rendered
+    assert 'legal_rag_requests_total{request="run_query",status="ok"} 1' in rendered
+
+
+def test_spans_outside_a_request_are_only_counted(traced):
+    with span("embedding.query"):
+        pass
+
+    assert traced() == []
+    assert 'legal_rag_span_duration_seconds_count{span="embedding.query"} 1' in tracing.metrics.render()
+
+
+def test_traced_iterator_is_only_active_while_advanced(traced):
+    def events():
+        with span("node.retrieval"):
+            yield "retrieval"
+        yield "done"
+
+    stream = trace_iterator("stream_query", events())
+    assert next(stream) == "retrieval"
+    # Between items the request's trace is not the current one
+    with span("unrelated"):
+        pass
+    assert list(stream) == ["done"]
+
+    [line] = traced()
+    assert [recorded["span"] for recorded in line["spans"]] == ["node.retrieval"]
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = Metrics()
+    for value in (0.003, 0.02, 40.0):
+        metrics.observe("latency", value, span="x")
+
+    rendered = metrics.render()
+    assert 'latency_bucket{span="x",le="0.005"} 1' in rendered
+    assert 'latency_bucket{span="x",le="0.025"} 2' in rendered
+    assert 'latency_bucket{span="x",le="30.0"} 2' in rendered
+    assert 'latency_bucket{span="x",le="+Inf"} 3' in rendered
+    assert 'latency_count{span="x"} 3' in rendered
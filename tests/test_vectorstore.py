@@ -0,0 +1,53 @@
+from langchain_core.documents import Document
+from src.ingestion.vectorstore import batched, upsert_chunks, with_chunk_ids
+
+
+class RecordingCollection:
+    def __init__(self):
+        self.upserts = []
+
+    def upsert(self, embeddings, documents, metadatas, ids):
+        self.upserts.append(ids)
+
+
+class CountingModel:
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts):
+        self.batches.append(len(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def page(text, page_number=0, source="THE INDIAN PENAL CODE.pdf"):
+    return Document(page_content=text, metadata={"source": source, "page": page_number, "doc_type": "statutes"})
+
+
+def test_batches_cover_every_item_once():
+    assert [len(batch) for batch in batched(range(10), 4)] == [4, 4, 2]
+    assert list(batched([], 4)) == []
+
+
+def test_chunk_ids_depend_only_on_the_chunk():
+    alone = [chunk_id for chunk_id, _, _ in with_chunk_ids([page("302. Murder.")])]
+    # Another file's chunks before it don't shift its ID
+    after = [chunk_id for chunk_id, _, _ in with_chunk_ids([page("Preamble", source="a.pdf"), page("302. Murder.")])]
+
+    assert after[1] == alone[0]
+    assert alone[0].startswith("THE INDIAN PENAL CODE.pdf_")
+
+
+def test_repeated_text_on_one_page_gets_distinct_ids():
+    ids = [chunk_id for chunk_id, _, _ in with_chunk_ids([page("Omitted."), page("Omitted."), page("Omitted.", 1)])]
+
+    assert len(set(ids)) == 3
+    assert ids[1] == ids[0] + "_1"
+
+
+def test_chunks_are_embedded_and_upserted_a_batch_at_a_time():
+    collection, model = RecordingCollection(), CountingModel()
+    chunks = ((f"chunk-{i}", page(f"text {i}")) for i in range(7))
+
+    assert upsert_chunks(collection, chunks, model, batch_size=3) == 7
+    assert model.batches == [3, 3, 1]
+    assert collection.upserts[-1] == ["chunk-6"]